@@ -0,0 +1,338 @@
+"""
+Index suggestions read from PostgreSQL query plans, for ``manage.py
+index_advisor``.
+
+:func:`suggest_indexes` walks an ``EXPLAIN (FORMAT JSON)`` plan and proposes
+a B-tree index for:
+
+- sequential scans that filter a large table. Equality columns come first,
+  then the sort keys of the ``Sort`` above the scan, or else the first range
+  column. Boolean filters such as ``planning_friendly`` or
+  ``instagram_worthy`` become the partial index condition, and range filters
+  such as ``adventure_rating >= 7`` are served by the sorted columns.
+- anti and semi joins (``.exclude()`` / ``__in`` subqueries over
+  interactions) whose inner side is scanned sequentially. The inner table
+  gets its equality columns followed by the join column.
+
+Suggestions already covered by the leading columns of an existing index are
+dropped.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db import transaction
+
+from authenbite.observability.stats import untracked
+
+# Index names are limited to 63 bytes by PostgreSQL.
+MAX_NAME_LENGTH = 63
+SORT_NODES = {"Sort", "Incremental Sort"}
+JOIN_TYPES = {"Anti", "Semi"}
+PREPARED_STATEMENT = "index_advisor"
+
+_COMPARISON = re.compile(
+    r"(?:(?P<alias>\w+)\.)?(?P<column>[a-z_]\w*)\)?(?:::[\w ]+?)?\s*"
+    r"(?P<operator>=|>=|<=|>|<)\s"
+)
+_BOOLEAN = re.compile(
+    r"(?:^|\(|\sAND\s)(?P<negated>NOT\s+)?(?:(?P<alias>\w+)\.)?(?P<column>[a-z_]\w*)"
+    r"(?=\)|\s+AND\s|$)"
+)
+_JOIN = re.compile(r"(?:(\w+)\.)?([a-z_]\w*)\s*=\s*(?:(\w+)\.)?([a-z_]\w*)")
+_SORT_KEY = re.compile(
+    r"^(?:(?P<alias>\w+)\.)?(?P<column>[a-z_]\w*)(?:\s+(?P<order>ASC|DESC))?"
+    r"(?:\s+NULLS\s+(?:FIRST|LAST))?$"
+)
+
+
+@dataclass(frozen=True)
+class IndexSuggestion:
+    table: str
+    # Pairs of column name and direction, ASC or DESC, in index order.
+    columns: tuple
+    # Boolean column the index is restricted to, prefixed with "NOT " when
+    # it is restricted to false.
+    condition: str
+    reason: str
+
+    @property
+    def name(self):
+        parts = [self.table, *(column for column, _ in self.columns)]
+        if self.condition:
+            parts.append(self.condition.replace("NOT ", "not_"))
+        name = "_".join(parts)
+        if len(name) + 4 > MAX_NAME_LENGTH:
+            digest = hashlib.sha256(name.encode()).hexdigest()[:8]
+            name = f"{name[: MAX_NAME_LENGTH - 13]}_{digest}"
+        return f"{name}_idx"
+
+    def sql(self, connection):
+        quote = connection.ops.quote_name
+        columns = ", ".join(
+            quote(column) + (" DESC" if order == "DESC" else "")
+            for column, order in self.columns
+        )
+        statement = (
+            f"CREATE INDEX CONCURRENTLY {quote(self.name)} "
+            f"ON {quote(self.table)} ({columns})"
+        )
+        if self.condition:
+            negated = self.condition.startswith("NOT ")
+            column = self.condition.removeprefix("NOT ")
+            statement += f" WHERE {'NOT ' if negated else ''}{quote(column)}"
+        return f"{statement};"
+
+    def model_index(self):
+        """Return the ``models.Index`` declaration, or ``None``."""
+        model = next(
+            (m for m in apps.get_models() if m._meta.db_table == self.table), None
+        )
+        if model is None:
+            return None
+        fields_by_column = {
+            field.column: field.name
+            for field in model._meta.concrete_fields
+            if field.column
+        }
+        fields = [
+            ("-" if order == "DESC" else "") + fields_by_column.get(column, column)
+            for column, order in self.columns
+        ]
+        declaration = f"models.Index(fields={fields!r}"
+        if self.condition:
+            column = self.condition.removeprefix("NOT ")
+            value = not self.condition.startswith("NOT ")
+            declaration += (
+                f", condition=Q({fields_by_column.get(column, column)}={value})"
+            )
+        return f'{declaration}, name="{self.name[:30]}")  # on {model.__name__}'
+
+
+class Schema:
+    """Columns, indexes and size estimates of tables, read once."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._columns = {}
+        self._indexes = {}
+        self._rows = {}
+
+    def columns(self, table):
+        if table not in self._columns:
+            with self.connection.cursor() as cursor:
+                self._columns[table] = {
+                    column.name
+                    for column in self.connection.introspection.get_table_description(
+                        cursor, table
+                    )
+                }
+        return self._columns[table]
+
+    def indexes(self, table):
+        if table not in self._indexes:
+            with self.connection.cursor() as cursor:
+                constraints = self.connection.introspection.get_constraints(
+                    cursor, table
+                )
+            self._indexes[table] = [
+                constraint["columns"]
+                for constraint in constraints.values()
+                if constraint["index"] or constraint["unique"]
+            ]
+        return self._indexes[table]
+
+    def rows(self, table):
+        if table not in self._rows:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [table]
+                )
+                row = cursor.fetchone()
+            self._rows[table] = max(row[0], 0) if row else 0
+        return self._rows[table]
+
+    def is_covered(self, table, columns):
+        names = [column for column, _ in columns]
+        return any(
+            index[: len(names)] == names for index in self.indexes(table) if index
+        )
+
+
+def explain(alias, sql, param_types=()):
+    """
+    Return the root node of the generic JSON plan of ``sql``, whose
+    parameters ``$1``, ``$2``, ... have ``param_types``. The generic plan is
+    the one chosen without knowing the values, so none are needed.
+    """
+    connection = connections[alias]
+    types = f"({', '.join(param_types)})" if param_types else ""
+    arguments = f"({', '.join(['NULL'] * len(param_types))})" if param_types else ""
+    with untracked(), transaction.atomic(using=alias), connection.cursor() as cursor:
+        cursor.execute(
+            "SET LOCAL statement_timeout = %s",
+            [int(settings.REQUEST_PROFILE_EXPLAIN_TIMEOUT * 1000)],
+        )
+        cursor.execute("SET LOCAL plan_cache_mode = force_generic_plan")
+        cursor.execute(f"PREPARE {PREPARED_STATEMENT}{types} AS {sql}")
+        # Prepared statements outlive transactions; the savepoint keeps the
+        # transaction usable for DEALLOCATE if EXPLAIN fails.
+        try:
+            with transaction.atomic(using=alias):
+                cursor.execute(
+                    f"EXPLAIN (FORMAT JSON) EXECUTE {PREPARED_STATEMENT}{arguments}"
+                )
+                plan = cursor.fetchone()[0]
+        finally:
+            cursor.execute(f"DEALLOCATE {PREPARED_STATEMENT}")
+        transaction.set_rollback(True, using=alias)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def walk(node, ancestors=()):
+    yield node, ancestors
+    for child in node.get("Plans", []):
+        yield from walk(child, (*ancestors, node))
+
+
+def _belongs(alias, node, column, schema):
+    return (alias is None or alias == node.get("Alias")) and column in schema.columns(
+        node["Relation Name"]
+    )
+
+
+def filter_columns(node, condition, schema):
+    """
+    Split ``condition`` (a plan filter) into the equality columns, range
+    columns and boolean conditions on the relation scanned by ``node``.
+    """
+    equality, ranges, booleans = [], [], []
+    # Disjunctions cannot be served by a single index.
+    if not condition or " OR " in condition:
+        return equality, ranges, booleans
+    for match in _COMPARISON.finditer(condition):
+        if not _belongs(match["alias"], node, match["column"], schema):
+            continue
+        target = equality if match["operator"] == "=" else ranges
+        if match["column"] not in target:
+            target.append(match["column"])
+    for match in _BOOLEAN.finditer(condition):
+        if _belongs(match["alias"], node, match["column"], schema):
+            prefix = "NOT " if match["negated"] else ""
+            booleans.append(f"{prefix}{match['column']}")
+    return equality, ranges, booleans
+
+
+def sort_columns(node, ancestors, schema):
+    """Return the leading sort keys above ``node`` that are its columns."""
+    sort = next(
+        (
+            ancestor
+            for ancestor in reversed(ancestors)
+            if ancestor["Node Type"] in SORT_NODES
+        ),
+        None,
+    )
+    columns = []
+    for key in (sort or {}).get("Sort Key", []):
+        match = _SORT_KEY.match(key.strip())
+        if match is None or not _belongs(match["alias"], node, match["column"], schema):
+            break
+        columns.append((match["column"], match["order"] or "ASC"))
+    return columns
+
+
+def _unique(columns):
+    seen = set()
+    result = []
+    for column, order in columns:
+        if column not in seen:
+            seen.add(column)
+            result.append((column, order))
+    return tuple(result)
+
+
+def _scan_suggestion(node, ancestors, schema):
+    table = node["Relation Name"]
+    equality, ranges, booleans = filter_columns(node, node.get("Filter"), schema)
+    if not (equality or ranges or booleans):
+        return None
+    sort = sort_columns(node, ancestors, schema)
+    columns = [(column, "ASC") for column in equality]
+    if sort:
+        columns.extend(sort)
+    elif ranges:
+        columns.append((ranges[0], "ASC"))
+    if not columns:
+        return None
+    reason = f"Seq Scan on {table} filtering {node['Filter']}"
+    if sort:
+        reason += ", sorted by " + ", ".join(f"{c} {o}" for c, o in sort)
+    condition = booleans[0] if booleans else ""
+    return IndexSuggestion(table, _unique(columns), condition, reason)
+
+
+def _join_suggestion(join, schema):
+    inner = next(
+        (c for c in join.get("Plans", []) if c.get("Parent Relationship") == "Inner"),
+        None,
+    )
+    if inner is None:
+        return None, None
+    scan = next(
+        (node for node, _ in walk(inner) if node["Node Type"] == "Seq Scan"), None
+    )
+    if scan is None:
+        return None, None
+    table = scan["Relation Name"]
+    join_condition = " ".join(
+        join.get(key, "")
+        for key in ("Hash Cond", "Merge Cond", "Join Filter", "Index Cond")
+    )
+    join_columns = []
+    for left_alias, left, right_alias, right in _JOIN.findall(join_condition):
+        for alias, column in ((left_alias, left), (right_alias, right)):
+            if alias and alias == scan.get("Alias") and column in schema.columns(table):
+                join_columns.append(column)
+    equality, _, booleans = filter_columns(scan, scan.get("Filter"), schema)
+    columns = [(column, "ASC") for column in [*equality, *join_columns]]
+    if not columns:
+        return scan, None
+    reason = (
+        f"{join['Node Type']} ({join['Join Type'].lower()} join) scans {table} "
+        "sequentially"
+    )
+    condition = booleans[0] if booleans else ""
+    return scan, IndexSuggestion(table, _unique(columns), condition, reason)
+
+
+def suggest_indexes(plan, schema, min_rows=0):
+    """Return the indexes that would avoid the sequential scans of ``plan``."""
+    suggestions = []
+    # Inner scans of anti and semi joins, suggested for with the join.
+    joined = []
+    for node, ancestors in walk(plan):
+        if node.get("Join Type") in JOIN_TYPES:
+            scan, suggestion = _join_suggestion(node, schema)
+            joined.append(scan)
+        elif node["Node Type"] == "Seq Scan" and not any(
+            node is scan for scan in joined
+        ):
+            suggestion = _scan_suggestion(node, ancestors, schema)
+        else:
+            continue
+        if (
+            suggestion is not None
+            and suggestion not in suggestions
+            and schema.rows(suggestion.table) >= min_rows
+            and not schema.is_covered(suggestion.table, suggestion.columns)
+        ):
+            suggestions.append(suggestion)
+    return suggestions
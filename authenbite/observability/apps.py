@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class ObservabilityConfig(AppConfig):
+    name = "authenbite.observability"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from authenbite.observability.stats import install_query_observer
+
+        connection_created.connect(install_query_observer)
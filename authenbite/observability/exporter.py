@@ -0,0 +1,89 @@
+"""
+The ``/metrics`` endpoint scraped by Prometheus.
+
+Like the readiness probe (:mod:`config.warmup`), it wraps the application and
+answers ahead of Django's middleware, so scrapes made over plain HTTP to a
+container address are neither redirected nor rejected by host validation,
+and are not measured themselves. Scrapes authenticate with
+``Authorization: Bearer <METRICS_TOKEN>``; without a token the endpoint is
+only served when ``DEBUG`` is on.
+"""
+
+import hmac
+
+from django.conf import settings
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from authenbite.observability.metrics import render
+
+METRICS_PATH = "/metrics"
+
+
+def is_enabled():
+    return bool(settings.METRICS_TOKEN) or settings.DEBUG
+
+
+def export(authorization):
+    """Return the ``(status code, content type, body)`` of a scrape."""
+    token = settings.METRICS_TOKEN
+    if token and not hmac.compare_digest(
+        authorization.encode(), f"Bearer {token}".encode()
+    ):
+        return 401, "text/plain", b"unauthorized\n"
+    return 200, CONTENT_TYPE_LATEST, render()
+
+
+def _headers(content_type, body):
+    return [
+        ("Content-Type", content_type),
+        ("Content-Length", str(len(body))),
+        ("Cache-Control", "no-store"),
+    ]
+
+
+class MetricsExporter:
+    """WSGI middleware answering ``/metrics``."""
+
+    def __init__(self, application, path=METRICS_PATH):
+        self.application = application
+        self.path = path
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO", "").rstrip("/") != self.path or not is_enabled():
+            return self.application(environ, start_response)
+        status, content_type, body = export(environ.get("HTTP_AUTHORIZATION", ""))
+        start_response(
+            "200 OK" if status == 200 else "401 Unauthorized",  # noqa: PLR2004
+            _headers(content_type, body),
+        )
+        return [body]
+
+
+class ASGIMetricsExporter:
+    """ASGI middleware answering ``/metrics``."""
+
+    def __init__(self, application, path=METRICS_PATH):
+        self.application = application
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"].rstrip("/") != self.path
+            or not is_enabled()
+        ):
+            return await self.application(scope, receive, send)
+        authorization = dict(scope["headers"]).get(b"authorization", b"")
+        status, content_type, body = export(authorization.decode("latin-1"))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (name.lower().encode(), value.encode())
+                    for name, value in _headers(content_type, body)
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+        return None
@@ -0,0 +1,112 @@
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+from django.db import connections
+
+from authenbite.observability.advisor import Schema
+from authenbite.observability.advisor import explain
+from authenbite.observability.advisor import suggest_indexes
+from authenbite.observability.slow_queries import reset_slow_queries
+from authenbite.observability.slow_queries import top_slow_queries
+
+# Characters of each normalized statement printed.
+SQL_PREVIEW = 300
+
+
+class Command(BaseCommand):
+    help = (
+        "Explain the slowest query fingerprints recorded by the slow query log "
+        "and suggest indexes for them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=10,
+            help="Fingerprints explained, by total time",
+        )
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=1000,
+            help="Estimated rows below which a table is not worth an index",
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Clear the slow query log afterwards",
+        )
+
+    def handle(self, *args, **options):
+        slow_queries = top_slow_queries(options["limit"])
+        if not slow_queries:
+            self.stdout.write("No slow queries recorded.")
+            return
+
+        schemas = {}
+        # name -> (suggestion, alias, seconds of the fingerprints it serves)
+        suggested = {}
+        for rank, slow_query in enumerate(slow_queries, 1):
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"{rank}. {slow_query.fingerprint}: {slow_query.count} x "
+                    f"{slow_query.mean_seconds * 1000:.0f} ms, "
+                    f"{slow_query.seconds:.1f} s in total"
+                )
+            )
+            self.stdout.write(
+                "   "
+                + ", ".join(
+                    f"{site} ({count})" for site, count in slow_query.call_sites
+                )
+            )
+            self.stdout.write(f"   {slow_query.sql[:SQL_PREVIEW]}")
+            for suggestion, alias in self.advise(slow_query, schemas, options):
+                self.stdout.write(f"   -> {suggestion.reason}")
+                self.stdout.write(f"      {suggestion.sql(connections[alias])}")
+                _, _, seconds = suggested.get(suggestion.name, (None, None, 0.0))
+                suggested[suggestion.name] = (
+                    suggestion,
+                    alias,
+                    seconds + slow_query.seconds,
+                )
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Suggested indexes"))
+        if not suggested:
+            self.stdout.write("None: the slow statements already use indexes.")
+        for suggestion, alias, seconds in sorted(
+            suggested.values(), key=lambda item: item[2], reverse=True
+        ):
+            self.stdout.write(
+                self.style.SUCCESS(suggestion.sql(connections[alias]))
+                + f"  -- {seconds:.1f} s of slow queries"
+            )
+            model_index = suggestion.model_index()
+            if model_index:
+                self.stdout.write(f"    {model_index}")
+
+        if options["reset"]:
+            reset_slow_queries()
+
+    def advise(self, slow_query, schemas, options):
+        sample = slow_query.sample
+        if sample is None:
+            self.stdout.write("   (no sample statement to explain)")
+            return []
+        alias = sample["alias"]
+        connection = connections[alias]
+        if connection.vendor != "postgresql":
+            return []
+        try:
+            plan = explain(alias, sample["sql"], sample["types"])
+        except DatabaseError as exc:
+            self.stdout.write(self.style.WARNING(f"   EXPLAIN failed: {exc}"))
+            return []
+        self.stdout.write(
+            f"   generic plan: {plan['Node Type']}, cost {plan['Total Cost']}"
+        )
+        schema = schemas.setdefault(alias, Schema(connection))
+        return [
+            (suggestion, alias)
+            for suggestion in suggest_indexes(plan, schema, options["min_rows"])
+        ]
@@ -0,0 +1,104 @@
+"""
+Prometheus metrics of the web processes, labelled per endpoint.
+
+Every request is labelled with its URL name (``api:restaurant-nearest``), the
+viewset action its method maps to (``nearest``; empty for other views) and
+its method. Cache hit ratios are derived from ``authenbite_cache_lookups``,
+for example::
+
+    sum by (view, cache) (rate(authenbite_cache_lookups_total{result="hit"}[5m]))
+      / sum by (view, cache) (rate(authenbite_cache_lookups_total[5m]))
+
+Under gunicorn, ``PROMETHEUS_MULTIPROC_DIR`` is set before the application is
+loaded (``compose/production/django/start``): each worker then writes its
+samples to files in that directory and :func:`render` sums the files of all
+workers, past and present, so a scrape sees the whole server whichever worker
+answers it.
+"""
+
+import os
+
+from prometheus_client import REGISTRY
+from prometheus_client import CollectorRegistry
+from prometheus_client import Counter
+from prometheus_client import Histogram
+from prometheus_client import generate_latest
+from prometheus_client import multiprocess
+
+LABELS = ("view", "action", "method")
+UNMATCHED = "unmatched"
+# Anything else is reported as "OTHER" to keep the label set bounded.
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+REQUESTS = Counter(
+    "authenbite_http_requests",
+    "Requests served, by endpoint and status code.",
+    (*LABELS, "status"),
+)
+REQUEST_DURATION = Histogram(
+    "authenbite_http_request_duration_seconds",
+    "Time from the request entering Django to its response being returned.",
+    LABELS,
+)
+DB_QUERIES = Histogram(
+    "authenbite_http_request_db_queries",
+    "SQL statements executed per request.",
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+DB_DURATION = Histogram(
+    "authenbite_http_request_db_duration_seconds",
+    "Total time per request spent executing SQL statements.",
+    LABELS,
+)
+SERIALIZER_DURATION = Histogram(
+    "authenbite_http_request_serializer_duration_seconds",
+    "Total time per request spent in API serializers.",
+    LABELS,
+)
+RESPONSE_SIZE = Histogram(
+    "authenbite_http_response_size_bytes",
+    "Size of non-streaming response bodies.",
+    LABELS,
+    buckets=tuple(4**exponent for exponent in range(4, 12)),
+)
+CACHE_LOOKUPS = Counter(
+    "authenbite_cache_lookups",
+    "Cache lookups made by requests, by cache and result (hit, miss, stale).",
+    (*LABELS, "cache", "result"),
+)
+
+
+def request_labels(request):
+    """Return the ``(view, action, method)`` labels of ``request``."""
+    method = request.method if request.method in METHODS else "OTHER"
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNMATCHED, "", method
+    actions = getattr(match.func, "actions", None) or {}
+    return match.view_name, actions.get(method.lower(), ""), method
+
+
+def observe_request(request, response, stats):
+    """Publish the :class:`~authenbite.observability.stats.RequestStats`."""
+    labels = request_labels(request)
+    REQUEST_DURATION.labels(*labels).observe(stats.elapsed())
+    REQUESTS.labels(*labels, str(response.status_code)).inc()
+    DB_QUERIES.labels(*labels).observe(stats.queries)
+    DB_DURATION.labels(*labels).observe(stats.db_seconds)
+    if stats.serializer_seconds:
+        SERIALIZER_DURATION.labels(*labels).observe(stats.serializer_seconds)
+    if not response.streaming:
+        RESPONSE_SIZE.labels(*labels).observe(len(response.content))
+    for (cache_name, result), count in stats.cache_lookups.items():
+        CACHE_LOOKUPS.labels(*labels, cache_name, result).inc(count)
+
+
+def render():
+    """Return the current samples in the Prometheus text format."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
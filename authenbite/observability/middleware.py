@@ -0,0 +1,47 @@
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+
+from authenbite.observability.metrics import observe_request
+from authenbite.observability.stats import finish_request
+from authenbite.observability.stats import start_request
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure every request and publish it to the Prometheus metrics: latency,
+    SQL statements and their time, serializer time, cache lookups and the
+    response size.
+
+    It should come first in ``MIDDLEWARE`` so that the latency covers the
+    other middleware. Both sync and async, so that it adds no thread switch
+    under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, token = start_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_request(token)
+        observe_request(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats, token = start_request(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            finish_request(token)
+        observe_request(request, response, stats)
+        return response
@@ -0,0 +1,312 @@
+"""
+On-demand profiling of single requests, for staff.
+
+A request sent by a staff user (session or API token) with an ``X-Profile: 1``
+header or a ``_profile=1`` query parameter runs under a sampling profiler
+(pyinstrument, or cProfile where it is not installed) with its SQL statements
+recorded. Afterwards the slowest ``REQUEST_PROFILE_EXPLAIN_LIMIT`` SELECT
+statements are run again under ``EXPLAIN (ANALYZE, BUFFERS)``, in a
+transaction that is rolled back. The report is kept in the cache for
+``REQUEST_PROFILE_TTL`` seconds under the id returned in the ``X-Profile-Id``
+header, and downloaded from ``/api/profiles/<id>/``.
+
+Other requests only pay for looking up the flag. A process profiles one
+request at a time: a request asking for a profile meanwhile is served
+normally, without ``X-Profile-Id``. Statement parameters are used to run
+``EXPLAIN`` but are not stored in the report.
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db import connections
+from django.db import transaction
+from rest_framework import exceptions
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.settings import api_settings
+
+from authenbite.observability.stats import current_stats
+from authenbite.observability.stats import finish_request
+from authenbite.observability.stats import start_request
+from authenbite.observability.stats import untracked
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_PARAM = "_profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+# Functions listed in cProfile reports.
+CPROFILE_FUNCTIONS = 60
+
+
+class _State:
+    # Held while a request is profiled.
+    lock = threading.Lock()
+
+
+def profile_cache_key(profile_id):
+    return f"profile:{profile_id}"
+
+
+def get_report(profile_id):
+    return cache.get(profile_cache_key(profile_id))
+
+
+def is_requested(request):
+    return (
+        request.META.get(PROFILE_HEADER) == "1" or request.GET.get(PROFILE_PARAM) == "1"
+    )
+
+
+def staff_user(request):
+    """
+    Return the user of ``request`` if they are staff. API tokens are checked
+    here, as DRF only authenticates them once the view runs.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user if user.is_staff else None
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        if issubclass(authentication_class, SessionAuthentication):
+            continue
+        try:
+            result = authentication_class().authenticate(request)
+        except exceptions.APIException:
+            return None
+        if result is not None:
+            return result[0] if result[0].is_staff else None
+    return None
+
+
+class SamplingProfiler:
+    name = "pyinstrument"
+
+    def __init__(self, is_async):
+        from pyinstrument import Profiler
+
+        self.profiler = Profiler(
+            interval=settings.REQUEST_PROFILE_INTERVAL,
+            async_mode="enabled" if is_async else "disabled",
+        )
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+
+    def output(self):
+        return self.profiler.output_text(unicode=True, color=False)
+
+
+class DeterministicProfiler:
+    # Under ASGI this also traces other requests running on the event loop.
+    name = "cProfile"
+
+    def __init__(self, is_async):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def output(self):
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stream)
+        stats.sort_stats("cumulative").print_stats(CPROFILE_FUNCTIONS)
+        return stream.getvalue()
+
+
+def make_profiler(is_async):
+    try:
+        return SamplingProfiler(is_async)
+    except ImportError:
+        return DeterministicProfiler(is_async)
+
+
+def is_explainable(statement):
+    # EXPLAIN ANALYZE executes the statement; only reads are run again.
+    return not statement.many and statement.sql.lstrip()[:6].upper() == "SELECT"
+
+
+def explain(statement):
+    """Return the ``EXPLAIN (ANALYZE, BUFFERS)`` output of ``statement``."""
+    connection = connections[statement.alias]
+    if connection.vendor != "postgresql":
+        return None
+    try:
+        with transaction.atomic(using=statement.alias), connection.cursor() as cursor:
+            cursor.execute(
+                "SET LOCAL statement_timeout = %s",
+                [int(settings.REQUEST_PROFILE_EXPLAIN_TIMEOUT * 1000)],
+            )
+            cursor.execute(
+                f"EXPLAIN (ANALYZE, BUFFERS) {statement.sql}", statement.params
+            )
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            transaction.set_rollback(True, using=statement.alias)
+    except DatabaseError as exc:
+        return f"EXPLAIN failed: {exc}"
+    return plan
+
+
+def slowest_statements(statements, limit):
+    slowest = {}
+    for statement in statements:
+        if not is_explainable(statement):
+            continue
+        known = slowest.get(statement.sql)
+        if known is None or statement.seconds > known.seconds:
+            slowest[statement.sql] = statement
+    return sorted(slowest.values(), key=lambda s: s.seconds, reverse=True)[:limit]
+
+
+class RequestProfile:
+    def __init__(self, request, user, is_async):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.user = user
+        self.profiler = make_profiler(is_async)
+        self.stats = current_stats()
+        self.token = None
+        self.started = None
+        self.duration = None
+        self.statements = None
+
+    def start(self):
+        if self.stats is None:
+            self.stats, self.token = start_request(self.request)
+        self.stats.statements = []
+        self.started = time.perf_counter()
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+        self.duration = time.perf_counter() - self.started
+        self.statements, self.stats.statements = self.stats.statements, None
+        if self.token is not None:
+            finish_request(self.token)
+
+    def save(self, response):
+        """Explain the slowest statements and store the report."""
+        slowest = slowest_statements(
+            self.statements, settings.REQUEST_PROFILE_EXPLAIN_LIMIT
+        )
+        with untracked():
+            plans = [explain(statement) for statement in slowest]
+        report = {
+            "id": self.id,
+            "method": self.request.method,
+            "path": self.request.get_full_path(),
+            "status": response.status_code,
+            "user": self.user.get_username(),
+            "duration": self.duration,
+            "profiler": self.profiler.name,
+            "profile": self.profiler.output(),
+            "query_count": len(self.statements),
+            "query_duration": sum(s.seconds for s in self.statements),
+            "queries": [
+                {
+                    "alias": statement.alias,
+                    "sql": statement.sql,
+                    "many": statement.many,
+                    "duration": statement.seconds,
+                }
+                for statement in self.statements
+            ],
+            "explain": [
+                {"sql": statement.sql, "duration": statement.seconds, "plan": plan}
+                for statement, plan in zip(slowest, plans, strict=True)
+            ],
+        }
+        cache.set(
+            profile_cache_key(self.id), report, timeout=settings.REQUEST_PROFILE_TTL
+        )
+        response[PROFILE_ID_HEADER] = self.id
+        return response
+
+
+class RequestProfilingMiddleware:
+    """
+    Profile the requests of staff users who ask for it. It should come after
+    ``AuthenticationMiddleware``.
+
+    Under ASGI the profiler only sees the event loop thread: work the view
+    hands to threads shows as time spent awaiting, while its SQL statements
+    are still recorded.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.REQUEST_PROFILING_ENABLED or not is_requested(request):
+            return self.get_response(request)
+        profile = self.start(request, staff_user(request), is_async=False)
+        if profile is None:
+            return self.get_response(request)
+        try:
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.stop()
+            return self.save(profile, response)
+        finally:
+            _State.lock.release()
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_PROFILING_ENABLED or not is_requested(request):
+            return await self.get_response(request)
+        user = await sync_to_async(staff_user)(request)
+        profile = self.start(request, user, is_async=True)
+        if profile is None:
+            return await self.get_response(request)
+        try:
+            try:
+                response = await self.get_response(request)
+            finally:
+                profile.stop()
+            return await sync_to_async(self.save)(profile, response)
+        finally:
+            _State.lock.release()
+
+    def start(self, request, user, is_async):
+        """Start profiling ``request``, holding the lock, or return ``None``."""
+        if user is None or not _State.lock.acquire(blocking=False):
+            return None
+        try:
+            profile = RequestProfile(request, user, is_async)
+            profile.start()
+        except Exception:
+            logger.exception("Could not profile %s", request.path)
+            _State.lock.release()
+            return None
+        return profile
+
+    def save(self, profile, response):
+        try:
+            return profile.save(response)
+        except Exception:
+            logger.exception("Could not save the profile of %s", profile.request.path)
+            return response
@@ -0,0 +1,216 @@
+"""
+Slow query log, aggregated per SQL fingerprint.
+
+Every statement taking ``SLOW_QUERY_THRESHOLD`` seconds or more is logged
+with its call site (the view and viewset action of the request, or the Celery
+task) and its fingerprint: a hash of the SQL with literals, placeholders and
+``IN`` lists normalized away, so that the same ORM query made with different
+values is counted once. Per fingerprint, Redis (see
+:mod:`authenbite.restaurants.store`) keeps the number of occurrences, their
+total time, the call sites and the last statement, which ``manage.py
+index_advisor`` explains with a generic plan. Statements are kept with
+``$1``, ``$2``, ... placeholders and the types of their parameters but never
+the values, which can be credentials or personal data. Aggregates expire
+``SLOW_QUERY_RETENTION`` seconds after the last slow query.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date
+from datetime import datetime
+from datetime import time
+from datetime import timedelta
+from decimal import Decimal
+from uuid import UUID
+
+from celery import current_task
+from django.conf import settings
+
+from authenbite.observability.metrics import request_labels
+from authenbite.restaurants.store import decode
+from authenbite.restaurants.store import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+SECONDS_KEY = "slow-queries:seconds"
+COUNT_KEY = "slow-queries:count"
+SQL_KEY = "slow-queries:sql"
+SAMPLE_KEY = "slow-queries:sample"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_PARAMETER = re.compile(r"%[s%]")
+
+# PostgreSQL types of statement parameters, by Python type; subclasses first.
+PARAMETER_TYPES = (
+    (bool, "boolean"),
+    (int, "bigint"),
+    (float, "double precision"),
+    (Decimal, "numeric"),
+    (datetime, "timestamptz"),
+    (date, "date"),
+    (time, "time"),
+    (timedelta, "interval"),
+    (UUID, "uuid"),
+    (str, "text"),
+)
+
+
+def _sites_key(fingerprint):
+    return f"slow-queries:sites:{fingerprint}"
+
+
+def normalize_sql(sql):
+    """Return ``sql`` with every literal and placeholder replaced by ``?``."""
+    sql = _STRING.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha256(normalized_sql.encode()).hexdigest()[:16]
+
+
+def call_site(stats):
+    if stats is not None and stats.request is not None:
+        view, action, _ = request_labels(stats.request)
+        return f"{view}/{action}" if action else view
+    if current_task and current_task.request.id:
+        return f"task:{current_task.name}"
+    return "-"
+
+
+def parameter_type(value):
+    for python_type, sql_type in PARAMETER_TYPES:
+        if isinstance(value, python_type):
+            return sql_type
+    return "unknown"
+
+
+def _sample(sql, params, many):
+    """
+    Return ``(statement, parameter types)`` with the ``%s`` placeholders of
+    ``sql`` numbered ``$1``, ``$2``, ..., or ``None`` when they cannot be.
+    """
+    if many:
+        return None
+    if params is None:
+        # Nothing was interpolated, so ``%`` is literal.
+        return sql, []
+    if not isinstance(params, list | tuple):
+        return None
+    count = 0
+
+    def number(match):
+        nonlocal count
+        if match.group() == "%%":
+            return "%"
+        count += 1
+        return f"${count}"
+
+    statement = _PARAMETER.sub(number, sql)
+    if count != len(params):
+        return None
+    return statement, [parameter_type(value) for value in params]
+
+
+def record_slow_query(stats, statement):
+    """
+    Log ``statement`` (an :class:`authenbite.observability.stats.Statement`)
+    and add it to the aggregates of its fingerprint.
+    """
+    normalized = normalize_sql(statement.sql)
+    key = fingerprint(normalized)
+    site = call_site(stats)
+    logger.warning(
+        "Slow query (%.0f ms) in %s, fingerprint %s: %s",
+        statement.seconds * 1000,
+        site,
+        key,
+        normalized,
+    )
+    sample = _sample(statement.sql, statement.params, statement.many)
+    retention = settings.SLOW_QUERY_RETENTION
+    try:
+        pipe = get_redis_client().pipeline(transaction=False)
+        pipe.zincrby(SECONDS_KEY, statement.seconds, key)
+        pipe.zincrby(COUNT_KEY, 1, key)
+        pipe.zincrby(_sites_key(key), 1, site)
+        pipe.hset(SQL_KEY, key, normalized)
+        if sample is not None:
+            sample_sql, types = sample
+            pipe.hset(
+                SAMPLE_KEY,
+                key,
+                json.dumps(
+                    {"alias": statement.alias, "sql": sample_sql, "types": types}
+                ),
+            )
+        for name in (SECONDS_KEY, COUNT_KEY, _sites_key(key), SQL_KEY, SAMPLE_KEY):
+            pipe.expire(name, retention)
+        pipe.execute()
+    except Exception:  # noqa: BLE001
+        logger.warning("Could not record slow query %s", key, exc_info=True)
+
+
+@dataclass(frozen=True)
+class SlowQuery:
+    fingerprint: str
+    sql: str
+    count: int
+    seconds: float
+    # [(call site, occurrences)], most frequent first.
+    call_sites: list
+    # {"alias": ..., "sql": ..., "types": [...]} of the last occurrence, with
+    # $n parameters, or None.
+    sample: dict | None
+
+    @property
+    def mean_seconds(self):
+        return self.seconds / self.count if self.count else 0.0
+
+
+def top_slow_queries(limit=10):
+    """Return the ``limit`` fingerprints with the most total time."""
+    client = get_redis_client()
+    ranking = client.zrevrange(SECONDS_KEY, 0, limit - 1, withscores=True)
+    if not ranking:
+        return []
+    statements = {decode(k): decode(v) for k, v in client.hgetall(SQL_KEY).items()}
+    samples = {decode(k): decode(v) for k, v in client.hgetall(SAMPLE_KEY).items()}
+    slow_queries = []
+    for member, seconds in ranking:
+        key = decode(member)
+        sample = samples.get(key)
+        slow_queries.append(
+            SlowQuery(
+                fingerprint=key,
+                sql=statements.get(key, ""),
+                count=int(client.zscore(COUNT_KEY, key) or 0),
+                seconds=float(seconds),
+                call_sites=[
+                    (decode(site), int(count))
+                    for site, count in client.zrevrange(
+                        _sites_key(key), 0, 4, withscores=True
+                    )
+                ],
+                sample=json.loads(sample) if sample else None,
+            )
+        )
+    return slow_queries
+
+
+def reset_slow_queries():
+    client = get_redis_client()
+    keys = [decode(key) for key in client.hgetall(SQL_KEY)]
+    client.delete(
+        SECONDS_KEY, COUNT_KEY, SQL_KEY, SAMPLE_KEY, *(_sites_key(k) for k in keys)
+    )
@@ -0,0 +1,164 @@
+"""
+Per-request measurements collected while a request is being served.
+
+:class:`~authenbite.observability.middleware.RequestMetricsMiddleware` opens a
+:class:`RequestStats` for each request and publishes it to the metrics once
+the response is ready. Code running for the request adds to it through the
+context: an execute wrapper installed on every database connection counts
+queries and their time (and keeps the statements themselves when
+:mod:`~authenbite.observability.profiling` asks for them),
+:class:`TimedSerializerMixin` times serialization and
+:func:`record_cache_lookup` counts cache hits and misses.
+
+The stats live in a context variable, which ``sync_to_async`` copies into the
+threads it runs code in, so queries made from the async views' query pool
+count towards their request. Outside a request (Celery tasks, management
+commands) nothing is recorded, except for slow queries: statements taking
+``SLOW_QUERY_THRESHOLD`` seconds or more are always handed to
+:mod:`~authenbite.observability.slow_queries`.
+"""
+
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from authenbite.observability.slow_queries import record_slow_query
+
+HIT = "hit"
+MISS = "miss"
+STALE = "stale"
+
+_current = ContextVar("request_stats", default=None)
+_serializing = ContextVar("serializing", default=False)
+_untracked = ContextVar("untracked", default=False)
+
+
+@dataclass(frozen=True)
+class Statement:
+    alias: str
+    sql: str
+    params: object
+    many: bool
+    seconds: float
+
+
+class RequestStats:
+    def __init__(self, request=None):
+        self.request = request
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        # (cache name, result) -> lookups
+        self.cache_lookups = Counter()
+        # Executed statements, when a list is set here.
+        self.statements = None
+
+    def add_query(self, seconds, statement=None):
+        with self.lock:
+            self.queries += 1
+            self.db_seconds += seconds
+            if self.statements is not None and statement is not None:
+                self.statements.append(statement)
+
+    def add_serialization(self, seconds):
+        with self.lock:
+            self.serializer_seconds += seconds
+
+    def add_cache_lookup(self, cache_name, result):
+        with self.lock:
+            self.cache_lookups[cache_name, result] += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_stats():
+    return _current.get()
+
+
+def start_request(request):
+    """Open the stats of ``request``; returns them and a reset token."""
+    stats = RequestStats(request)
+    return stats, _current.set(stats)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def untracked():
+    """
+    Leave the queries and lookups made in the block out of the stats and the
+    slow query log.
+    """
+    token = _current.set(None)
+    untracked_token = _untracked.set(True)
+    try:
+        yield
+    finally:
+        _untracked.reset(untracked_token)
+        _current.reset(token)
+
+
+def observe_query(execute, sql, params, many, context):
+    stats = _current.get()
+    threshold = settings.SLOW_QUERY_THRESHOLD
+    if (stats is None and not threshold) or _untracked.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - started
+        slow = threshold and seconds >= threshold
+        statement = None
+        if slow or (stats is not None and stats.statements is not None):
+            alias = context["connection"].alias
+            statement = Statement(alias, sql, params, many, seconds)
+        if stats is not None:
+            stats.add_query(seconds, statement)
+        if slow:
+            record_slow_query(stats, statement)
+
+
+def install_query_observer(sender, connection, **kwargs):
+    """``connection_created`` receiver adding :func:`observe_query`."""
+    # The wrapper list belongs to the connection handler and outlives
+    # reconnections.
+    if observe_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(observe_query)
+
+
+def record_cache_lookup(cache_name, result):
+    """Count a lookup in ``cache_name`` (``HIT``, ``MISS`` or ``STALE``)."""
+    stats = _current.get()
+    if stats is not None:
+        stats.add_cache_lookup(cache_name, result)
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin adding the time spent in ``to_representation`` to the
+    request's serializer time. Nested serializers are counted as part of the
+    serializer that contains them.
+    """
+
+    def to_representation(self, instance):
+        stats = _current.get()
+        if stats is None or _serializing.get():
+            return super().to_representation(instance)
+        token = _serializing.set(True)
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.add_serialization(time.perf_counter() - started)
+            _serializing.reset(token)
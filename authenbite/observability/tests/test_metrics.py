@@ -0,0 +1,103 @@
+from django.core.cache import cache
+from django.test import override_settings
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from authenbite.observability.exporter import MetricsExporter
+from authenbite.restaurants.tests.factories import RestaurantFactory
+from authenbite.restaurants.tests.factories import UserFactory
+
+NEAREST = {"view": "api:restaurant-nearest", "action": "nearest", "method": "GET"}
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class RequestMetricsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        RestaurantFactory.create_batch(3)
+        self.client.force_authenticate(user=UserFactory())
+
+    def get_nearest(self):
+        return self.client.get("/api/restaurants/nearest/", {"lat": 1.0, "lon": 1.0})
+
+    def test_requests_are_measured_per_action(self):
+        before = {
+            name: sample(name, **NEAREST)
+            for name in (
+                "authenbite_http_request_duration_seconds_count",
+                "authenbite_http_request_db_queries_sum",
+                "authenbite_http_request_serializer_duration_seconds_count",
+                "authenbite_http_response_size_bytes_sum",
+            )
+        }
+        requests = sample("authenbite_http_requests_total", status="200", **NEAREST)
+
+        response = self.get_nearest()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        def delta(name):
+            return sample(name, **NEAREST) - before[name]
+
+        self.assertEqual(delta("authenbite_http_request_duration_seconds_count"), 1)
+        self.assertGreaterEqual(delta("authenbite_http_request_db_queries_sum"), 1)
+        self.assertEqual(
+            delta("authenbite_http_request_serializer_duration_seconds_count"), 1
+        )
+        self.assertEqual(
+            delta("authenbite_http_response_size_bytes_sum"), len(response.content)
+        )
+        self.assertEqual(
+            sample("authenbite_http_requests_total", status="200", **NEAREST),
+            requests + 1,
+        )
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_response_cache_lookups(self):
+        name = "authenbite_cache_lookups_total"
+        hits = sample(name, cache="response", result="hit", **NEAREST)
+        misses = sample(name, cache="response", result="miss", **NEAREST)
+
+        self.get_nearest()
+        self.get_nearest()
+
+        self.assertEqual(
+            sample(name, cache="response", result="miss", **NEAREST), misses + 1
+        )
+        self.assertEqual(
+            sample(name, cache="response", result="hit", **NEAREST), hits + 1
+        )
+
+
+class MetricsExporterTestCase(APITestCase):
+    def scrape(self, authorization=None):
+        def application(environ, start_response):
+            start_response("404 Not Found", [])
+            return [b"application"]
+
+        environ = {"PATH_INFO": "/metrics"}
+        if authorization is not None:
+            environ["HTTP_AUTHORIZATION"] = authorization
+        statuses = []
+        body = MetricsExporter(application)(
+            environ, lambda status, headers: statuses.append(status)
+        )
+        return statuses[0], b"".join(body)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_scrapes_need_the_token(self):
+        self.assertEqual(self.scrape()[0], "401 Unauthorized")
+        self.assertEqual(self.scrape("Bearer wrong")[0], "401 Unauthorized")
+
+        status_line, body = self.scrape("Bearer secret")
+        self.assertEqual(status_line, "200 OK")
+        self.assertIn(b"# TYPE authenbite_http_request_duration_seconds", body)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_disabled_without_token(self):
+        self.assertEqual(
+            self.scrape("Bearer secret"), ("404 Not Found", b"application")
+        )
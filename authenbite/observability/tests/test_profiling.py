@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from authenbite.observability.profiling import PROFILE_ID_HEADER
+from authenbite.restaurants.tests.factories import RestaurantFactory
+from authenbite.restaurants.tests.factories import UserFactory
+
+
+class RequestProfilingTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        RestaurantFactory.create_batch(3)
+        self.staff = UserFactory(is_staff=True)
+
+    def test_staff_request_is_profiled(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            "/api/restaurants/", {"ordering": "-rating"}, HTTP_X_PROFILE="1"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 3)
+
+        report = self.client.get(f"/api/profiles/{response[PROFILE_ID_HEADER]}/")
+        self.assertEqual(report.status_code, status.HTTP_200_OK)
+        self.assertEqual(report.data["status"], status.HTTP_200_OK)
+        self.assertIn(report.data["profiler"], {"pyinstrument", "cProfile"})
+        self.assertTrue(report.data["profile"])
+        self.assertEqual(report.data["query_count"], len(report.data["queries"]))
+        self.assertGreater(report.data["query_count"], 0)
+        self.assertTrue(report.data["explain"])
+        for explained in report.data["explain"]:
+            self.assertTrue(explained["sql"].startswith("SELECT"))
+            self.assertIn("actual time", explained["plan"])
+
+    def test_query_flag_with_api_token(self):
+        token = Token.objects.create(user=self.staff)
+        response = self.client.get(
+            "/api/restaurants/",
+            {"_profile": "1"},
+            HTTP_AUTHORIZATION=f"Bearer {token.key}",
+        )
+        self.assertIn(PROFILE_ID_HEADER, response)
+
+    def test_other_users_are_not_profiled(self):
+        user = UserFactory()
+        self.client.force_login(user)
+        response = self.client.get("/api/restaurants/", HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(PROFILE_ID_HEADER, response)
+
+        self.client.force_login(self.staff)
+        profile_id = self.client.get("/api/restaurants/", HTTP_X_PROFILE="1")[
+            PROFILE_ID_HEADER
+        ]
+        self.client.force_login(user)
+        response = self.client.get(f"/api/profiles/{profile_id}/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(REQUEST_PROFILING_ENABLED=False)
+    def test_disabled(self):
+        self.client.force_login(self.staff)
+        response = self.client.get("/api/restaurants/", HTTP_X_PROFILE="1")
+        self.assertNotIn(PROFILE_ID_HEADER, response)
@@ -0,0 +1,160 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from authenbite.observability.advisor import Schema
+from authenbite.observability.advisor import suggest_indexes
+from authenbite.observability.slow_queries import fingerprint
+from authenbite.observability.slow_queries import normalize_sql
+from authenbite.observability.slow_queries import top_slow_queries
+from authenbite.restaurants.store import get_redis_client
+from authenbite.restaurants.tests.factories import RestaurantFactory
+from authenbite.restaurants.tests.factories import UserFactory
+
+
+def scan(table, alias, condition=None, **extra):
+    node = {"Node Type": "Seq Scan", "Relation Name": table, "Alias": alias}
+    if condition:
+        node["Filter"] = condition
+    return {**node, **extra}
+
+
+def sorted_by(*keys, child):
+    return {"Node Type": "Sort", "Sort Key": list(keys), "Plans": [child]}
+
+
+class NormalizeSqlTestCase(TestCase):
+    def test_same_query_with_other_values_has_one_fingerprint(self):
+        first = normalize_sql(
+            'SELECT "t"."id" FROM "t" WHERE ("t"."rating" >= 7 AND "t"."id" IN '
+            "(%s, %s)) LIMIT 10"
+        )
+        second = normalize_sql(
+            'SELECT "t"."id"  FROM "t" WHERE ("t"."rating" >= 4 AND "t"."id" IN '
+            "(%s, %s, %s, %s)) LIMIT 20"
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(fingerprint(first), fingerprint(second))
+        self.assertIn("IN (...)", first)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD=1e-9)
+class SlowQueryLogTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        get_redis_client().flushall()
+        RestaurantFactory.create_batch(2)
+        self.client.force_authenticate(user=UserFactory())
+
+    def test_queries_are_aggregated_per_fingerprint_with_call_site(self):
+        with self.assertLogs("authenbite.observability.slow_queries", "WARNING"):
+            self.client.get("/api/restaurants/", {"name": "Pizza"})
+            self.client.get("/api/restaurants/", {"name": "Sushi"})
+
+        slow_queries = top_slow_queries(limit=100)
+        restaurants = [
+            slow_query
+            for slow_query in slow_queries
+            if "api:restaurant-list/list" in dict(slow_query.call_sites)
+            and '"restaurants_restaurant"' in slow_query.sql
+        ]
+        self.assertTrue(restaurants)
+        self.assertIn(2, [slow_query.count for slow_query in restaurants])
+        for slow_query in restaurants:
+            self.assertNotIn("Pizza", slow_query.sql)
+            self.assertNotIn("Pizza", slow_query.sample["sql"])
+
+    def test_index_advisor(self):
+        self.client.get("/api/restaurants/", {"ordering": "-rating"})
+
+        out = StringIO()
+        call_command("index_advisor", "--min-rows", "0", stdout=out)
+
+        self.assertIn("api:restaurant-list/list", out.getvalue())
+        self.assertIn("generic plan:", out.getvalue())
+        self.assertIn("Suggested indexes", out.getvalue())
+
+
+class IndexAdvisorTestCase(TestCase):
+    def setUp(self):
+        self.schema = Schema(connection)
+
+    def test_persona_filters(self):
+        planner = sorted_by(
+            "restaurants_restaurant.rating DESC",
+            "restaurants_restaurant.price_level",
+            child=scan(
+                "restaurants_restaurant", "restaurants_restaurant", "planning_friendly"
+            ),
+        )
+        escapist = sorted_by(
+            "restaurants_restaurant.adventure_rating DESC",
+            "restaurants_restaurant.rating DESC",
+            child=scan(
+                "restaurants_restaurant",
+                "restaurants_restaurant",
+                "(adventure_rating >= 7)",
+            ),
+        )
+
+        (suggestion,) = suggest_indexes(planner, self.schema)
+        self.assertEqual(
+            suggestion.columns, (("rating", "DESC"), ("price_level", "ASC"))
+        )
+        self.assertEqual(suggestion.condition, "planning_friendly")
+        self.assertEqual(
+            suggestion.sql(connection),
+            f'CREATE INDEX CONCURRENTLY "{suggestion.name}" ON '
+            '"restaurants_restaurant" ("rating" DESC, "price_level") '
+            'WHERE "planning_friendly";',
+        )
+
+        (suggestion,) = suggest_indexes(escapist, self.schema)
+        self.assertEqual(
+            suggestion.columns, (("adventure_rating", "DESC"), ("rating", "DESC"))
+        )
+        self.assertEqual(suggestion.condition, "")
+
+    def test_interaction_anti_join(self):
+        def anti_join(condition):
+            return {
+                "Node Type": "Hash Join",
+                "Join Type": "Anti",
+                "Hash Cond": "(restaurants_restaurant.id = u1.restaurant_id)",
+                "Plans": [
+                    scan(
+                        "restaurants_restaurant",
+                        "restaurants_restaurant",
+                        **{"Parent Relationship": "Outer"},
+                    ),
+                    {
+                        "Node Type": "Hash",
+                        "Parent Relationship": "Inner",
+                        "Plans": [
+                            scan(
+                                "restaurants_userrestaurantinteraction",
+                                "u1",
+                                condition,
+                            )
+                        ],
+                    },
+                ],
+            }
+
+        (suggestion,) = suggest_indexes(
+            anti_join("(visited AND (user_rating = 1))"), self.schema
+        )
+        self.assertEqual(
+            suggestion.columns, (("user_rating", "ASC"), ("restaurant_id", "ASC"))
+        )
+        self.assertEqual(suggestion.condition, "visited")
+
+        # (user_id, restaurant_id) is the unique_together index.
+        self.assertEqual(
+            suggest_indexes(anti_join("(liked AND (user_id = 5))"), self.schema), []
+        )
@@ -0,0 +1,18 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from authenbite.observability.profiling import get_report
+
+
+class ProfileReportView(APIView):
+    """Download a request profile by the id it was returned with."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id):
+        report = get_report(profile_id)
+        if report is None:
+            raise NotFound
+        return Response(report)
@@ -1,13 +1,17 @@
 from django.contrib import admin
 
 from authenbite.restaurants.models import (
+    CatalogChange,
     Cuisine,
     Restaurant,
+    RestaurantStats,
     UserPreference,
     UserRestaurantInteraction,
 )
 
+admin.site.register(CatalogChange)
 admin.site.register(Cuisine)
 admin.site.register(Restaurant)
+admin.site.register(RestaurantStats)
 admin.site.register(UserPreference)
 admin.site.register(UserRestaurantInteraction)
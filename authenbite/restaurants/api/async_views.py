@@ -0,0 +1,328 @@
+"""
+Async versions of the I/O-bound restaurant viewsets, for the ASGI entry point.
+
+``config/asgi.py`` turns on ``ASYNC_API_VIEWS``, which makes the router
+register these classes instead of their sync parents. Under ASGI a sync view
+holds a thread for its whole duration; these views await instead, and run the
+lookups that do not depend on each other concurrently: the personalization
+context and the filtered candidates, a page of results and its count, and
+the facet counts.
+
+Django's async ORM methods still run queries on the request's single sync
+thread, one after the other. Concurrent lookups are therefore run through a
+small pool of ``ASYNC_QUERY_THREADS`` threads instead, each with its own
+database connection, and cache and Redis calls made from those threads use
+the same blocking clients as the sync views. With ``ASYNC_QUERY_THREADS = 0``
+they run one after the other on the request thread, which keeps them inside
+the test transaction.
+
+Async views cannot run under ``ATOMIC_REQUESTS``; sync actions of these
+viewsets and the interaction writes are wrapped in a transaction instead.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.core.paginator import InvalidPage
+from django.core.paginator import Page
+from django.db import close_old_connections
+from django.db import transaction
+from django.utils.decorators import classonlymethod
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from authenbite.restaurants.api.views import RestaurantViewSet
+from authenbite.restaurants.api.views import UserRestaurantInteractionViewSet
+from authenbite.restaurants.cache import cache_response
+from authenbite.restaurants.cache import round_coordinate
+from authenbite.restaurants.facets import FACETS_PARAM
+from authenbite.restaurants.facets import get_facets
+from authenbite.restaurants.models import Restaurant
+from authenbite.restaurants.personalization import get_personalization
+from authenbite.users.models import Persona
+
+
+class _Executor:
+    lock = threading.Lock()
+    pool = None
+
+
+def _query_pool():
+    # Created on first use so that forked workers never inherit it.
+    with _Executor.lock:
+        if _Executor.pool is None:
+            _Executor.pool = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_QUERY_THREADS,
+                thread_name_prefix="async-queries",
+            )
+        return _Executor.pool
+
+
+def _with_connection_lifecycle(function):
+    # Pool threads keep their connection between calls; like a request, each
+    # call closes it first if it is broken or past CONN_MAX_AGE.
+    def call(*args, **kwargs):
+        close_old_connections()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return call
+
+
+async def gather_blocking(*calls):
+    """
+    Run independent blocking ``calls`` (zero-argument callables that may
+    query the database or the cache) concurrently and return their results.
+    """
+    if settings.ASYNC_QUERY_THREADS <= 0:
+        return [await sync_to_async(call)() for call in calls]
+    return await asyncio.gather(
+        *(
+            sync_to_async(
+                _with_connection_lifecycle(call),
+                thread_sensitive=False,
+                executor=_query_pool(),
+            )()
+            for call in calls
+        )
+    )
+
+
+def _atomic(function):
+    if settings.DATABASES["default"].get("ATOMIC_REQUESTS"):
+        return transaction.atomic(function)
+    return function
+
+
+class AsyncViewSetMixin:
+    """
+    Dispatch viewset requests on the event loop. Coroutine actions are
+    awaited; sync actions and the authentication, permission and throttling
+    checks run on the request's sync thread.
+    """
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        sync_view = super().as_view(actions, **initkwargs)
+
+        async def view(request, *args, **kwargs):
+            return await sync_view(request, *args, **kwargs)
+
+        view.__dict__.update(
+            (name, value)
+            for name, value in sync_view.__dict__.items()
+            if name != "__wrapped__"
+        )
+        view.__name__ = sync_view.__name__
+        view.__qualname__ = sync_view.__qualname__
+        view.__doc__ = sync_view.__doc__
+        view.__module__ = sync_view.__module__
+        return transaction.non_atomic_requests(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(
+                    self, request.method.lower(), self.http_method_not_allowed
+                )
+            else:
+                handler = self.http_method_not_allowed
+
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(_atomic(handler))(
+                    request, *args, **kwargs
+                )
+        except Exception as exc:  # noqa: BLE001
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def paginated_response(self, queryset, *concurrent):
+        """
+        Return the paginated response for ``queryset``, fetching and
+        serializing the page while it is counted. The results of the extra
+        ``concurrent`` calls, run alongside, are returned after the response.
+        """
+        paginator = self.paginator
+        page_size = paginator.get_page_size(self.request) if paginator else None
+        number = self.request.query_params.get(
+            getattr(paginator, "page_query_param", "page"), 1
+        )
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = None
+
+        def serialize(rows):
+            return self.get_serializer(rows, many=True).data
+
+        if page_size is None or number is None or number < 1:
+            # No pagination, or a page reference ("last", garbage) that the
+            # paginator resolves or rejects itself.
+            def respond():
+                page = self.paginate_queryset(queryset)
+                if page is None:
+                    return Response(serialize(queryset))
+                return self.get_paginated_response(serialize(page))
+
+            response, *extra = await gather_blocking(respond, *concurrent)
+            return (response, *extra)
+
+        def fetch_page():
+            bottom = (number - 1) * page_size
+            rows = list(queryset[bottom : bottom + page_size])
+            return rows, serialize(rows)
+
+        count, (rows, data), *extra = await gather_blocking(
+            queryset.count, fetch_page, *concurrent
+        )
+
+        django_paginator = paginator.django_paginator_class(queryset, page_size)
+        django_paginator.count = count
+        try:
+            django_paginator.validate_number(number)
+        except InvalidPage as exc:
+            raise NotFound(
+                paginator.invalid_page_message.format(
+                    page_number=number, message=str(exc)
+                )
+            ) from exc
+        paginator.page = Page(rows, number, django_paginator)
+        paginator.request = self.request
+        if paginator.template is not None and django_paginator.num_pages > 1:
+            paginator.display_page_controls = True
+        return (self.get_paginated_response(data), *extra)
+
+
+class AsyncRestaurantViewSet(AsyncViewSetMixin, RestaurantViewSet):
+    @action(detail=False, methods=["GET"], permission_classes=[IsAuthenticated])
+    @cache_response(
+        "restaurants-persona",
+        bypass_params=("suggest", "is_favorite"),
+        vary=lambda request: (get_personalization(request).persona,),
+    )
+    async def persona_recommendations(self, request):
+        context, queryset = await gather_blocking(
+            lambda: get_personalization(request),
+            lambda: self.filter_queryset(self.get_queryset()),
+        )
+
+        persona = context.persona
+        if persona == Persona.ESCAPIST:
+            queryset = queryset.order_by("-adventure_rating", "-rating")
+        elif persona == Persona.LEARNER:
+            queryset = queryset.order_by("-cultural_significance", "-rating")
+        elif persona == Persona.PLANNER:
+            queryset = queryset.filter(planning_friendly=True).order_by(
+                "-rating", "price_level"
+            )
+        elif persona == Persona.DREAMER:
+            queryset = queryset.filter(instagram_worthy=True).order_by(
+                "-instagram_worthiness", "-rating"
+            )
+
+        (response,) = await self.paginated_response(queryset)
+        return response
+
+    @action(detail=False, methods=["GET"], permission_classes=[IsAuthenticated])
+    async def search(self, request):
+        queryset = await sync_to_async(
+            lambda: self.filter_queryset(self.get_queryset())
+        )()
+        if FACETS_PARAM not in request.query_params:
+            (response,) = await self.paginated_response(queryset)
+            return response
+
+        response, facets = await self.paginated_response(
+            queryset, lambda: get_facets(request, queryset)
+        )
+        if facets is not None and isinstance(response.data, dict):
+            response.data["facets"] = facets
+        return response
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
+    @cache_response("restaurants-nearest", coordinate_params=("lat", "lon"))
+    async def nearest(self, request):
+        lat = request.query_params.get("lat")
+        lon = request.query_params.get("lon")
+
+        if not lat or not lon:
+            return Response(
+                {"error": "Latitude and longitude are required"}, status=400
+            )
+
+        # Coordinates are rounded so that nearby callers share a cache entry.
+        user_location = Point(round_coordinate(lon), round_coordinate(lat), srid=4326)
+
+        queryset = (
+            Restaurant.objects.with_stats()
+            .annotate(distance=Distance("location", user_location))
+            .order_by("distance")
+        )
+        (response,) = await self.paginated_response(queryset)
+        return response
+
+
+class AsyncUserRestaurantInteractionViewSet(
+    AsyncViewSetMixin, UserRestaurantInteractionViewSet
+):
+    async def _aupsert_single(self, request, changes):
+        return await sync_to_async(transaction.atomic(self._upsert_single))(
+            request, changes
+        )
+
+    @action(detail=False, methods=["post"])
+    async def like_restaurant(self, request):
+        return await self._aupsert_single(request, {"liked": True})
+
+    @action(detail=False, methods=["post"])
+    async def unlike_restaurant(self, request):
+        return await self._aupsert_single(request, {"liked": False})
+
+    @action(detail=False, methods=["post"])
+    async def mark_visited(self, request):
+        return await self._aupsert_single(request, {"visited": True})
+
+    @action(detail=False, methods=["post"])
+    async def rate_restaurant(self, request):
+        rating = request.data.get("rating")
+        if not request.data.get("restaurant_id") or rating is None:
+            return Response(
+                {"error": "restaurant_id and rating are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            rating = int(rating)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Invalid rating value"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if rating < 1 or rating > 5:  # noqa: PLR2004
+            return Response(
+                {"error": "Rating must be between 1 and 5"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return await self._aupsert_single(request, {"user_rating": rating})
@@ -1,8 +1,26 @@
 # authenbite/restaurants/api/filters.py
 
+from django.conf import settings
+from django.db.models import Q
 from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
 
 from authenbite.restaurants.models import Restaurant
+from authenbite.restaurants.models import UserRestaurantInteraction
+from authenbite.restaurants.personalization import get_personalization
+from authenbite.restaurants.ranking import hybrid_rank
+from authenbite.restaurants.search import fuzzy_search
+from authenbite.restaurants.search import order_by_scores
+from authenbite.restaurants.search import search_restaurants
+from authenbite.restaurants.search import text_search_restaurants
+from authenbite.restaurants.write_behind import pending_values
+
+CONTAINS = "contains"
+FULLTEXT = "fulltext"
+FUZZY = "fuzzy"
+TEXT = "text"
+HYBRID = "hybrid"
 
 
 class RestaurantFilter(filters.FilterSet):
@@ -10,19 +28,32 @@ class RestaurantFilter(filters.FilterSet):
     is_favorite = filters.BooleanFilter(method="filter_is_favorite")
     min_rating = filters.NumberFilter(field_name="rating", lookup_expr="gte")
     max_price = filters.NumberFilter(field_name="price_level", lookup_expr="lte")
+    min_likes = filters.NumberFilter(field_name="stats__like_count", lookup_expr="gte")
+    min_user_rating = filters.NumberFilter(
+        field_name="stats__average_user_rating", lookup_expr="gte"
+    )
 
     class Meta:
         model = Restaurant
         fields = ["name", "is_favorite", "price_level", "rating"]
 
     def filter_is_favorite(self, queryset, name, value):
-        user = self.request.user
-        if user.is_authenticated and value:
+        # The export command filters without a request.
+        user = getattr(self.request, "user", None)
+        if user is None or not user.is_authenticated or not value:
+            return queryset
+        if not settings.INTERACTION_WRITE_BEHIND:
             return queryset.filter(
                 userrestaurantinteraction__user=user,
                 userrestaurantinteraction__liked=True,
             )
-        return queryset
+        # The user's queued likes and unlikes count before they are flushed.
+        pending = pending_values(user.pk, "liked")
+        liked = UserRestaurantInteraction.objects.filter(user=user, liked=True)
+        return queryset.filter(
+            Q(pk__in=liked.values("restaurant_id"))
+            | Q(pk__in=[pk for pk, value in pending.items() if value])
+        ).exclude(pk__in=[pk for pk, value in pending.items() if not value])
 
     def filter_queryset(self, queryset):
         for name, value in self.form.cleaned_data.items():
@@ -68,4 +99,106 @@ class RestaurantFilter(filters.FilterSet):
                     "type": "integer",
                 },
             },
+            {
+                "name": "min_likes",
+                "required": False,
+                "in": "query",
+                "description": "Filter by minimum number of likes",
+                "schema": {
+                    "type": "integer",
+                },
+            },
+            {
+                "name": "min_user_rating",
+                "required": False,
+                "in": "query",
+                "description": "Filter by minimum average user rating",
+                "schema": {
+                    "type": "number",
+                },
+            },
         ]
+
+
+class ModeSearchFilter(SearchFilter):
+    """
+    ``SearchFilter`` with a ``mode`` query parameter; ``mode=fuzzy`` matches
+    misspelt names by trigram similarity.
+    """
+
+    mode_param = "mode"
+    modes = (CONTAINS, FUZZY)
+    fuzzy_field = "name"
+
+    def get_search_mode(self, request):
+        mode = request.query_params.get(self.mode_param, self.modes[0])
+        if mode not in self.modes:
+            raise ValidationError(
+                {self.mode_param: f"Must be one of {', '.join(self.modes)}."}
+            )
+        return mode
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "").strip()
+        if not text:
+            return queryset
+        if self.get_search_mode(request) == FUZZY:
+            return fuzzy_search(queryset, self.fuzzy_field, text)
+        return self.search(request, queryset, view, text)
+
+    def search(self, request, queryset, view, text):
+        return super().filter_queryset(request, queryset, view)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                "name": self.mode_param,
+                "required": False,
+                "in": "query",
+                "description": f"Search mode: {', '.join(self.modes)}",
+                "schema": {"type": "string", "enum": list(self.modes)},
+            },
+        ]
+
+
+class RestaurantSearchFilter(ModeSearchFilter):
+    """
+    ``?search=`` backed by the ``search_vector`` full-text index, ordered by
+    ``ts_rank`` unless an explicit ``ordering`` is requested.
+    """
+
+    modes = (FULLTEXT, FUZZY, TEXT, HYBRID)
+
+    def search(self, request, queryset, view, text):
+        mode = self.get_search_mode(request)
+        if mode == TEXT:
+            return text_search_restaurants(queryset, text)
+        if mode == HYBRID:
+            lat, lon = self.get_location(request)
+            context = get_personalization(request)
+            ranked = hybrid_rank(
+                queryset,
+                text,
+                persona=context.persona if context else None,
+                lat=lat,
+                lon=lon,
+            )
+            return order_by_scores(queryset, ranked, "hybrid_score")
+        return search_restaurants(queryset, text)
+
+    def get_location(self, request):
+        lat = request.query_params.get("lat")
+        lon = request.query_params.get("lon")
+        if bool(lat) != bool(lon):
+            raise ValidationError(
+                {"lat": "Latitude and longitude must be given together."}
+            )
+        if not lat:
+            return None, None
+        try:
+            return float(lat), float(lon)
+        except ValueError:
+            raise ValidationError(
+                {"lat": "Latitude and longitude must be numbers."}
+            ) from None
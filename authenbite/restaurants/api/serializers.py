@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import Distance
 from rest_framework import serializers
 
+from authenbite.observability.stats import TimedSerializerMixin
 from authenbite.restaurants.models import (
     Cuisine,
     Restaurant,
@@ -10,16 +12,23 @@ from authenbite.restaurants.models import (
 )
 
 
-class CuisineSerializer(serializers.ModelSerializer):
+class CuisineSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Cuisine
         fields = ["id", "name"]
 
 
-class RestaurantSerializer(serializers.ModelSerializer):
+class RestaurantSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     distance = serializers.SerializerMethodField()
     opening_hours_formatted = serializers.SerializerMethodField()
     is_open = serializers.SerializerMethodField()
+    # Annotated by RestaurantQuerySet.with_stats().
+    like_count = serializers.IntegerField(read_only=True)
+    visit_count = serializers.IntegerField(read_only=True)
+    rating_count = serializers.IntegerField(read_only=True)
+    average_user_rating = serializers.DecimalField(
+        max_digits=3, decimal_places=2, read_only=True
+    )
 
     class Meta:
         model = Restaurant
@@ -41,6 +50,10 @@ class RestaurantSerializer(serializers.ModelSerializer):
             "opening_hours_formatted",
             "is_open",
             "vegan_options",
+            "like_count",
+            "visit_count",
+            "rating_count",
+            "average_user_rating",
         ]
 
     def get_distance(self, obj):
@@ -128,7 +141,7 @@ class RestaurantSerializer(serializers.ModelSerializer):
             return None
 
 
-class UserPreferenceSerializer(serializers.ModelSerializer):
+class UserPreferenceSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     favorite_cuisines = CuisineSerializer(many=True, read_only=True)
 
     class Meta:
@@ -142,7 +155,9 @@ class UserPreferenceSerializer(serializers.ModelSerializer):
         ]
 
 
-class UserRestaurantInteractionSerializer(serializers.ModelSerializer):
+class UserRestaurantInteractionSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = UserRestaurantInteraction
         fields = [
@@ -155,3 +170,33 @@ class UserRestaurantInteractionSerializer(serializers.ModelSerializer):
             "interaction_date",
         ]
         read_only_fields = ["user", "interaction_date"]
+
+
+class InteractionOperationSerializer(serializers.Serializer):
+    restaurant_id = serializers.IntegerField()
+    liked = serializers.BooleanField(required=False, allow_null=True)
+    visited = serializers.BooleanField(required=False)
+    rating = serializers.IntegerField(
+        required=False, allow_null=True, min_value=1, max_value=5
+    )
+
+    def validate(self, attrs):
+        if len(attrs) == 1:
+            raise serializers.ValidationError(
+                "At least one of liked, visited or rating is required."
+            )
+        if "rating" in attrs:
+            attrs["user_rating"] = attrs.pop("rating")
+        return attrs
+
+
+class InteractionBatchSerializer(serializers.Serializer):
+    operations = InteractionOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, value):
+        if len(value) > settings.INTERACTION_BATCH_MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f"At most {settings.INTERACTION_BATCH_MAX_OPERATIONS} operations "
+                "are allowed per batch."
+            )
+        return value
@@ -1,29 +1,66 @@
+from django.conf import settings
 from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.geos import Point
+from django.db.models import Count
 from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, mixins, status, viewsets
+from rest_framework import filters
+from rest_framework import mixins
+from rest_framework import status
+from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from authenbite.restaurants import autocomplete
+from authenbite.restaurants import popularity
+from authenbite.restaurants import reference
+from authenbite.restaurants import trending
+from authenbite.restaurants.api.filters import HYBRID
+from authenbite.restaurants.api.filters import ModeSearchFilter
 from authenbite.restaurants.api.filters import RestaurantFilter
-from authenbite.restaurants.api.serializers import (
-    CuisineSerializer,
-    RestaurantSerializer,
-    UserPreferenceSerializer,
-    UserRestaurantInteractionSerializer,
-)
-from authenbite.restaurants.models import (
-    Cuisine,
-    Restaurant,
-    UserPreference,
-    UserRestaurantInteraction,
-)
+from authenbite.restaurants.api.filters import RestaurantSearchFilter
+from authenbite.restaurants.api.serializers import CuisineSerializer
+from authenbite.restaurants.api.serializers import InteractionBatchSerializer
+from authenbite.restaurants.api.serializers import RestaurantSerializer
+from authenbite.restaurants.api.serializers import UserPreferenceSerializer
+from authenbite.restaurants.api.serializers import UserRestaurantInteractionSerializer
+from authenbite.restaurants.cache import cache_response
+from authenbite.restaurants.cache import round_coordinate
+from authenbite.restaurants.export import EXPORT_FORMATS
+from authenbite.restaurants.export import NDJSON
+from authenbite.restaurants.export import stream_restaurants
+from authenbite.restaurants.facets import FACETS_PARAM
+from authenbite.restaurants.facets import get_facets
+from authenbite.restaurants.interactions import coalesce_operations
+from authenbite.restaurants.interactions import find_missing_restaurants
+from authenbite.restaurants.interactions import record_interaction_change
+from authenbite.restaurants.interactions import upsert_interactions
+from authenbite.restaurants.models import Cuisine
+from authenbite.restaurants.models import Restaurant
+from authenbite.restaurants.models import UserPreference
+from authenbite.restaurants.models import UserRestaurantInteraction
+from authenbite.restaurants.personalization import get_personalization
+from authenbite.restaurants.stats import interaction_state
+from authenbite.restaurants.write_behind import enqueue_interaction_changes
+from authenbite.restaurants.write_behind import overlay_pending
 from authenbite.users.models import Persona
 
 
+def hybrid_persona(request):
+    """
+    Vary cached restaurant lists on the user's persona when ``mode=hybrid``
+    ranks them by it.
+    """
+    if request.query_params.get(RestaurantSearchFilter.mode_param) != HYBRID:
+        return ()
+    context = get_personalization(request)
+    return (context.persona if context else None,)
+
+
 class RestaurantViewSet(
     mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
 ):
@@ -31,18 +68,25 @@ class RestaurantViewSet(
     serializer_class = RestaurantSerializer
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
+        RestaurantSearchFilter,
         filters.OrderingFilter,
     ]
     queryset = Restaurant.objects.all()
     pagination_class = PageNumberPagination
     filterset_class = RestaurantFilter
-    search_fields = ["name", "address"]
-    ordering_fields = ["name", "rating", "price_level", "distance"]
+    ordering_fields = [
+        "name",
+        "rating",
+        "price_level",
+        "distance",
+        "like_count",
+        "visit_count",
+        "rating_count",
+        "average_user_rating",
+    ]
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        user = self.request.user
+        queryset = super().get_queryset().with_stats()
         lat = self.request.query_params.get("lat")
         lon = self.request.query_params.get("lon")
 
@@ -51,51 +95,80 @@ class RestaurantViewSet(
             queryset = queryset.annotate(distance=Distance("location", user_location))
 
         suggest = self.request.query_params.get("suggest", "").lower() == "true"
-        if suggest and user.is_authenticated:
-            preferences, created = UserPreference.objects.get_or_create(user=user)
-
+        context = get_personalization(self.request) if suggest else None
+        if context is not None:
             filter_conditions = Q()
-            if preferences.favorite_cuisines.exists():
-                filter_conditions |= Q(cuisines__in=preferences.favorite_cuisines.all())
-            if preferences.preferred_price_level:
-                filter_conditions |= Q(
-                    price_level__lte=preferences.preferred_price_level
-                )
-            if preferences.preferred_rating:
-                filter_conditions |= Q(rating__gte=preferences.preferred_rating)
+            if context.favorite_cuisine_ids:
+                filter_conditions |= Q(cuisines__in=context.favorite_cuisine_ids)
+            if context.preferred_price_level:
+                filter_conditions |= Q(price_level__lte=context.preferred_price_level)
+            if context.preferred_rating:
+                filter_conditions |= Q(rating__gte=context.preferred_rating)
 
             queryset = (
                 queryset.filter(filter_conditions)
-                .exclude(
-                    userrestaurantinteraction__user=user,
-                    userrestaurantinteraction__liked=False,
-                )
+                .exclude(pk__in=context.excluded_restaurant_ids)
                 .distinct()
             )
 
             # Persona-based filtering
-            if user.profile.persona:
-                persona = user.profile.persona
-                if persona.name == Persona.ESCAPIST:
-                    queryset = queryset.filter(adventure_rating__gte=7).order_by(
-                        "-adventure_rating", "-rating"
-                    )
-                elif persona.name == Persona.LEARNER:
-                    queryset = queryset.filter(cultural_significance__gte=7).order_by(
-                        "-cultural_significance", "-rating"
-                    )
-                elif persona.name == Persona.PLANNER:
-                    queryset = queryset.filter(planning_friendly=True).order_by(
-                        "-rating", "price_level"
-                    )
-                elif persona.name == Persona.DREAMER:
-                    queryset = queryset.filter(instagram_worthy=True).order_by(
-                        "-instagram_worthiness", "-rating"
-                    )
+            if context.persona == Persona.ESCAPIST:
+                queryset = queryset.filter(adventure_rating__gte=7).order_by(
+                    "-adventure_rating", "-rating"
+                )
+            elif context.persona == Persona.LEARNER:
+                queryset = queryset.filter(cultural_significance__gte=7).order_by(
+                    "-cultural_significance", "-rating"
+                )
+            elif context.persona == Persona.PLANNER:
+                queryset = queryset.filter(planning_friendly=True).order_by(
+                    "-rating", "price_level"
+                )
+            elif context.persona == Persona.DREAMER:
+                queryset = queryset.filter(instagram_worthy=True).order_by(
+                    "-instagram_worthiness", "-rating"
+                )
 
         return queryset
 
+    @cache_response(
+        "restaurants-list",
+        coordinate_params=("lat", "lon"),
+        bypass_params=("suggest", "is_favorite"),
+        vary=hybrid_persona,
+    )
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = Response(serializer.data)
+        return self.add_facets(request, response, queryset)
+
+    def add_facets(self, request, response, queryset):
+        """
+        Attach ``?facets=`` counts for ``queryset``, the filtered queryset the
+        response was built from, to ``response``. Unpaginated results are
+        moved under ``results`` to make room for them.
+        """
+        if FACETS_PARAM not in request.query_params:
+            return response
+        facets = get_facets(request, queryset)
+        if facets is not None:
+            if isinstance(response.data, list):
+                response.data = {"results": response.data}
+            response.data["facets"] = facets
+        return response
+
     @action(detail=False, methods=["GET"], permission_classes=[IsAuthenticated])
+    @cache_response(
+        "restaurants-persona",
+        bypass_params=("suggest", "is_favorite"),
+        vary=lambda request: (get_personalization(request).persona,),
+    )
     def persona_recommendations(self, request):
         user = request.user
         if not user.is_authenticated:
@@ -105,21 +178,20 @@ class RestaurantViewSet(
             )
 
         queryset = self.filter_queryset(self.get_queryset())
-        persona = user.profile.persona
-
-        if persona:
-            if persona.name == Persona.ESCAPIST:
-                queryset = queryset.order_by("-adventure_rating", "-rating")
-            elif persona.name == Persona.LEARNER:
-                queryset = queryset.order_by("-cultural_significance", "-rating")
-            elif persona.name == Persona.PLANNER:
-                queryset = queryset.filter(planning_friendly=True).order_by(
-                    "-rating", "price_level"
-                )
-            elif persona.name == Persona.DREAMER:
-                queryset = queryset.filter(instagram_worthy=True).order_by(
-                    "-instagram_worthiness", "-rating"
-                )
+        persona = get_personalization(request).persona
+
+        if persona == Persona.ESCAPIST:
+            queryset = queryset.order_by("-adventure_rating", "-rating")
+        elif persona == Persona.LEARNER:
+            queryset = queryset.order_by("-cultural_significance", "-rating")
+        elif persona == Persona.PLANNER:
+            queryset = queryset.filter(planning_friendly=True).order_by(
+                "-rating", "price_level"
+            )
+        elif persona == Persona.DREAMER:
+            queryset = queryset.filter(instagram_worthy=True).order_by(
+                "-instagram_worthiness", "-rating"
+            )
 
         # Apply pagination
         page = self.paginate_queryset(queryset)
@@ -134,15 +206,17 @@ class RestaurantViewSet(
     @action(detail=False, methods=["GET"], permission_classes=[IsAuthenticated])
     def search(self, request):
         queryset = self.filter_queryset(self.get_queryset())
-        queryset = self.paginate_queryset(queryset)
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(queryset, many=True)
-        return self.get_paginated_response(serializer.data)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = Response(serializer.data)
+        return self.add_facets(request, response, queryset)
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
+    @cache_response("restaurants-nearest", coordinate_params=("lat", "lon"))
     def nearest(self, request):
         lat = request.query_params.get("lat")
         lon = request.query_params.get("lon")
@@ -152,11 +226,14 @@ class RestaurantViewSet(
                 {"error": "Latitude and longitude are required"}, status=400
             )
 
-        user_location = Point(float(lon), float(lat), srid=4326)
+        # Coordinates are rounded so that nearby callers share a cache entry.
+        user_location = Point(round_coordinate(lon), round_coordinate(lat), srid=4326)
 
-        queryset = Restaurant.objects.annotate(
-            distance=Distance("location", user_location)
-        ).order_by("distance")
+        queryset = (
+            Restaurant.objects.with_stats()
+            .annotate(distance=Distance("location", user_location))
+            .order_by("distance")
+        )
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -165,23 +242,189 @@ class RestaurantViewSet(
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"])
+    def popular(self, request):
+        window = request.query_params.get("window")
+        if window is not None and window not in popularity.WINDOWS:
+            return Response(
+                {"error": f"window must be one of {', '.join(popularity.WINDOWS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        ranked = popularity.top(
+            popularity.RESTAURANTS, settings.POPULAR_RESTAURANTS_LIMIT, window
+        )
+        scores = dict(ranked)
+        restaurants, _ = self.get_queryset().fetch_in_order([pk for pk, _ in ranked])
+        serializer = self.get_serializer(restaurants, many=True)
+        return Response(
+            [{**item, "score": scores[item["id"]]} for item in serializer.data]
+        )
+
+    @action(detail=False, methods=["get"])
+    def trending(self, request):
+        window = request.query_params.get("window", trending.DEFAULT_WINDOW)
+        if window not in trending.WINDOWS:
+            return Response(
+                {"error": f"window must be one of {', '.join(trending.WINDOWS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        lat = request.query_params.get("lat")
+        lon = request.query_params.get("lon")
+        if bool(lat) != bool(lon):
+            return Response(
+                {"error": "Latitude and longitude must be given together"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            lat = float(lat) if lat else None
+            lon = float(lon) if lon else None
+        except ValueError:
+            return Response(
+                {"error": "Latitude and longitude must be numbers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        ranked = trending.top_trending(
+            window, settings.TRENDING_RESTAURANTS_LIMIT, lon=lon, lat=lat
+        )
+        scores = dict(ranked)
+        restaurants, _ = self.get_queryset().fetch_in_order([pk for pk, _ in ranked])
+        serializer = self.get_serializer(restaurants, many=True)
+        return Response(
+            [{**item, "score": scores[item["id"]]} for item in serializer.data]
+        )
+
+    @action(detail=False, methods=["get"])
+    def bulk(self, request):
+        raw_ids = request.query_params.get("ids", "")
+        try:
+            ids = list(
+                dict.fromkeys(int(pk) for pk in raw_ids.split(",") if pk.strip())
+            )
+        except ValueError:
+            return Response(
+                {"error": "ids must be a comma-separated list of integers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not ids:
+            return Response(
+                {"error": "ids is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > settings.RESTAURANT_BULK_MAX_IDS:
+            return Response(
+                {"error": f"At most {settings.RESTAURANT_BULK_MAX_IDS} ids allowed"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = self.get_queryset().prefetch_related("cuisines")
+        restaurants, missing = queryset.fetch_in_order(ids)
+        serializer = self.get_serializer(restaurants, many=True)
+        return Response({"results": serializer.data, "missing": missing})
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        export_format = request.query_params.get("export_format", NDJSON)
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"export_format must be one of {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            stream_restaurants(queryset, export_format),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="restaurants.{export_format}"'
+        )
+        return response
+
 
 class CuisineViewSet(
     mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
 ):
     queryset = Cuisine.objects.all()
     serializer_class = CuisineSerializer
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    filter_backends = [ModeSearchFilter, DjangoFilterBackend]
     search_fields = ["name"]
     filterset_fields = ["name"]
 
+    @cache_response("cuisines-list")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     @action(detail=False, methods=["get"])
     def popular(self, request):
-        # This is a placeholder for a "popular cuisines" feature
-        # You might implement this based on the number of restaurants or user preferences
-        popular_cuisines = self.get_queryset().order_by("?")[:5]  # Random 5 for now
-        serializer = self.get_serializer(popular_cuisines, many=True)
-        return Response(serializer.data)
+        window = request.query_params.get("window")
+        if window is not None and window not in popularity.WINDOWS:
+            return Response(
+                {"error": f"window must be one of {', '.join(popularity.WINDOWS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        limit = settings.POPULAR_CUISINES_LIMIT
+        ranked = popularity.top(popularity.CUISINES, limit, window)
+        if ranked:
+            cuisines = self.get_queryset().in_bulk([pk for pk, _ in ranked])
+            ranked = [(cuisines[pk], score) for pk, score in ranked if pk in cuisines]
+        else:
+            # Nothing recorded yet: fall back to the most common cuisines.
+            ranked = [
+                (cuisine, 0)
+                for cuisine in self.get_queryset()
+                .annotate(restaurant_count=Count("restaurant"))
+                .order_by("-restaurant_count", "name")[:limit]
+            ]
+
+        serializer = self.get_serializer([cuisine for cuisine, _ in ranked], many=True)
+        return Response(
+            [
+                {**item, "score": score}
+                for item, (_, score) in zip(serializer.data, ranked, strict=True)
+            ]
+        )
+
+
+class AutocompleteViewSet(viewsets.ViewSet):
+    """Prefix suggestions for the search box, served from memory."""
+
+    def list(self, request):
+        text = request.query_params.get("q", "")
+        try:
+            limit = min(
+                int(
+                    request.query_params.get(
+                        "limit", settings.AUTOCOMPLETE_DEFAULT_LIMIT
+                    )
+                ),
+                settings.AUTOCOMPLETE_MAX_LIMIT,
+            )
+            lat = request.query_params.get("lat")
+            lon = request.query_params.get("lon")
+            lat, lon = (float(lat), float(lon)) if lat and lon else (None, None)
+        except ValueError:
+            return Response(
+                {"error": "limit, lat and lon must be numbers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        ranked = autocomplete.get_index().search(text, limit, lat=lat, lon=lon)
+        return Response(
+            {
+                "results": [
+                    {
+                        "type": suggestion.type,
+                        "id": suggestion.id,
+                        "label": suggestion.label,
+                        "score": score,
+                    }
+                    for score, suggestion in ranked
+                ]
+            }
+        )
 
 
 class UserPreferenceViewSet(viewsets.ModelViewSet):
@@ -214,8 +457,9 @@ class UserPreferenceViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["post"])
     def add_favorite_cuisine(self, request):
-        user_preference, created = UserPreference.objects.get_or_create(
-            user=request.user
+        # Locked so that concurrent requests see each other's changes.
+        user_preference, created = (
+            UserPreference.objects.select_for_update().get_or_create(user=request.user)
         )
         cuisine_id = request.data.get("cuisine_id")
 
@@ -224,20 +468,24 @@ class UserPreferenceViewSet(viewsets.ModelViewSet):
                 {"error": "cuisine_id is required"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            cuisine = Cuisine.objects.get(id=cuisine_id)
-            user_preference.favorite_cuisines.add(cuisine)
-            serializer = self.get_serializer(user_preference)
-            return Response(serializer.data)
-        except Cuisine.DoesNotExist:
+        cuisine = reference.cuisines.get(pk=cuisine_id)
+        if cuisine is None:
             return Response(
                 {"error": "Cuisine not found"}, status=status.HTTP_404_NOT_FOUND
             )
+        # add() is idempotent; only a new favourite counts towards popularity.
+        favorites = user_preference.favorite_cuisines
+        if not favorites.filter(pk=cuisine.pk).exists():
+            favorites.add(cuisine)
+            popularity.record_favorite_cuisine(cuisine.pk)
+        serializer = self.get_serializer(user_preference)
+        return Response(serializer.data)
 
     @action(detail=False, methods=["post"])
     def remove_favorite_cuisine(self, request):
-        user_preference, created = UserPreference.objects.get_or_create(
-            user=request.user
+        # Locked so that concurrent requests see each other's changes.
+        user_preference, created = (
+            UserPreference.objects.select_for_update().get_or_create(user=request.user)
         )
         cuisine_id = request.data.get("cuisine_id")
 
@@ -246,15 +494,15 @@ class UserPreferenceViewSet(viewsets.ModelViewSet):
                 {"error": "cuisine_id is required"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            cuisine = Cuisine.objects.get(id=cuisine_id)
-            user_preference.favorite_cuisines.remove(cuisine)
-            serializer = self.get_serializer(user_preference)
-            return Response(serializer.data)
-        except Cuisine.DoesNotExist:
+        cuisine = reference.cuisines.get(pk=cuisine_id)
+        if cuisine is None:
             return Response(
                 {"error": "Cuisine not found"}, status=status.HTTP_404_NOT_FOUND
             )
+        # The favourite's popularity credit is left to decay.
+        user_preference.favorite_cuisines.remove(cuisine)
+        serializer = self.get_serializer(user_preference)
+        return Response(serializer.data)
 
 
 class UserRestaurantInteractionViewSet(viewsets.ModelViewSet):
@@ -266,89 +514,108 @@ class UserRestaurantInteractionViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return UserRestaurantInteraction.objects.filter(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        if not settings.INTERACTION_WRITE_BEHIND:
+            return super().list(request, *args, **kwargs)
+        # Queued changes are not in the database yet, so the overlaid rows are
+        # filtered here instead.
+        filterset = DjangoFilterBackend().get_filterset(
+            request, self.get_queryset(), self
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        conditions = {
+            name: value
+            for name, value in filterset.form.cleaned_data.items()
+            if value is not None
+        }
+        interactions = [
+            interaction
+            for interaction in self._current_interactions()
+            if all(
+                getattr(interaction, name) == value
+                for name, value in conditions.items()
+            )
+        ]
+        page = self.paginate_queryset(interactions)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(interactions, many=True)
+        return Response(serializer.data)
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        interaction = serializer.save(user=self.request.user)
+        record_interaction_change(
+            interaction.restaurant_id, None, interaction_state(interaction)
+        )
 
-    @action(detail=False, methods=["post"])
-    def like_restaurant(self, request):
+    def perform_update(self, serializer):
+        restaurant_id = serializer.instance.restaurant_id
+        before = interaction_state(serializer.instance)
+        interaction = serializer.save()
+        if interaction.restaurant_id != restaurant_id:
+            record_interaction_change(restaurant_id, before, None)
+            before = None
+        record_interaction_change(
+            interaction.restaurant_id, before, interaction_state(interaction)
+        )
+
+    def perform_destroy(self, instance):
+        restaurant_id = instance.restaurant_id
+        before = interaction_state(instance)
+        instance.delete()
+        record_interaction_change(restaurant_id, before, None)
+
+    def _upsert_single(self, request, changes):
         restaurant_id = request.data.get("restaurant_id")
         if not restaurant_id:
             return Response(
                 {"error": "restaurant_id is required"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-
         try:
-            restaurant = Restaurant.objects.get(id=restaurant_id)
-            interaction, created = UserRestaurantInteraction.objects.get_or_create(
-                user=request.user, restaurant=restaurant, defaults={"liked": True}
-            )
-            if not created:
-                interaction.liked = True
-                interaction.save()
-            serializer = self.get_serializer(interaction)
-            return Response(serializer.data)
-        except Restaurant.DoesNotExist:
+            restaurant_id = int(restaurant_id)
+        except (TypeError, ValueError):
             return Response(
-                {"error": "Restaurant not found"}, status=status.HTTP_404_NOT_FOUND
+                {"error": "Invalid restaurant_id"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-    @action(detail=False, methods=["post"])
-    def unlike_restaurant(self, request):
-        restaurant_id = request.data.get("restaurant_id")
-        if not restaurant_id:
+        if find_missing_restaurants([restaurant_id]):
             return Response(
-                {"error": "restaurant_id is required"},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"error": "Restaurant not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        try:
-            restaurant = Restaurant.objects.get(id=restaurant_id)
-            interaction = UserRestaurantInteraction.objects.get(
-                user=request.user, restaurant=restaurant
+        if settings.INTERACTION_WRITE_BEHIND:
+            enqueue_interaction_changes(request.user.pk, {restaurant_id: changes})
+            (interaction,) = overlay_pending(
+                request.user,
+                self.get_queryset().filter(restaurant_id=restaurant_id),
+                {restaurant_id},
             )
-            interaction.liked = False
-            interaction.save()
             serializer = self.get_serializer(interaction)
-            return Response(serializer.data)
-        except Restaurant.DoesNotExist:
-            return Response(
-                {"error": "Restaurant not found"}, status=status.HTTP_404_NOT_FOUND
-            )
-        except UserRestaurantInteraction.DoesNotExist:
-            return Response(
-                {"error": "Interaction not found"}, status=status.HTTP_404_NOT_FOUND
-            )
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+        interaction = upsert_interactions(request.user, {restaurant_id: changes}).get()
+        serializer = self.get_serializer(interaction)
+        return Response(serializer.data)
 
     @action(detail=False, methods=["post"])
-    def mark_visited(self, request):
-        restaurant_id = request.data.get("restaurant_id")
-        if not restaurant_id:
-            return Response(
-                {"error": "restaurant_id is required"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+    def like_restaurant(self, request):
+        return self._upsert_single(request, {"liked": True})
 
-        try:
-            restaurant = Restaurant.objects.get(id=restaurant_id)
-            interaction, created = UserRestaurantInteraction.objects.get_or_create(
-                user=request.user, restaurant=restaurant, defaults={"visited": True}
-            )
-            if not created:
-                interaction.visited = True
-                interaction.save()
-            serializer = self.get_serializer(interaction)
-            return Response(serializer.data)
-        except Restaurant.DoesNotExist:
-            return Response(
-                {"error": "Restaurant not found"}, status=status.HTTP_404_NOT_FOUND
-            )
+    @action(detail=False, methods=["post"])
+    def unlike_restaurant(self, request):
+        return self._upsert_single(request, {"liked": False})
+
+    @action(detail=False, methods=["post"])
+    def mark_visited(self, request):
+        return self._upsert_single(request, {"visited": True})
 
     @action(detail=False, methods=["post"])
     def rate_restaurant(self, request):
-        restaurant_id = request.data.get("restaurant_id")
         rating = request.data.get("rating")
-        if not restaurant_id or rating is None:
+        if not request.data.get("restaurant_id") or rating is None:
             return Response(
                 {"error": "restaurant_id and rating are required"},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -356,40 +623,75 @@ class UserRestaurantInteractionViewSet(viewsets.ModelViewSet):
 
         try:
             rating = int(rating)
-            if rating < 1 or rating > 5:
-                return Response(
-                    {"error": "Rating must be between 1 and 5"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            restaurant = Restaurant.objects.get(id=restaurant_id)
-            interaction, created = UserRestaurantInteraction.objects.get_or_create(
-                user=request.user,
-                restaurant=restaurant,
-                defaults={"user_rating": rating},
-            )
-            if not created:
-                interaction.user_rating = rating
-                interaction.save()
-            serializer = self.get_serializer(interaction)
-            return Response(serializer.data)
-        except Restaurant.DoesNotExist:
+        except (TypeError, ValueError):
             return Response(
-                {"error": "Restaurant not found"}, status=status.HTTP_404_NOT_FOUND
+                {"error": "Invalid rating value"}, status=status.HTTP_400_BAD_REQUEST
             )
-        except ValueError:
+        if rating < 1 or rating > 5:
             return Response(
-                {"error": "Invalid rating value"}, status=status.HTTP_400_BAD_REQUEST
+                {"error": "Rating must be between 1 and 5"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
+        return self._upsert_single(request, {"user_rating": rating})
+
+    @action(detail=False, methods=["post"], serializer_class=InteractionBatchSerializer)
+    def batch(self, request):
+        batch_serializer = self.get_serializer(data=request.data)
+        batch_serializer.is_valid(raise_exception=True)
+
+        changes_by_restaurant = coalesce_operations(
+            batch_serializer.validated_data["operations"]
+        )
+        missing = find_missing_restaurants(list(changes_by_restaurant))
+        for restaurant_id in missing:
+            del changes_by_restaurant[restaurant_id]
+
+        response_status = status.HTTP_200_OK
+        if not changes_by_restaurant:
+            interactions = UserRestaurantInteraction.objects.none()
+        elif settings.INTERACTION_WRITE_BEHIND:
+            enqueue_interaction_changes(request.user.pk, changes_by_restaurant)
+            interactions = overlay_pending(
+                request.user,
+                self.get_queryset().filter(restaurant_id__in=changes_by_restaurant),
+                set(changes_by_restaurant),
+            )
+            response_status = status.HTTP_202_ACCEPTED
+        else:
+            interactions = upsert_interactions(request.user, changes_by_restaurant)
+
+        serializer = UserRestaurantInteractionSerializer(
+            interactions, many=True, context=self.get_serializer_context()
+        )
+        return Response(
+            {"results": serializer.data, "missing": missing}, status=response_status
+        )
+
+    def _current_interactions(self):
+        # Without write-behind the queryset is returned as is so that it can
+        # still be filtered in the database.
+        interactions = self.get_queryset()
+        if settings.INTERACTION_WRITE_BEHIND:
+            interactions = overlay_pending(self.request.user, interactions)
+        return interactions
+
     @action(detail=False, methods=["get"])
     def liked_restaurants(self, request):
-        liked_interactions = self.get_queryset().filter(liked=True)
+        interactions = self._current_interactions()
+        if isinstance(interactions, list):
+            liked_interactions = [i for i in interactions if i.liked]
+        else:
+            liked_interactions = interactions.filter(liked=True)
         serializer = self.get_serializer(liked_interactions, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
     def visited_restaurants(self, request):
-        visited_interactions = self.get_queryset().filter(visited=True)
+        interactions = self._current_interactions()
+        if isinstance(interactions, list):
+            visited_interactions = [i for i in interactions if i.visited]
+        else:
+            visited_interactions = interactions.filter(visited=True)
         serializer = self.get_serializer(visited_interactions, many=True)
         return Response(serializer.data)
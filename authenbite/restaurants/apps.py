@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RestaurantsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "authenbite.restaurants"
+
+    def ready(self):
+        import authenbite.restaurants.signals  # noqa: F401
@@ -0,0 +1,348 @@
+"""
+Per-process autocomplete over restaurant and cuisine names.
+
+Every word-start suffix of a normalized name ("ichiran ramen", "ramen") is
+kept in one sorted list, so a prefix lookup is a ``bisect`` plus a walk over
+the matching range. Candidates are ranked by a static weight (rating and
+popularity) and, when a location is given, a distance bonus. Prefixes that
+match too many keys to scan keep their best candidates, merged from those of
+their one-letter-longer children, so a lookup never walks more than
+``AUTOCOMPLETE_SCAN_LIMIT`` keys. A change only drops the lists along the
+changed keys' prefixes.
+
+Queries never touch Postgres. The catalog outbox relay
+(:mod:`authenbite.restaurants.outbox`) appends the ids of changed rows to a
+Redis stream; each process reads the stream from where it left off at most
+every ``AUTOCOMPLETE_REFRESH_INTERVAL`` seconds and reloads only those rows.
+The whole index is rebuilt every ``AUTOCOMPLETE_REBUILD_INTERVAL`` seconds to
+pick up new popularity scores, or when too many changes have piled up.
+Refreshes run on a background thread while requests keep using the current
+index; a rebuilt index replaces it in one assignment. The first index is
+built by the warm-up (:mod:`config.warmup`); until then lookups find nothing.
+"""
+
+import bisect
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+
+from authenbite.restaurants import popularity
+from authenbite.restaurants.models import Cuisine
+from authenbite.restaurants.models import Restaurant
+from authenbite.restaurants.store import decode
+from authenbite.restaurants.store import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+RESTAURANT = "restaurant"
+CUISINE = "cuisine"
+
+CHANGES_STREAM_KEY = "catalog:changes"
+# Entries kept in the change stream. A process that falls further behind
+# than this rebuilds its index from scratch.
+CHANGES_STREAM_MAXLEN = 10_000
+
+EARTH_RADIUS_KM = 6371.0
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    """Casefold, strip accents and collapse punctuation into single spaces."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+def _saturate(value, pivot):
+    return value / (value + pivot) if value > 0 else 0.0
+
+
+def _by_weight(suggestion):
+    return suggestion.weight
+
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    type: str
+    id: int
+    label: str
+    weight: float
+    lat: float | None = None
+    lon: float | None = None
+
+    @property
+    def keys(self):
+        words = normalize(self.label).split()
+        return {" ".join(words[start:]) for start in range(len(words))}
+
+
+def load_restaurants(ids=None):
+    queryset = Restaurant.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    rows = list(queryset.values_list("pk", "name", "rating", "location"))
+    scores = popularity.scores(popularity.RESTAURANTS, [row[0] for row in rows])
+    weights = settings.AUTOCOMPLETE_WEIGHTS
+    pivot = settings.AUTOCOMPLETE_POPULARITY_PIVOT
+    return [
+        Suggestion(
+            type=RESTAURANT,
+            id=pk,
+            label=name,
+            weight=weights["rating"] * float(rating or 0) / 5
+            + weights["popularity"] * _saturate(scores[pk], pivot),
+            lat=location.y if location else None,
+            lon=location.x if location else None,
+        )
+        for pk, name, rating, location in rows
+    ]
+
+
+def load_cuisines(ids=None):
+    queryset = Cuisine.objects.annotate(restaurant_count=Count("restaurant"))
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    rows = list(queryset.values_list("pk", "name", "restaurant_count"))
+    scores = popularity.scores(popularity.CUISINES, [row[0] for row in rows])
+    weights = settings.AUTOCOMPLETE_WEIGHTS
+    pivot = settings.AUTOCOMPLETE_POPULARITY_PIVOT
+    return [
+        Suggestion(
+            type=CUISINE,
+            id=pk,
+            label=name,
+            # Cuisines have no rating of their own; how many restaurants
+            # serve them stands in for it.
+            weight=weights["rating"] * _saturate(restaurant_count, pivot)
+            + weights["popularity"] * _saturate(scores[pk], pivot),
+        )
+        for pk, name, restaurant_count in rows
+    ]
+
+
+class AutocompleteIndex:
+    def __init__(self, suggestions=()):
+        self._lock = threading.RLock()
+        self._suggestions = {}
+        # Best candidates per prefix, for prefixes matching more than
+        # AUTOCOMPLETE_SCAN_LIMIT keys.
+        self._top = {}
+        entries = []
+        for suggestion in suggestions:
+            self._suggestions[suggestion.type, suggestion.id] = suggestion
+            entries += [
+                (key, suggestion.type, suggestion.id) for key in suggestion.keys
+            ]
+        self._keys = sorted(entries)
+        with self._lock:
+            self._candidates("", 0, len(self._keys))
+
+    def __len__(self):
+        return len(self._suggestions)
+
+    def suggestions(self):
+        return list(self._suggestions.values())
+
+    def replace(self, kind, ids, suggestions):
+        """Drop the ``kind`` entries for ``ids`` and add ``suggestions``."""
+        with self._lock:
+            changed_keys = set()
+            for pk in ids:
+                old = self._suggestions.pop((kind, pk), None)
+                if old is not None:
+                    for key in old.keys:
+                        entry = (key, kind, pk)
+                        index = bisect.bisect_left(self._keys, entry)
+                        if index < len(self._keys) and self._keys[index] == entry:
+                            del self._keys[index]
+                        changed_keys.add(key)
+            for suggestion in suggestions:
+                self._suggestions[suggestion.type, suggestion.id] = suggestion
+                for key in suggestion.keys:
+                    bisect.insort(self._keys, (key, suggestion.type, suggestion.id))
+                    changed_keys.add(key)
+            # Only the prefixes of changed keys need new candidates; they are
+            # recomputed on next use from their children, which are intact.
+            for key in changed_keys:
+                for length in range(len(key) + 1):
+                    self._top.pop(key[:length], None)
+
+    def _range(self, prefix):
+        # Normalized keys only contain [0-9a-z ], all of which sort before
+        # "~", so (prefix + "~",) bounds every key starting with prefix.
+        return (
+            bisect.bisect_left(self._keys, (prefix,)),
+            bisect.bisect_left(self._keys, (prefix + "~",)),
+        )
+
+    def _candidates(self, prefix, start, end):
+        """Best ``AUTOCOMPLETE_CANDIDATES`` suggestions for keys[start:end]."""
+        count = settings.AUTOCOMPLETE_CANDIDATES
+        keys = self._keys
+        if end - start <= settings.AUTOCOMPLETE_SCAN_LIMIT:
+            matches = {
+                (kind, pk): self._suggestions[kind, pk]
+                for _, kind, pk in keys[start:end]
+            }
+            return heapq.nlargest(count, matches.values(), key=_by_weight)
+
+        top = self._top.get(prefix)
+        if top is not None:
+            return top
+
+        depth = len(prefix)
+        matches = {}
+        position = start
+        # A key equal to the prefix sorts before any longer key.
+        while position < end and len(keys[position][0]) == depth:
+            _, kind, pk = keys[position]
+            matches[kind, pk] = self._suggestions[kind, pk]
+            position += 1
+        while position < end:
+            child = prefix + keys[position][0][depth]
+            child_end = bisect.bisect_left(keys, (child + "~",), position, end)
+            for suggestion in self._candidates(child, position, child_end):
+                matches[suggestion.type, suggestion.id] = suggestion
+            position = child_end
+        top = heapq.nlargest(count, matches.values(), key=_by_weight)
+        self._top[prefix] = top
+        return top
+
+    def search(self, text, limit, lat=None, lon=None):
+        prefix = normalize(text)
+        if not prefix:
+            return []
+
+        with self._lock:
+            candidates = self._candidates(prefix, *self._range(prefix))
+
+        if lat is None or lon is None:
+            ranked = [(suggestion.weight, suggestion) for suggestion in candidates]
+        else:
+            bias = settings.AUTOCOMPLETE_WEIGHTS["distance"]
+            scale = settings.AUTOCOMPLETE_DISTANCE_SCALE_KM
+            ranked = []
+            for suggestion in candidates:
+                score = suggestion.weight
+                if suggestion.lat is not None:
+                    distance = _distance_km(lat, lon, suggestion.lat, suggestion.lon)
+                    score += bias * math.exp(-distance / scale)
+                ranked.append((score, suggestion))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return ranked[:limit]
+
+
+class _State:
+    # Guards starting a refresh; at most one runs at a time.
+    lock = threading.Lock()
+    index = None
+    built_at = 0.0
+    checked_at = 0.0
+    last_change_id = "0-0"
+    refreshing = False
+    thread = None
+
+
+_EMPTY_INDEX = AutocompleteIndex()
+
+
+def last_change_id(client):
+    """Return the id of the newest entry in the change stream."""
+    entries = client.xrevrange(CHANGES_STREAM_KEY, count=1)
+    return decode(entries[0][0]) if entries else "0-0"
+
+
+def build_index():
+    """Load a fresh index for this process from the database."""
+    # Read the stream position first so that changes committed while the
+    # rows are loading are applied again on the next refresh.
+    change_id = last_change_id(get_redis_client())
+    index = AutocompleteIndex(load_restaurants() + load_cuisines())
+    _State.index = index
+    _State.built_at = _State.checked_at = time.monotonic()
+    _State.last_change_id = change_id
+    return index
+
+
+def _apply_changes():
+    threshold = settings.AUTOCOMPLETE_REBUILD_THRESHOLD
+    entries = get_redis_client().xrange(
+        CHANGES_STREAM_KEY, min=f"({_State.last_change_id}", count=threshold
+    )
+    if len(entries) >= threshold:
+        build_index()
+        return
+
+    changed = {RESTAURANT: set(), CUISINE: set()}
+    for entry_id, raw_fields in entries:
+        fields = {decode(key): decode(value) for key, value in raw_fields.items()}
+        changed[fields["kind"]].update(map(int, fields["ids"].split(",")))
+        _State.last_change_id = decode(entry_id)
+    for kind, loader in ((RESTAURANT, load_restaurants), (CUISINE, load_cuisines)):
+        if changed[kind]:
+            _State.index.replace(kind, changed[kind], loader(changed[kind]))
+
+
+def refresh_index():
+    """Rebuild this process's index when due, or apply the pending changes."""
+    try:
+        if _State.index is None or (
+            time.monotonic() - _State.built_at >= settings.AUTOCOMPLETE_REBUILD_INTERVAL
+        ):
+            build_index()
+        else:
+            _apply_changes()
+    except Exception:
+        logger.exception("Autocomplete index refresh failed")
+    finally:
+        _State.refreshing = False
+
+
+def _refresh_in_background():
+    try:
+        refresh_index()
+    finally:
+        connections.close_all()
+
+
+def get_index():
+    """
+    Return this process's index, starting a refresh first when one is due.
+    The refresh does not hold up the caller unless
+    ``AUTOCOMPLETE_BACKGROUND_REFRESH`` is off.
+    """
+    now = time.monotonic()
+    if now - _State.checked_at >= settings.AUTOCOMPLETE_REFRESH_INTERVAL:
+        with _State.lock:
+            start = not _State.refreshing
+            if start:
+                _State.refreshing = True
+                _State.checked_at = now
+        if start and settings.AUTOCOMPLETE_BACKGROUND_REFRESH:
+            _State.thread = threading.Thread(
+                target=_refresh_in_background, name="autocomplete-refresh"
+            )
+            _State.thread.daemon = True
+            _State.thread.start()
+        elif start:
+            refresh_index()
+    return _EMPTY_INDEX if _State.index is None else _State.index
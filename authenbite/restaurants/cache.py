@@ -0,0 +1,202 @@
+import contextlib
+import gzip
+import hashlib
+import time
+from functools import wraps
+from inspect import iscoroutinefunction
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from authenbite.observability.stats import record_cache_lookup
+from authenbite.restaurants.singleflight import MISS
+from authenbite.restaurants.singleflight import get_or_compute
+
+CATALOG_NAMESPACE = "catalog"
+PERSONA_NAMESPACE = "personas"
+CUISINE_NAMESPACE = "cuisines"
+
+CACHE_STATUS_HEADER = "X-Response-Cache"
+
+
+def _version_key(namespace):
+    return f"response-cache:version:{namespace}"
+
+
+def get_cache_version(namespace):
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Seed with a clock value rather than 1 so an evicted version key can
+        # never resurrect entries written under an earlier counter.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(namespace):
+    key = _version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+        return cache.get(key)
+
+
+def bump_cache_version_on_commit(namespace):
+    transaction.on_commit(lambda: bump_cache_version(namespace))
+
+
+def round_coordinate(value, precision=None):
+    if precision is None:
+        precision = settings.RESPONSE_CACHE_COORDINATE_PRECISION
+    return round(float(value), precision)
+
+
+def normalize_query_params(query_params, coordinate_params=()):
+    items = []
+    for name in sorted(query_params):
+        values = sorted(value for value in query_params.getlist(name) if value != "")
+        if not values:
+            continue
+        if name in coordinate_params:
+            with contextlib.suppress(ValueError):
+                values = [str(round_coordinate(value)) for value in values]
+        items.append((name, values))
+    return urlencode(items, doseq=True)
+
+
+def cache_versions(namespaces):
+    return ".".join(str(get_cache_version(namespace)) for namespace in namespaces)
+
+
+def build_cache_key(request, endpoint, coordinate_params=(), vary=()):
+    # Namespace versions are stored in the entry rather than the key, so a
+    # version bump leaves the old entry in place to be served while stale.
+    parts = [
+        request.scheme,
+        request.get_host(),
+        request.path,
+        normalize_query_params(request.query_params, coordinate_params),
+        request.accepted_media_type,
+        *(str(value) for value in vary),
+    ]
+    digest = hashlib.sha1("\n".join(parts).encode()).hexdigest()  # noqa: S324
+    return f"response-cache:{endpoint}:{digest}"
+
+
+def _is_cacheable(request, bypass_params):
+    if not settings.RESPONSE_CACHE_ENABLED or request.method != "GET":
+        return False
+    if getattr(request.accepted_renderer, "format", None) != "json":
+        return False
+    return not any(request.query_params.get(name) for name in bypass_params)
+
+
+def _render_entry(view, request, response):
+    response.accepted_renderer = request.accepted_renderer
+    response.accepted_media_type = request.accepted_media_type
+    response.renderer_context = view.get_renderer_context()
+    response.render()
+
+    content = bytes(response.content)
+    compressed = None
+    if (
+        settings.RESPONSE_CACHE_COMPRESS
+        and len(content) >= settings.RESPONSE_CACHE_COMPRESS_MIN_BYTES
+    ):
+        compressed = gzip.compress(content, compresslevel=6)
+    return {
+        "content": content,
+        "gzip": compressed,
+        "content_type": response["Content-Type"],
+    }
+
+
+def _response_from_entry(request, entry):
+    accepts_gzip = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+    if entry["gzip"] is not None and accepts_gzip:
+        response = HttpResponse(entry["gzip"], content_type=entry["content_type"])
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(entry["content"], content_type=entry["content_type"])
+    if entry["gzip"] is not None:
+        patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+def cache_response(
+    endpoint,
+    namespaces=(CATALOG_NAMESPACE,),
+    coordinate_params=(),
+    bypass_params=(),
+    vary=None,
+):
+    """
+    Cache the rendered body of a viewset action.
+
+    Entries are keyed on the normalized query string (plus ``vary(request)``
+    when given) and record the current version of every namespace in
+    ``namespaces``, so bumping a namespace version retires all of its entries
+    at once. Expired and retired entries are refreshed through
+    :mod:`~authenbite.restaurants.singleflight`: one request recomputes while
+    concurrent ones are served the stale body. Requests carrying any of
+    ``bypass_params`` (typically per-user filters) always go to the view.
+
+    Coroutine actions are supported: the cache lookup, which may wait on
+    another process's refresh, runs on the request's sync thread and awaits
+    the action on the event loop when it has to be computed.
+    """
+
+    def decorator(view_method):
+        if iscoroutinefunction(view_method):
+            sync_wrapper = decorator(async_to_sync(view_method))
+
+            @wraps(view_method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                return await sync_to_async(sync_wrapper)(self, request, *args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if not _is_cacheable(request, bypass_params):
+                return view_method(self, request, *args, **kwargs)
+
+            key = build_cache_key(
+                request, endpoint, coordinate_params, vary(request) if vary else ()
+            )
+            computed = []
+
+            def compute():
+                response = view_method(self, request, *args, **kwargs)
+                computed.append(response)
+                if response.status_code != 200:  # noqa: PLR2004
+                    return None
+                return _render_entry(self, request, response)
+
+            entry, status = get_or_compute(
+                key,
+                compute,
+                settings.RESPONSE_CACHE_TTLS[endpoint],
+                version=cache_versions(namespaces),
+            )
+            record_cache_lookup("response", (MISS if computed else status).lower())
+            if computed:
+                response = computed[-1]
+                if entry is not None:
+                    response[CACHE_STATUS_HEADER] = MISS
+                return response
+            response = _response_from_entry(request, entry)
+            response[CACHE_STATUS_HEADER] = status
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,106 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+NDJSON = "ndjson"
+CSV = "csv"
+EXPORT_FORMATS = {
+    NDJSON: "application/x-ndjson",
+    CSV: "text/csv",
+}
+
+EXPORT_FIELDS = [
+    "id",
+    "name",
+    "address",
+    "latitude",
+    "longitude",
+    "phone_number",
+    "website",
+    "rating",
+    "price_level",
+    "cuisines",
+    "vegan_options",
+    "main_image_url",
+    "opening_hours",
+    "created_at",
+    "updated_at",
+]
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the value back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def restaurant_to_row(restaurant):
+    return {
+        "id": restaurant.id,
+        "name": restaurant.name,
+        "address": restaurant.address,
+        "latitude": restaurant.latitude,
+        "longitude": restaurant.longitude,
+        "phone_number": restaurant.phone_number,
+        "website": restaurant.website,
+        "rating": restaurant.rating,
+        "price_level": restaurant.price_level,
+        "cuisines": [cuisine.name for cuisine in restaurant.cuisines.all()],
+        "vegan_options": restaurant.vegan_options,
+        "main_image_url": restaurant.main_image_url,
+        "opening_hours": restaurant.opening_hours,
+        "created_at": restaurant.created_at,
+        "updated_at": restaurant.updated_at,
+    }
+
+
+def iter_restaurant_rows(queryset, chunk_size=None):
+    """
+    Yield export rows from a server-side cursor.
+
+    Only ``chunk_size`` restaurants (and their prefetched cuisines) are held in
+    memory at a time, whatever the size of the catalog.
+    """
+    chunk_size = chunk_size or settings.RESTAURANT_EXPORT_CHUNK_SIZE
+    if not queryset.ordered:
+        queryset = queryset.order_by("pk")
+    queryset = queryset.prefetch_related("cuisines")
+    for restaurant in queryset.iterator(chunk_size=chunk_size):
+        yield restaurant_to_row(restaurant)
+
+
+def _batched(lines, size):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        row["cuisines"] = ";".join(row["cuisines"])
+        if row["opening_hours"] is not None:
+            row["opening_hours"] = json.dumps(row["opening_hours"])
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def stream_restaurants(queryset, export_format=NDJSON, chunk_size=None):
+    """Yield the export as text, grouping lines so each write carries a chunk."""
+    chunk_size = chunk_size or settings.RESTAURANT_EXPORT_CHUNK_SIZE
+    rows = iter_restaurant_rows(queryset, chunk_size)
+    lines = _csv_lines(rows) if export_format == CSV else _ndjson_lines(rows)
+    return _batched(lines, chunk_size)
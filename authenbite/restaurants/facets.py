@@ -0,0 +1,177 @@
+"""
+Facet counts for restaurant listings.
+
+All requested facets are counted in one statement: the filtered queryset is
+embedded as a subquery and grouped with ``GROUPING SETS``, one set per facet.
+Results are cached per catalog version and normalized filter set.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from authenbite.restaurants.api.filters import HYBRID
+from authenbite.restaurants.cache import CATALOG_NAMESPACE
+from authenbite.restaurants.cache import get_cache_version
+from authenbite.restaurants.cache import normalize_query_params
+from authenbite.restaurants.models import Cuisine
+from authenbite.restaurants.models import Restaurant
+
+FACETS_PARAM = "facets"
+
+CUISINE = "cuisine"
+PRICE_LEVEL = "price_level"
+VEGAN_OPTIONS = "vegan_options"
+RATING = "rating"
+OPEN_NOW = "open_now"
+
+# facet -> (grouping columns, of which the first is the value)
+FACET_COLUMNS = {
+    CUISINE: ("cuisine.id", "cuisine.name"),
+    PRICE_LEVEL: ("matched.price_level",),
+    VEGAN_OPTIONS: ("matched.vegan_options",),
+    RATING: ("matched.rating_bucket",),
+    OPEN_NOW: ("matched.open_now",),
+}
+
+# Parameters that do not change which restaurants match.
+NON_FILTER_PARAMS = {"page", "page_size", "ordering", "format", FACETS_PARAM}
+# Filters whose result depends on the requesting user.
+USER_FILTER_PARAMS = {"suggest", "is_favorite"}
+# Coordinates only annotate distances, except in hybrid search where they
+# pick candidates.
+COORDINATE_PARAMS = {"lat", "lon"}
+
+RESTAURANT_TABLE = Restaurant._meta.db_table
+CUISINE_TABLE = Cuisine._meta.db_table
+RESTAURANT_CUISINE_TABLE = Restaurant.cuisines.through._meta.db_table
+
+
+def requested_facets(request):
+    """Return the facet names asked for in ``?facets=a,b``, validated."""
+    value = request.query_params.get(FACETS_PARAM, "")
+    names = sorted({name.strip() for name in value.split(",") if name.strip()})
+    unknown = [name for name in names if name not in FACET_COLUMNS]
+    if unknown:
+        raise ValidationError(
+            {
+                FACETS_PARAM: f"Unknown facets: {', '.join(unknown)}. "
+                f"Choose from {', '.join(FACET_COLUMNS)}."
+            }
+        )
+    return names
+
+
+def facet_cache_key(request, names):
+    params = request.query_params.copy()
+    ignored = set(NON_FILTER_PARAMS)
+    if params.get("mode") != HYBRID:
+        ignored |= COORDINATE_PARAMS
+    for name in ignored:
+        params.pop(name, None)
+    parts = [normalize_query_params(params), ",".join(names)]
+    if USER_FILTER_PARAMS & set(params) and request.user.is_authenticated:
+        parts.append(f"user={request.user.pk}")
+    if OPEN_NOW in names:
+        parts.append(timezone.localtime().strftime("%A %H:%M"))
+    digest = hashlib.sha1("\n".join(parts).encode()).hexdigest()  # noqa: S324
+    return f"facets:{get_cache_version(CATALOG_NAMESPACE)}:{digest}"
+
+
+def count_facets(queryset, names):
+    """
+    Count the restaurants of ``queryset`` per value of each facet in
+    ``names`` in a single query.
+    """
+    subquery, subquery_params = queryset.order_by().values("pk").query.sql_with_params()
+    now = timezone.localtime()
+    day_name = now.strftime("%A")
+    minutes = now.hour * 60 + now.minute
+
+    joins = ""
+    count = "COUNT(*)"
+    if CUISINE in names:
+        joins = f"""
+            LEFT JOIN {RESTAURANT_CUISINE_TABLE} AS link
+                ON link.restaurant_id = matched.id
+            LEFT JOIN {CUISINE_TABLE} AS cuisine ON cuisine.id = link.cuisine_id
+        """
+        # The cuisine join repeats restaurants for the other facets.
+        count = "COUNT(DISTINCT matched.id)"
+
+    groupings = [f"GROUPING({FACET_COLUMNS[name][0]})" for name in names]
+    columns = [column for name in names for column in FACET_COLUMNS[name]]
+    sets = [f"({', '.join(FACET_COLUMNS[name])})" for name in names]
+    sql = f"""
+        WITH matched AS (
+            SELECT
+                restaurant.id,
+                restaurant.price_level,
+                restaurant.vegan_options,
+                FLOOR(restaurant.rating)::int AS rating_bucket,
+                COALESCE(
+                    (restaurant.opening_hours -> %s ->> 0)::int <= %s
+                    AND (restaurant.opening_hours -> %s ->> 1)::int > %s,
+                    false
+                ) AS open_now
+            FROM {RESTAURANT_TABLE} AS restaurant
+            WHERE restaurant.id IN ({subquery})
+        )
+        SELECT {", ".join(groupings)}, {", ".join(columns)}, {count}
+        FROM matched {joins}
+        GROUP BY GROUPING SETS ({", ".join(sets)})
+    """  # noqa: S608
+    params = [day_name, minutes, day_name, minutes, *subquery_params]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    facets = {name: [] for name in names}
+    for row in rows:
+        flags, values, total = row[: len(names)], row[len(names) : -1], row[-1]
+        position = 0
+        for name, flag in zip(names, flags, strict=True):
+            width = len(FACET_COLUMNS[name])
+            if flag == 0:
+                value = values[position]
+                if name == CUISINE:
+                    if value is not None:
+                        facets[name].append(
+                            {
+                                "value": value,
+                                "label": values[position + 1],
+                                "count": total,
+                            }
+                        )
+                else:
+                    facets[name].append({"value": value, "count": total})
+            position += width
+
+    for name, buckets in facets.items():
+        if name == CUISINE:
+            buckets.sort(key=lambda bucket: (-bucket["count"], bucket["label"]))
+        else:
+            buckets.sort(key=lambda bucket: (bucket["value"] is None, bucket["value"]))
+    return facets
+
+
+def get_facets(request, queryset):
+    """
+    Return the facet counts requested by ``request`` for ``queryset``, or
+    ``None`` when none were requested.
+    """
+    names = requested_facets(request)
+    if not names:
+        return None
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return count_facets(queryset, names)
+    key = facet_cache_key(request, names)
+    facets = cache.get(key)
+    if facets is None:
+        facets = count_facets(queryset, names)
+        cache.set(key, facets, timeout=settings.FACETS_CACHE_TTL)
+    return facets
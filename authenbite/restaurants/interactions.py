@@ -0,0 +1,154 @@
+from collections import defaultdict
+
+from django.db import connection
+from django.db import transaction
+from django.db.models import Q
+
+from authenbite.restaurants.models import Restaurant
+from authenbite.restaurants.models import UserRestaurantInteraction
+from authenbite.restaurants.personalization import invalidate_personalization
+from authenbite.restaurants.popularity import record_interaction_popularity
+from authenbite.restaurants.stats import apply_stats_deltas
+from authenbite.restaurants.stats import collect_changes
+from authenbite.restaurants.stats import collect_deltas
+from authenbite.restaurants.store import write_after_commit
+from authenbite.restaurants.trending import record_interaction_trending
+
+INTERACTION_FIELDS = ("liked", "visited", "user_rating")
+
+
+def coalesce_operations(operations):
+    """
+    Merge operations into ``{restaurant_id: {field: value}}``.
+
+    Later operations on the same restaurant win field by field, so
+    ``like`` followed by ``rate`` becomes a single row change.
+    """
+    changes_by_restaurant = {}
+    for operation in operations:
+        changes = changes_by_restaurant.setdefault(operation["restaurant_id"], {})
+        changes.update(
+            {
+                field: operation[field]
+                for field in INTERACTION_FIELDS
+                if field in operation
+            }
+        )
+    return changes_by_restaurant
+
+
+def find_missing_restaurants(restaurant_ids):
+    existing = set(
+        Restaurant.objects.filter(pk__in=restaurant_ids).values_list("pk", flat=True)
+    )
+    return sorted(set(restaurant_ids) - existing)
+
+
+def upsert_interaction_changes(changes):
+    """
+    Write ``{(user_id, restaurant_id): {field: value}}`` with
+    ``INSERT ... ON CONFLICT (user_id, restaurant_id) DO UPDATE``.
+
+    Only the fields present in a change are overwritten on conflict, so rows
+    are grouped by the set of fields they carry and each group is one
+    statement. The users and rows are locked first so that the matching
+    ``RestaurantStats`` deltas are computed from their previous values.
+    Restaurant ids must already have been validated.
+    """
+    if not changes:
+        return
+
+    with transaction.atomic():
+        _lock_users({user_id for user_id, _ in changes})
+        existing = _lock_existing(changes)
+        _bulk_upsert(changes)
+        apply_interaction_changes(collect_changes(changes, existing))
+        # bulk_create sends no signals; likes feed the personalization context.
+        for user_id in {
+            user_id for (user_id, _), fields in changes.items() if "liked" in fields
+        }:
+            invalidate_personalization(user_id)
+
+
+def apply_interaction_changes(changes):
+    """
+    Propagate ``[(restaurant_id, before, after)]`` interaction states to
+    everything derived from interactions: ``RestaurantStats`` in the current
+    transaction and the Redis popularity and trending counters once it
+    commits.
+    """
+    deltas = collect_deltas(changes)
+    apply_stats_deltas(deltas)
+    write_after_commit(record_interaction_popularity, changes)
+    write_after_commit(record_interaction_trending, deltas)
+
+
+def record_interaction_change(restaurant_id, before, after):
+    apply_interaction_changes([(restaurant_id, before, after)])
+
+
+def _lock_users(user_ids):
+    # Row locks cannot cover interactions that do not exist yet, so two first
+    # writes of the same row would both see no previous state and count it
+    # twice. A transaction-level advisory lock per user serializes them; ids
+    # are locked in order so that concurrent batches cannot deadlock.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(user_id) FROM "
+            "(SELECT unnest(%s::bigint[]) AS user_id ORDER BY 1) AS users",
+            [sorted(user_ids)],
+        )
+
+
+def _lock_existing(changes):
+    restaurants_by_user = defaultdict(list)
+    for user_id, restaurant_id in changes:
+        restaurants_by_user[user_id].append(restaurant_id)
+    condition = Q()
+    for user_id, restaurant_ids in restaurants_by_user.items():
+        condition |= Q(user_id=user_id, restaurant_id__in=restaurant_ids)
+
+    rows = (
+        UserRestaurantInteraction.objects.select_for_update()
+        .filter(condition)
+        .order_by("user_id", "restaurant_id")
+        .values(
+            "user_id",
+            "restaurant_id",
+            "liked",
+            "visited",
+            "user_rating",
+            "interaction_date",
+        )
+    )
+    return {(row.pop("user_id"), row.pop("restaurant_id")): row for row in rows}
+
+
+def _bulk_upsert(changes):
+    groups = defaultdict(list)
+    for (user_id, restaurant_id), fields in changes.items():
+        groups[tuple(sorted(fields))].append(
+            UserRestaurantInteraction(
+                user_id=user_id, restaurant_id=restaurant_id, **fields
+            )
+        )
+
+    for fields, interactions in groups.items():
+        UserRestaurantInteraction.objects.bulk_create(
+            interactions,
+            update_conflicts=True,
+            unique_fields=["user", "restaurant"],
+            update_fields=[*fields, "interaction_date"],
+        )
+
+
+def upsert_interactions(user, changes_by_restaurant):
+    upsert_interaction_changes(
+        {
+            (user.pk, restaurant_id): changes
+            for restaurant_id, changes in changes_by_restaurant.items()
+        }
+    )
+    return UserRestaurantInteraction.objects.filter(
+        user=user, restaurant_id__in=list(changes_by_restaurant)
+    )
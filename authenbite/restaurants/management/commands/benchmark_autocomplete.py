@@ -0,0 +1,65 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from authenbite.restaurants.autocomplete import build_index
+from authenbite.restaurants.autocomplete import normalize
+
+
+class Command(BaseCommand):
+    help = "Build this process's autocomplete index and measure lookup latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=10_000)
+        parser.add_argument("--limit", type=int, default=8)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--near",
+            nargs=2,
+            type=float,
+            metavar=("LAT", "LON"),
+            help="Bias every lookup towards this location",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        lat, lon = options["near"] or (None, None)
+
+        started = time.perf_counter()
+        index = build_index()
+        self.stdout.write(
+            f"Indexed {len(index)} suggestions in "
+            f"{time.perf_counter() - started:.2f} s"
+        )
+
+        labels = [normalize(suggestion.label) for suggestion in index.suggestions()]
+        labels = [label for label in labels if label]
+        if not labels:
+            self.stdout.write(self.style.WARNING("Nothing to search"))
+            return
+
+        prefixes = []
+        for _ in range(options["queries"]):
+            label = rng.choice(labels)
+            prefixes.append(label[: rng.randint(1, len(label))])
+
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for prefix in prefixes:
+                started = time.perf_counter()
+                index.search(prefix, options["limit"], lat=lat, lon=lon)
+                timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        quantiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(timings)} lookups, {len(queries)} SQL queries: "
+                f"p50 {quantiles[49]:.3f} ms, p95 {quantiles[94]:.3f} ms, "
+                f"p99 {quantiles[98]:.3f} ms, max {timings[-1]:.3f} ms"
+            )
+        )
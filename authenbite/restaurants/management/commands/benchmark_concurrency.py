@@ -0,0 +1,217 @@
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+MODES = {
+    "sync": {
+        "GUNICORN_APP": "config.wsgi:application",
+        "GUNICORN_WORKER_CLASS": "sync",
+        "DJANGO_ASYNC_API_VIEWS": "False",
+    },
+    "async": {
+        "GUNICORN_APP": "config.asgi:application",
+        "GUNICORN_WORKER_CLASS": "uvicorn_worker.UvicornWorker",
+        "DJANGO_ASYNC_API_VIEWS": "True",
+    },
+}
+
+
+def process_tree(pid):
+    pids = [pid]
+    for child in pids:
+        try:
+            children = Path(f"/proc/{child}/task/{child}/children").read_text()
+        except OSError:
+            continue
+        pids.extend(int(value) for value in children.split())
+    return pids
+
+
+def proportional_set_size(pid):
+    """PSS of ``pid`` in bytes: shared pages are split between their users."""
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        if line.startswith("Pss:"):
+            return int(line.split()[1]) * 1024
+    return 0
+
+
+class Server:
+    def __init__(self, mode, workers, port):
+        self.mode = mode
+        self.workers = workers
+        self.port = port
+        self.process = None
+
+    def __enter__(self):
+        env = {
+            **os.environ,
+            **MODES[self.mode],
+            "GUNICORN_BIND": f"127.0.0.1:{self.port}",
+            "GUNICORN_WORKERS": str(self.workers),
+            "GUNICORN_CHDIR": str(settings.BASE_DIR),
+        }
+        self.process = subprocess.Popen(  # noqa: S603
+            [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "--config",
+                str(settings.BASE_DIR / "config" / "gunicorn.py"),
+            ],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self.wait_until_ready()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait()
+
+    def wait_until_ready(self, timeout=120):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                msg = f"{self.mode} server exited with {self.process.returncode}"
+                raise CommandError(msg)
+            connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=1)
+            try:
+                connection.request("GET", "/readyz")
+                if connection.getresponse().status == 200:  # noqa: PLR2004
+                    if len(process_tree(self.process.pid)) > self.workers:
+                        return
+            except OSError:
+                pass
+            finally:
+                connection.close()
+            time.sleep(0.2)
+        msg = f"{self.mode} server was not ready after {timeout} s"
+        raise CommandError(msg)
+
+    def memory(self):
+        return sum(proportional_set_size(pid) for pid in process_tree(self.process.pid))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync (WSGI) and async (ASGI) servers under concurrent load "
+        "with the same memory budget"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--memory",
+            type=int,
+            default=1024,
+            help="Memory budget per server in MiB (PSS of master and workers)",
+        )
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--duration", type=float, default=20.0)
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Path requested in turn (repeatable; default nearest, "
+            "persona_recommendations and search)",
+        )
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Host header sent with every request (must be allowed)",
+        )
+        parser.add_argument(
+            "--token",
+            default=os.environ.get("BENCHMARK_TOKEN"),
+            help="API token sent with every request",
+        )
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or [
+            "/api/restaurants/nearest/?lat=48.8566&lon=2.3522",
+            "/api/restaurants/persona_recommendations/",
+            "/api/restaurants/search/?search=pizza",
+        ]
+        budget = options["memory"] * 1024 * 1024
+        for mode in MODES:
+            workers = self.workers_for_budget(mode, budget, options["port"])
+            with Server(mode, workers, options["port"]) as server:
+                memory = server.memory()
+                timings, errors, elapsed = self.load(paths, options)
+            self.report(mode, workers, memory, timings, errors, elapsed)
+
+    def workers_for_budget(self, mode, budget, port):
+        with Server(mode, 1, port) as one, Server(mode, 2, port + 1) as two:
+            master = 2 * one.memory() - two.memory()
+            worker = two.memory() - one.memory()
+        return max(1, int((budget - master) // max(worker, 1)))
+
+    def load(self, paths, options):
+        # Requests look like they came through the TLS-terminating proxy, so
+        # that they are not redirected.
+        headers = {"Host": options["host"], "X-Forwarded-Proto": "https"}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+        deadline = time.monotonic() + options["duration"]
+        timings = []
+        errors = []
+        lock = threading.Lock()
+
+        def client(offset):
+            connection = http.client.HTTPConnection("127.0.0.1", options["port"])
+            sent = offset
+            while time.monotonic() < deadline:
+                path = paths[sent % len(paths)]
+                sent += 1
+                started = time.perf_counter()
+                try:
+                    connection.request("GET", path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status < 400  # noqa: PLR2004
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    connection = http.client.HTTPConnection(
+                        "127.0.0.1", options["port"]
+                    )
+                    ok = False
+                with lock:
+                    (timings if ok else errors).append(time.perf_counter() - started)
+            connection.close()
+
+        started = time.monotonic()
+        threads = [
+            threading.Thread(target=client, args=(number,))
+            for number in range(options["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, errors, time.monotonic() - started
+
+    def report(self, mode, workers, memory, timings, errors, elapsed):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{mode}: {workers} workers"))
+        self.stdout.write(f"memory {memory / 1024 / 1024:.0f} MiB")
+        if len(timings) < 2:  # noqa: PLR2004
+            self.stdout.write(self.style.WARNING(f"{len(errors)} errors, no results"))
+            return
+        quantiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(timings) / elapsed:.0f} req/s, {len(errors)} errors: "
+                f"p50 {quantiles[49] * 1000:.1f} ms, "
+                f"p95 {quantiles[94] * 1000:.1f} ms, "
+                f"p99 {quantiles[98] * 1000:.1f} ms"
+            )
+        )
@@ -0,0 +1,123 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db import transaction
+
+from authenbite.restaurants.models import Restaurant
+from authenbite.restaurants.search import fuzzy_search
+
+WORDS = [
+    "golden",
+    "dragon",
+    "olive",
+    "garden",
+    "bistro",
+    "little",
+    "saigon",
+    "trattoria",
+    "noodle",
+    "house",
+    "blue",
+    "lotus",
+    "kitchen",
+    "spice",
+    "harbour",
+    "taqueria",
+    "sakura",
+    "bella",
+    "napoli",
+    "smokehouse",
+    "pho",
+    "crescent",
+    "moon",
+    "corner",
+]
+
+INSERT_SQL = f"""
+    INSERT INTO {Restaurant._meta.db_table} (
+        name, address, created_at, updated_at, adventure_rating,
+        cultural_significance, planning_friendly, instagram_worthy,
+        instagram_worthiness, vegan_options
+    )
+    SELECT
+        initcap(
+            words[1 + floor(random() * cardinality(words))::int] || ' '
+            || words[1 + floor(random() * cardinality(words))::int] || ' '
+            || words[1 + floor(random() * cardinality(words))::int]
+        ) || ' ' || n,
+        n || ' Benchmark Street', NOW(), NOW(), 5, 5, false, false, 5, false
+    FROM generate_series(1, %s) AS n, (SELECT %s::text[] AS words) AS vocabulary
+"""
+
+
+def misspell(name, rng):
+    """Drop, duplicate or swap one letter of ``name``."""
+    position = rng.randrange(1, len(name) - 1)
+    edit = rng.choice(("drop", "double", "swap"))
+    if edit == "drop":
+        return name[:position] + name[position + 1 :]
+    if edit == "double":
+        return name[:position] + name[position] + name[position:]
+    return (
+        name[: position - 1]
+        + name[position]
+        + name[position - 1]
+        + name[position + 1 :]
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure ?mode=fuzzy search latency against generated restaurants. "
+        "The rows are inserted in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            self.stdout.write(f"Inserting {options['rows']} restaurants...")
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT setseed(%s)", [options["seed"] / 2**31])
+                cursor.execute(INSERT_SQL, [options["rows"], WORDS])
+                cursor.execute(f"ANALYZE {Restaurant._meta.db_table}")
+
+            names = [
+                " ".join(rng.sample(WORDS, 3)).title()
+                for _ in range(options["queries"])
+            ]
+            queries = [misspell(name, rng) for name in names]
+
+            queryset = fuzzy_search(Restaurant.objects.all(), "name", queries[0])
+            plan = queryset[: options["limit"]].explain()
+            self.stdout.write(plan)
+
+            timings = []
+            for query in queries:
+                started = time.perf_counter()
+                list(
+                    fuzzy_search(Restaurant.objects.all(), "name", query).values_list(
+                        "pk", flat=True
+                    )[: options["limit"]]
+                )
+                timings.append((time.perf_counter() - started) * 1000)
+
+            transaction.set_rollback(True)
+
+        timings.sort()
+        quantiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(timings)} queries: "
+                f"p50 {quantiles[49]:.1f} ms, p95 {quantiles[94]:.1f} ms, "
+                f"p99 {quantiles[98]:.1f} ms, max {timings[-1]:.1f} ms"
+            )
+        )
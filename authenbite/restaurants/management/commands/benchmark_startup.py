@@ -0,0 +1,107 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from config.warmup import warm_up
+
+STARTED_AT = "BENCHMARK_STARTUP_STARTED_AT"
+
+
+class Command(BaseCommand):
+    help = (
+        "Start fresh processes, cold and warmed up, and measure boot time and "
+        "the latency of their first requests"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Path requested by each process (repeatable; default "
+            "/api/restaurants/ and /api/autocomplete/?q=pi)",
+        )
+        parser.add_argument("--host", default="localhost")
+        parser.add_argument(
+            "--token",
+            default=os.environ.get("BENCHMARK_TOKEN"),
+            help="API token sent with every request",
+        )
+        parser.add_argument("--child", choices=("cold", "warm"), help="(internal)")
+
+    def handle(self, *args, **options):
+        options["paths"] = options["paths"] or [
+            "/api/restaurants/",
+            "/api/autocomplete/?q=pi",
+        ]
+        if options["child"]:
+            self.measure(options)
+            return
+
+        for mode in ("cold", "warm"):
+            runs = [self.spawn(mode, options) for _ in range(options["runs"])]
+            self.stdout.write(self.style.MIGRATE_HEADING(mode))
+            self.report("boot", [run["boot"] for run in runs])
+            if mode == "warm":
+                self.report("warm-up", [run["warm_up"] for run in runs])
+                for step in runs[0]["steps"]:
+                    seconds = [run["steps"][step] for run in runs]
+                    if None not in seconds:
+                        self.report(f"  {step}", seconds)
+            for path in options["paths"]:
+                self.report(f"first {path}", [run["first"][path] for run in runs])
+                self.report(f"second {path}", [run["second"][path] for run in runs])
+
+    def spawn(self, mode, options):
+        command = [
+            sys.executable,
+            sys.argv[0],
+            "benchmark_startup",
+            "--child",
+            mode,
+            "--host",
+            options["host"],
+        ]
+        for path in options["paths"]:
+            command += ["--path", path]
+        env = {**os.environ, STARTED_AT: repr(time.time())}
+        if options["token"]:
+            env["BENCHMARK_TOKEN"] = options["token"]
+        output = subprocess.run(  # noqa: S603
+            command, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def measure(self, options):
+        # Django is set up by the time a command runs, so this covers
+        # interpreter start, imports and app loading.
+        result = {"boot": time.time() - float(os.environ[STARTED_AT])}
+        if options["child"] == "warm":
+            started = time.perf_counter()
+            result["steps"] = warm_up()
+            result["warm_up"] = time.perf_counter() - started
+
+        headers = {}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+        client = Client(headers=headers, SERVER_NAME=options["host"])
+        for attempt in ("first", "second"):
+            result[attempt] = {}
+            for path in options["paths"]:
+                started = time.perf_counter()
+                client.get(path)
+                result[attempt][path] = time.perf_counter() - started
+        self.stdout.write(json.dumps(result))
+
+    def report(self, label, seconds):
+        self.stdout.write(
+            f"{label:<40} median {statistics.median(seconds) * 1000:9.1f} ms  "
+            f"max {max(seconds) * 1000:9.1f} ms"
+        )
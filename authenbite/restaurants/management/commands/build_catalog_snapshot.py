@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from authenbite.restaurants.snapshot import build_catalog_snapshot
+
+
+class Command(BaseCommand):
+    help = "Write the column-oriented catalog snapshot workers map into memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--root",
+            default=None,
+            help="Snapshot directory (default: "
+            f"{settings.CATALOG_SNAPSHOT_ROOT}); run on every host",
+        )
+
+    def handle(self, *args, **options):
+        count, directory = build_catalog_snapshot(options["root"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Snapshotted {count} restaurants to {directory}")
+        )
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from authenbite.restaurants.text_index import build_text_index
+
+
+class Command(BaseCommand):
+    help = "Build the BM25 index over restaurant review summaries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=None,
+            help=f"Index file to write (default: {settings.TEXT_INDEX_PATH})",
+        )
+
+    def handle(self, *args, **options):
+        documents, terms = build_text_index(options["output"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {documents} summaries, {terms} terms")
+        )
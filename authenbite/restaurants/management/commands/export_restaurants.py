@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.http import QueryDict
+
+from authenbite.restaurants.api.filters import RestaurantFilter
+from authenbite.restaurants.export import EXPORT_FORMATS
+from authenbite.restaurants.export import NDJSON
+from authenbite.restaurants.export import stream_restaurants
+from authenbite.restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = "Stream the restaurant catalog as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            dest="export_format",
+            choices=list(EXPORT_FORMATS),
+            default=NDJSON,
+        )
+        parser.add_argument(
+            "--output", type=str, help="File to write to (defaults to stdout)"
+        )
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument(
+            "--filter",
+            action="append",
+            default=[],
+            metavar="NAME=VALUE",
+            help="RestaurantFilter parameter, e.g. --filter min_rating=4",
+        )
+
+    def handle(self, *args, **options):
+        data = QueryDict(mutable=True)
+        for item in options["filter"]:
+            name, sep, value = item.partition("=")
+            if not sep:
+                msg = f"Invalid filter '{item}', expected NAME=VALUE"
+                raise CommandError(msg)
+            data.appendlist(name, value)
+
+        filterset = RestaurantFilter(data=data, queryset=Restaurant.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        chunks = stream_restaurants(
+            filterset.qs, options["export_format"], options["chunk_size"]
+        )
+        if options["output"]:
+            with Path(options["output"]).open("w", newline="") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -3,6 +3,7 @@ import re
 
 from django.contrib.gis.geos import Point
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
 from authenbite.restaurants.models import Cuisine, Restaurant
 
@@ -12,6 +13,12 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("json_file", type=str, help="Path to the JSON file")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Restaurants imported per transaction",
+        )
 
     def handle(self, *args, **options):
         json_file_path = options["json_file"]
@@ -19,62 +26,68 @@ class Command(BaseCommand):
         with open(json_file_path, "r") as file:
             data = json.load(file)
 
-        for restaurant_data in data:
-            try:
-                # Get image URLs
-                image_urls = restaurant_data.get("imageUrls", [])
-                main_image_url = image_urls[0] if image_urls else ""
-
-                # Create or get the restaurant
-                restaurant, created = Restaurant.objects.get_or_create(
-                    name=restaurant_data.get("title", ""),
-                    defaults={
-                        "address": restaurant_data.get("address", ""),
-                        "phone_number": restaurant_data.get("phone", ""),
-                        "website": restaurant_data.get("website", ""),
-                        "rating": restaurant_data.get("totalScore", 0),
-                        "main_image_url": main_image_url,
-                    },
-                )
-
-                offerings = restaurant_data["additionalInfo"].get("Offerings", [])
-                for offering in offerings:
-                    if "Vegan options" in offering:
-                        vegan_options = offering["Vegan options"]
-                        restaurant.vegan_options = vegan_options
-
-                # Set location
-                if "location" in restaurant_data:
-                    lat = restaurant_data["location"].get("lat")
-                    lng = restaurant_data["location"].get("lng")
-                    if lat and lng:
-                        restaurant.location = Point(float(lng), float(lat))
-
-                # Add cuisines
-                if "categories" in restaurant_data:
-                    for category in restaurant_data["categories"]:
-                        cuisine, _ = Cuisine.objects.get_or_create(name=category)
-                        restaurant.cuisines.add(cuisine)
-                restaurant.save()
-
-                # Set opening hours
-                if "openingHours" in restaurant_data:
-                    self.set_opening_hours(restaurant, restaurant_data["openingHours"])
-
-                restaurant.save()
-                self.stdout.write(
-                    self.style.SUCCESS(f"Imported/Updated: {restaurant.name}")
-                )
-
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f"Error importing restaurant {restaurant_data.get('title', '')}: {str(e)}"
-                    )
-                )
+        batch_size = options["batch_size"]
+        for start in range(0, len(data), batch_size):
+            # Each batch commits once, so its catalog changes are relayed
+            # together; a failing restaurant only rolls back its own savepoint.
+            with transaction.atomic():
+                for restaurant_data in data[start : start + batch_size]:
+                    try:
+                        with transaction.atomic():
+                            self.import_restaurant(restaurant_data)
+                    except Exception as e:
+                        self.stdout.write(
+                            self.style.ERROR(
+                                f"Error importing restaurant {restaurant_data.get('title', '')}: {str(e)}"
+                            )
+                        )
 
         self.stdout.write(self.style.SUCCESS("Import completed"))
 
+    def import_restaurant(self, restaurant_data):
+        # Get image URLs
+        image_urls = restaurant_data.get("imageUrls", [])
+        main_image_url = image_urls[0] if image_urls else ""
+
+        # Create or get the restaurant
+        restaurant, created = Restaurant.objects.get_or_create(
+            name=restaurant_data.get("title", ""),
+            defaults={
+                "address": restaurant_data.get("address", ""),
+                "phone_number": restaurant_data.get("phone", ""),
+                "website": restaurant_data.get("website", ""),
+                "rating": restaurant_data.get("totalScore", 0),
+                "main_image_url": main_image_url,
+            },
+        )
+
+        offerings = restaurant_data["additionalInfo"].get("Offerings", [])
+        for offering in offerings:
+            if "Vegan options" in offering:
+                vegan_options = offering["Vegan options"]
+                restaurant.vegan_options = vegan_options
+
+        # Set location
+        if "location" in restaurant_data:
+            lat = restaurant_data["location"].get("lat")
+            lng = restaurant_data["location"].get("lng")
+            if lat and lng:
+                restaurant.location = Point(float(lng), float(lat))
+
+        # Add cuisines
+        if "categories" in restaurant_data:
+            for category in restaurant_data["categories"]:
+                cuisine, _ = Cuisine.objects.get_or_create(name=category)
+                restaurant.cuisines.add(cuisine)
+        restaurant.save()
+
+        # Set opening hours
+        if "openingHours" in restaurant_data:
+            self.set_opening_hours(restaurant, restaurant_data["openingHours"])
+
+        restaurant.save()
+        self.stdout.write(self.style.SUCCESS(f"Imported/Updated: {restaurant.name}"))
+
     def set_opening_hours(self, restaurant, opening_hours):
         formatted_hours = {}
         for day_data in opening_hours:
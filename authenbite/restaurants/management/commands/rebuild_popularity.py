@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from authenbite.restaurants.popularity import rebuild_popularity
+
+
+class Command(BaseCommand):
+    help = "Recompute decayed restaurant and cuisine popularity from interactions"
+
+    def handle(self, *args, **options):
+        rebuild_popularity()
+        self.stdout.write(self.style.SUCCESS("Popularity rebuilt"))
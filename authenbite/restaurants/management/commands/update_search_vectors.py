@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from authenbite.restaurants.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = "Recompute the full-text search document of every restaurant"
+
+    def handle(self, *args, **options):
+        update_search_vectors()
+        self.stdout.write(self.style.SUCCESS("Search vectors updated"))
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.14 on 2026-10-19 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BACKFILL_SQL = """
+INSERT INTO restaurants_restaurantstats (
+    restaurant_id, like_count, visit_count, rating_count, rating_sum,
+    average_user_rating, updated_at
+)
+SELECT
+    restaurant_id,
+    COUNT(*) FILTER (WHERE liked),
+    COUNT(*) FILTER (WHERE visited),
+    COUNT(user_rating),
+    COALESCE(SUM(user_rating), 0),
+    AVG(user_rating),
+    NOW()
+FROM restaurants_userrestaurantinteraction
+GROUP BY restaurant_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0005_restaurant_vegan_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantStats',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='restaurants.restaurant')),
+                ('like_count', models.IntegerField(default=0)),
+                ('visit_count', models.IntegerField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('average_user_rating', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'restaurant stats',
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
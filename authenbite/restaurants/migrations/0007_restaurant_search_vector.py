@@ -0,0 +1,39 @@
+# Generated by Django 4.2.14 on 2026-10-19 11:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+BACKFILL_SQL = """
+UPDATE restaurants_restaurant AS restaurant SET search_vector =
+    setweight(to_tsvector('english', COALESCE(restaurant.name, '')), 'A')
+    || setweight(to_tsvector('english', COALESCE((
+        SELECT string_agg(cuisine.name, ' ')
+        FROM restaurants_restaurant_cuisines AS link
+        JOIN restaurants_cuisine AS cuisine ON cuisine.id = link.cuisine_id
+        WHERE link.restaurant_id = restaurant.id
+    ), '')), 'B')
+    || setweight(to_tsvector('english', COALESCE(restaurant.address, '')), 'C')
+    || setweight(to_tsvector('english', COALESCE(restaurant.review_summary, '')), 'D')
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0006_restaurantstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='restaurant_search_gin'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.14 on 2026-10-19 13:05
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('restaurants', '0007_restaurant_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='cuisine',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='cuisine_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='restaurant',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['name'], name='restaurant_name_trgm', opclasses=['gist_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.14 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0009_catalogchange'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='catalogchange',
+            name='published_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -2,8 +2,13 @@ from datetime import datetime
 
 from django.contrib.auth import get_user_model
 from django.contrib.gis.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.indexes import GistIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db.models import F, Func
+from django.db.models import F, Func, Q, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 User = get_user_model()
@@ -12,11 +17,38 @@ User = get_user_model()
 class Cuisine(models.Model):
     name = models.CharField(max_length=100, unique=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["name"], name="cuisine_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
 
-class RestaurantManager(models.Manager):
+class RestaurantQuerySet(models.QuerySet):
+    def fetch_in_order(self, ids):
+        """
+        Return the restaurants for ``ids`` in the given order in one query,
+        together with the ids that did not match.
+        """
+        by_id = {restaurant.pk: restaurant for restaurant in self.filter(pk__in=ids)}
+        found = [by_id[pk] for pk in ids if pk in by_id]
+        missing = [pk for pk in ids if pk not in by_id]
+        return found, missing
+
+    def with_stats(self):
+        return self.annotate(
+            like_count=Coalesce(F("stats__like_count"), Value(0)),
+            visit_count=Coalesce(F("stats__visit_count"), Value(0)),
+            rating_count=Coalesce(F("stats__rating_count"), Value(0)),
+            average_user_rating=F("stats__average_user_rating"),
+        )
+
+
+class RestaurantManager(models.Manager.from_queryset(RestaurantQuerySet)):
     def open_now(self):
         current_time = timezone.localtime()
         day_name = current_time.strftime("%A")
@@ -72,9 +104,22 @@ class Restaurant(models.Model):
     review_summary = models.TextField(blank=True, null=True)
     opening_hours = models.JSONField(null=True, blank=True)
     opening_hours_display = models.TextField(blank=True, null=True)
+    # Weighted full-text document, maintained by restaurants.search.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = RestaurantManager()
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="restaurant_search_gin"),
+            # GiST rather than GIN so that ORDER BY name <-> q is index-driven.
+            GistIndex(
+                fields=["name"],
+                name="restaurant_name_trgm",
+                opclasses=["gist_trgm_ops"],
+            ),
+        ]
+
     def is_open(self, current_time=None):
         if not self.opening_hours:
             return False
@@ -135,6 +180,32 @@ class Restaurant(models.Model):
         return self.location.x if self.location else None
 
 
+class RestaurantStats(models.Model):
+    """
+    Engagement counters per restaurant, kept up to date by applying deltas
+    from interaction writes and periodically reconciled against
+    ``UserRestaurantInteraction``.
+    """
+
+    restaurant = models.OneToOneField(
+        Restaurant, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    like_count = models.IntegerField(default=0)
+    visit_count = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    average_user_rating = models.DecimalField(
+        max_digits=3, decimal_places=2, null=True, blank=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "restaurant stats"
+
+    def __str__(self):
+        return f"Stats for restaurant {self.restaurant_id}"
+
+
 class UserPreference(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     favorite_cuisines = models.ManyToManyField(Cuisine)
@@ -162,3 +233,34 @@ class UserRestaurantInteraction(models.Model):
 
     def __str__(self):
         return f"{self.user.username}'s interaction with {self.restaurant.name}"
+
+
+class CatalogChange(models.Model):
+    """
+    Transactional outbox of catalog changes.
+
+    Rows are written in the same transaction as the change itself and
+    published to the ``catalog:changes`` stream by
+    :func:`authenbite.restaurants.outbox.relay_catalog_changes`.
+    """
+
+    RESTAURANT = "restaurant"
+    CUISINE = "cuisine"
+    KIND_CHOICES = [(RESTAURANT, "Restaurant"), (CUISINE, "Cuisine")]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_ids = ArrayField(models.BigIntegerField())
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=Q(published_at__isnull=True),
+                name="catalogchange_unpublished",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_ids}"
@@ -0,0 +1,101 @@
+"""
+Transactional outbox for catalog changes.
+
+Catalog signals record the ids of changed restaurants and cuisines as
+``CatalogChange`` rows inside the transaction that changes them, so a change
+is published if and only if it commits. :func:`relay_catalog_changes` then
+merges pending rows into one compact event per kind on the
+``catalog:changes`` Redis stream, bumps the response cache versions they
+affect, and marks the rows published.
+
+The relay runs once right after each committing transaction, however many
+changes it recorded, on a best-effort basis, and from Celery beat, which
+catches anything the first attempt missed (a crash after commit, Redis being
+unavailable). Events may therefore be delivered more than once; consumers
+reload the rows they name, which is idempotent. Web processes apply the
+events incrementally: see :func:`authenbite.restaurants.autocomplete.get_index`.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from authenbite.restaurants.autocomplete import CHANGES_STREAM_KEY
+from authenbite.restaurants.autocomplete import CHANGES_STREAM_MAXLEN
+from authenbite.restaurants.cache import CATALOG_NAMESPACE
+from authenbite.restaurants.cache import CUISINE_NAMESPACE
+from authenbite.restaurants.cache import bump_cache_version
+from authenbite.restaurants.models import CatalogChange
+from authenbite.restaurants.store import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def record_catalog_change(kind, ids):
+    """Add changed ``kind`` ids to the outbox in the current transaction."""
+    ids = sorted({int(pk) for pk in ids})
+    if not ids:
+        return
+    CatalogChange.objects.create(kind=kind, object_ids=ids)
+    # Every change registers the relay, so one survives whichever savepoints
+    # roll back. The first to run publishes the transaction's rows and the
+    # others find nothing left to publish.
+    transaction.on_commit(_relay_after_commit)
+
+
+def _relay_after_commit():
+    try:
+        relay_catalog_changes()
+    except Exception:
+        # Celery beat retries; the caller's change has committed regardless.
+        logger.exception("Could not relay catalog changes")
+
+
+def relay_catalog_changes(batch_size=None):
+    """
+    Publish pending outbox rows and mark them published. Returns how many
+    rows were relayed.
+    """
+    batch_size = batch_size or settings.CATALOG_OUTBOX_BATCH_SIZE
+    with transaction.atomic():
+        changes = list(
+            CatalogChange.objects.filter(published_at__isnull=True)
+            .select_for_update(skip_locked=True)
+            .order_by("pk")
+            .values_list("pk", "kind", "object_ids")[:batch_size]
+        )
+        if not changes:
+            return 0
+
+        ids_by_kind = {}
+        for _, kind, object_ids in changes:
+            ids_by_kind.setdefault(kind, set()).update(object_ids)
+
+        pipeline = get_redis_client().pipeline(transaction=False)
+        for kind, ids in ids_by_kind.items():
+            pipeline.xadd(
+                CHANGES_STREAM_KEY,
+                {"kind": kind, "ids": ",".join(map(str, sorted(ids)))},
+                maxlen=CHANGES_STREAM_MAXLEN,
+                approximate=True,
+            )
+        pipeline.execute()
+
+        bump_cache_version(CATALOG_NAMESPACE)
+        if CatalogChange.CUISINE in ids_by_kind:
+            bump_cache_version(CUISINE_NAMESPACE)
+
+        CatalogChange.objects.filter(pk__in=[pk for pk, _, _ in changes]).update(
+            published_at=timezone.now()
+        )
+    return len(changes)
+
+
+def prune_catalog_changes():
+    """Delete rows published more than ``CATALOG_OUTBOX_RETENTION`` ago."""
+    cutoff = timezone.now() - timedelta(seconds=settings.CATALOG_OUTBOX_RETENTION)
+    deleted, _ = CatalogChange.objects.filter(published_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,130 @@
+"""
+Everything about a user that personalizes restaurant results, loaded once.
+
+:func:`get_personalization` returns a :class:`PersonalizationContext` built
+from a single query over the user, their preferences, favourite cuisines,
+profile and disliked restaurants. It is memoized on the request and cached
+under the user's personalization version, which is bumped after any write
+to those rows.
+"""
+
+from dataclasses import dataclass
+from dataclasses import replace
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models import OuterRef
+
+from authenbite.observability.stats import HIT
+from authenbite.observability.stats import MISS
+from authenbite.observability.stats import record_cache_lookup
+from authenbite.restaurants.cache import bump_cache_version_on_commit
+from authenbite.restaurants.cache import get_cache_version
+from authenbite.restaurants.models import UserPreference
+from authenbite.restaurants.models import UserRestaurantInteraction
+
+REQUEST_ATTRIBUTE = "_personalization"
+
+
+@dataclass(frozen=True)
+class PersonalizationContext:
+    user_id: int
+    favorite_cuisine_ids: tuple[int, ...] = ()
+    preferred_price_level: int | None = None
+    preferred_rating: Decimal | None = None
+    persona: str | None = None
+    adventure_preference: int | None = None
+    cultural_interest: int | None = None
+    planning_detail: int | None = None
+    travel_frequency: int | None = None
+    # Restaurants the user marked as disliked.
+    excluded_restaurant_ids: tuple[int, ...] = ()
+
+
+def personalization_namespace(user_id):
+    return f"personalization:{user_id}"
+
+
+def invalidate_personalization(user_id):
+    bump_cache_version_on_commit(personalization_namespace(user_id))
+
+
+def load_personalization(user_id):
+    """Build the context for ``user_id`` in one query."""
+    favorite_cuisines = UserPreference.favorite_cuisines.through.objects.filter(
+        userpreference__user=OuterRef("pk")
+    ).values("cuisine_id")
+    disliked = UserRestaurantInteraction.objects.filter(
+        user=OuterRef("pk"), liked=False
+    ).values("restaurant_id")
+    row = (
+        get_user_model()
+        .objects.filter(pk=user_id)
+        .values(
+            preferred_price_level=F("userpreference__preferred_price_level"),
+            preferred_rating=F("userpreference__preferred_rating"),
+            persona=F("profile__persona__name"),
+            adventure_preference=F("profile__adventure_preference"),
+            cultural_interest=F("profile__cultural_interest"),
+            planning_detail=F("profile__planning_detail"),
+            travel_frequency=F("profile__travel_frequency"),
+            favorite_cuisine_ids=ArraySubquery(favorite_cuisines),
+            excluded_restaurant_ids=ArraySubquery(disliked),
+        )
+        .first()
+    )
+    if row is None:
+        return PersonalizationContext(user_id=user_id)
+    return PersonalizationContext(
+        user_id=user_id,
+        **{
+            **row,
+            "favorite_cuisine_ids": tuple(sorted(row["favorite_cuisine_ids"])),
+            "excluded_restaurant_ids": tuple(sorted(row["excluded_restaurant_ids"])),
+        },
+    )
+
+
+def get_personalization(request):
+    """
+    Return the context for ``request.user`` (``None`` when anonymous),
+    loading it at most once per request.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    context = getattr(request, REQUEST_ATTRIBUTE, None)
+    if context is not None:
+        return context
+
+    version = get_cache_version(personalization_namespace(user.pk))
+    key = f"personalization:{user.pk}:{version}"
+    context = cache.get(key)
+    record_cache_lookup("personalization", MISS if context is None else HIT)
+    if context is None:
+        context = load_personalization(user.pk)
+        cache.set(key, context, timeout=settings.PERSONALIZATION_CACHE_TTL)
+    if settings.INTERACTION_WRITE_BEHIND:
+        context = with_pending_dislikes(context)
+    setattr(request, REQUEST_ATTRIBUTE, context)
+    return context
+
+
+def with_pending_dislikes(context):
+    """Apply the user's queued likes and dislikes to ``excluded_restaurant_ids``."""
+    # write_behind imports this module through interactions.
+    from authenbite.restaurants.write_behind import pending_values
+
+    pending = pending_values(context.user_id, "liked")
+    if not pending:
+        return context
+    excluded = set(context.excluded_restaurant_ids)
+    excluded.difference_update(
+        pk for pk, liked in pending.items() if liked is not False
+    )
+    excluded.update(pk for pk, liked in pending.items() if liked is False)
+    return replace(context, excluded_restaurant_ids=tuple(sorted(excluded)))
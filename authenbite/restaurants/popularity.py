@@ -0,0 +1,248 @@
+"""
+Exponentially time-decayed popularity for restaurants and cuisines.
+
+Scores live in Redis sorted sets and use forward decay: an event at time ``t``
+adds ``weight * 2 ** ((t - epoch) / half_life)``, so older events never need
+to be rewritten and a top-k read is a single ``ZREVRANGE``. Dividing a stored
+score by ``2 ** ((now - epoch) / half_life)`` gives the decayed value as of
+now. Windowed rankings ("this week") sum plain weights in daily sorted sets
+that expire on their own.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from authenbite.restaurants.models import Restaurant
+from authenbite.restaurants.models import UserPreference
+from authenbite.restaurants.models import UserRestaurantInteraction
+from authenbite.restaurants.stats import StatsDelta
+from authenbite.restaurants.store import decode
+from authenbite.restaurants.store import get_redis_client
+from authenbite.restaurants.store import write_after_commit
+
+RESTAURANTS = "restaurants"
+CUISINES = "cuisines"
+WINDOWS = {"week": 7}
+
+
+def _decayed_key(kind):
+    return f"popularity:{kind}"
+
+
+def _day_key(kind, day):
+    return f"popularity:{kind}:day:{day:%Y%m%d}"
+
+
+def _window_key(kind, window):
+    return f"popularity:{kind}:window:{window}"
+
+
+def _growth(at):
+    half_life = timedelta(days=settings.POPULARITY_HALF_LIFE_DAYS).total_seconds()
+    return 2 ** ((at.timestamp() - settings.POPULARITY_EPOCH) / half_life)
+
+
+def _record(pipe, kind, events, now):
+    """
+    Add ``[(member, weight, at)]`` events. Each is credited to the decayed
+    score as of ``at`` and to the day bucket of ``at`` while that bucket
+    still counts towards a window.
+    """
+    retention = max(WINDOWS.values()) + 1
+    day_ttls = {}
+    for member, weight, at in events:
+        if not weight:
+            continue
+        pipe.zincrby(_decayed_key(kind), weight * _growth(at), member)
+        age = (now.date() - at.date()).days
+        if age < retention:
+            day_key = _day_key(kind, at.date())
+            pipe.zincrby(day_key, weight, member)
+            day_ttls[day_key] = (retention - age) * 24 * 60 * 60
+    for day_key, ttl in day_ttls.items():
+        pipe.expire(day_key, ttl)
+
+
+def interaction_weight(delta):
+    weights = settings.POPULARITY_WEIGHTS
+    return (
+        delta.like_count * weights["like"]
+        + delta.visit_count * weights["visit"]
+        + delta.rating_count * weights["rating"]
+    )
+
+
+def _interaction_events(restaurant_id, before, after, now):
+    """
+    Return the ``(restaurant_id, weight, at)`` events of one interaction
+    change. Gains are credited as of ``now``. Losses (unlikes, removed visits
+    and ratings) take back what the interaction was credited: they are
+    debited as of its last write, not as of ``now``, which would remove more
+    than was ever added.
+    """
+    delta = StatsDelta()
+    delta.add(before, after)
+    weights = settings.POPULARITY_WEIGHTS
+    gained = lost = 0
+    for count, weight in (
+        (delta.like_count, weights["like"]),
+        (delta.visit_count, weights["visit"]),
+        (delta.rating_count, weights["rating"]),
+    ):
+        if count > 0:
+            gained += count * weight
+        else:
+            lost += count * weight
+    written_at = (before or {}).get("interaction_date") or now
+    return [
+        (restaurant_id, weight, at)
+        for weight, at in ((gained, now), (lost, min(written_at, now)))
+        if weight
+    ]
+
+
+def record_interaction_popularity(changes, at=None):
+    """
+    Credit ``[(restaurant_id, before, after)]`` interaction changes to the
+    restaurants and their cuisines. Unlikes and removed ratings count
+    negatively.
+    """
+    at = at or timezone.now()
+    restaurant_events = [
+        event
+        for restaurant_id, before, after in changes
+        for event in _interaction_events(restaurant_id, before, after, at)
+    ]
+    if not restaurant_events:
+        return
+
+    cuisines_by_restaurant = {}
+    links = Restaurant.cuisines.through.objects.filter(
+        restaurant_id__in={restaurant_id for restaurant_id, _, _ in restaurant_events}
+    ).values_list("restaurant_id", "cuisine_id")
+    for restaurant_id, cuisine_id in links:
+        cuisines_by_restaurant.setdefault(restaurant_id, []).append(cuisine_id)
+    cuisine_events = [
+        (cuisine_id, weight, when)
+        for restaurant_id, weight, when in restaurant_events
+        for cuisine_id in cuisines_by_restaurant.get(restaurant_id, [])
+    ]
+
+    pipe = get_redis_client().pipeline(transaction=False)
+    _record(pipe, RESTAURANTS, restaurant_events, at)
+    _record(pipe, CUISINES, cuisine_events, at)
+    pipe.execute()
+
+
+def record_favorite_cuisine(cuisine_id):
+    """
+    Credit a new favourite cuisine. Favourites are not timestamped, so a
+    removal is not debited (as of now it would take back more than the
+    addition was credited); its credit decays like any other.
+    """
+    write_after_commit(_record_favorite_cuisine, cuisine_id)
+
+
+def _record_favorite_cuisine(cuisine_id):
+    now = timezone.now()
+    weight = settings.POPULARITY_WEIGHTS["favorite"]
+    pipe = get_redis_client().pipeline(transaction=False)
+    _record(pipe, CUISINES, [(cuisine_id, weight, now)], now)
+    pipe.execute()
+
+
+def scores(kind, ids):
+    """Return the decayed score as of now of each of ``ids`` (0 if unknown)."""
+    ids = list(ids)
+    pipe = get_redis_client().pipeline(transaction=False)
+    for member in ids:
+        pipe.zscore(_decayed_key(kind), member)
+    scale = 1 / _growth(timezone.now())
+    return {
+        member: (score or 0) * scale
+        for member, score in zip(ids, pipe.execute(), strict=True)
+    }
+
+
+def top(kind, limit, window=None):
+    """Return ``[(id, score)]`` for the ``limit`` most popular ids of ``kind``."""
+    client = get_redis_client()
+    if window is None:
+        key = _decayed_key(kind)
+        scale = 1 / _growth(timezone.now())
+    else:
+        key = _window_key(kind, window)
+        scale = 1
+        if not client.exists(key):
+            today = timezone.now().date()
+            day_keys = [
+                _day_key(kind, today - timedelta(days=offset))
+                for offset in range(WINDOWS[window])
+            ]
+            pipe = client.pipeline(transaction=False)
+            pipe.zunionstore(key, day_keys)
+            pipe.expire(key, settings.POPULARITY_WINDOW_CACHE_TTL)
+            pipe.execute()
+
+    return [
+        (int(decode(member)), score * scale)
+        for member, score in client.zrevrange(key, 0, limit - 1, withscores=True)
+        if score > 0
+    ]
+
+
+def rebuild_popularity():
+    """
+    Recompute the decayed scores from ``UserRestaurantInteraction``.
+
+    Favourite-cuisine additions are not timestamped, so they are credited as
+    of now. Windowed rankings are left to fill up from new events.
+    """
+    restaurant_scores = {}
+    interactions = UserRestaurantInteraction.objects.values_list(
+        "restaurant_id", "liked", "visited", "user_rating", "interaction_date"
+    )
+    for (
+        restaurant_id,
+        liked,
+        visited,
+        user_rating,
+        interaction_date,
+    ) in interactions.iterator(chunk_size=2000):
+        delta = StatsDelta()
+        delta.add(
+            None, {"liked": liked, "visited": visited, "user_rating": user_rating}
+        )
+        restaurant_scores[restaurant_id] = restaurant_scores.get(
+            restaurant_id, 0
+        ) + interaction_weight(delta) * _growth(interaction_date)
+
+    cuisine_scores = {}
+    links = Restaurant.cuisines.through.objects.values_list(
+        "restaurant_id", "cuisine_id"
+    )
+    for restaurant_id, cuisine_id in links.iterator(chunk_size=2000):
+        if restaurant_id in restaurant_scores:
+            cuisine_scores[cuisine_id] = (
+                cuisine_scores.get(cuisine_id, 0) + restaurant_scores[restaurant_id]
+            )
+
+    favorite_score = settings.POPULARITY_WEIGHTS["favorite"] * _growth(timezone.now())
+    favorites = UserPreference.favorite_cuisines.through.objects.values_list(
+        "cuisine_id", flat=True
+    )
+    for cuisine_id in favorites.iterator(chunk_size=2000):
+        cuisine_scores[cuisine_id] = cuisine_scores.get(cuisine_id, 0) + favorite_score
+
+    pipe = get_redis_client().pipeline()
+    for kind, kind_scores in (
+        (RESTAURANTS, restaurant_scores),
+        (CUISINES, cuisine_scores),
+    ):
+        pipe.delete(_decayed_key(kind))
+        nonzero = {member: score for member, score in kind_scores.items() if score}
+        if nonzero:
+            pipe.zadd(_decayed_key(kind), nonzero)
+    pipe.execute()
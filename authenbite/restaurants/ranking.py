@@ -0,0 +1,196 @@
+"""
+Hybrid ranking for ``/api/restaurants/search/?mode=hybrid``.
+
+Candidates come from the indexes only, and every one of them matches the
+text: the best BM25 matches over review summaries (when a text index has been
+built), the best ``tsvector`` matches, which also cover names, cuisines and
+addresses, and, when a location is given, the ``tsvector`` matches nearest by
+``location <-> point``. The bounded candidate set is then scored in one
+vectorized step::
+
+    score = w_text * text + w_distance * exp(-km / scale)
+            + w_rating * rating / 5 + w_persona * persona affinity
+
+with the weights in ``HYBRID_WEIGHTS``. BM25 and ``ts_rank`` scores are each
+scaled to [0, 1] by their best candidate, and a restaurant found by both keeps
+the higher one; persona affinity is the restaurant feature that matches
+the user's persona.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.contrib.gis.db.models.functions import GeometryDistance
+from django.contrib.gis.geos import Point
+
+from authenbite.restaurants.search import search_restaurants
+from authenbite.restaurants.snapshot import FEATURE_FIELDS
+from authenbite.restaurants.snapshot import get_catalog_snapshot
+from authenbite.restaurants.text_index import get_text_index
+from authenbite.users.models import Persona
+
+EARTH_RADIUS_KM = 6371.0
+
+# Column of FEATURE_FIELDS each persona cares about.
+PERSONA_FEATURES = {
+    Persona.ESCAPIST: 0,
+    Persona.LEARNER: 1,
+    Persona.PLANNER: 2,
+    Persona.DREAMER: 3,
+}
+# Divisors bringing each feature to [0, 1].
+FEATURE_SCALE = np.array([10.0, 10.0, 1.0, 10.0])
+
+
+def text_candidates(text, limit):
+    """
+    Return ``{restaurant_id: BM25 score}`` for the best review summary
+    matches, or ``{}`` if no text index has been built.
+    """
+    index = get_text_index()
+    if index is None:
+        return {}
+    return dict(index.bm25(text, limit))
+
+
+def fulltext_candidates(queryset, text, limit, point=None):
+    """
+    Return ``{restaurant_id: ts_rank}`` for the best ``tsvector`` matches
+    for ``text``, or for the matches nearest to ``point`` if one is given.
+    """
+    matches = search_restaurants(queryset, text)
+    if point is not None:
+        matches = matches.exclude(location__isnull=True).order_by(
+            GeometryDistance("location", point)
+        )
+    return dict(matches.values_list("pk", "rank")[:limit])
+
+
+def scaled(scores):
+    """Divide ``scores`` by the best one, leaving all-zero scores alone."""
+    best = max(scores.values(), default=0.0)
+    if best <= 0:
+        return scores
+    return {pk: score / best for pk, score in scores.items()}
+
+
+def candidate_columns(queryset, candidate_ids):
+    """
+    Return ``(ids, ratings, coordinates, features)`` arrays for the
+    candidates that ``queryset`` still matches, or ``None`` if none do.
+
+    The columns come from the catalog snapshot for the candidates it holds
+    unchanged since it was built, so only their ids are read from the
+    database; the rest are read in full.
+    """
+    snapshot = get_catalog_snapshot()
+    if snapshot is None:
+        return database_columns(queryset, candidate_ids)
+
+    ids = np.array(
+        sorted(
+            set(
+                queryset.order_by()
+                .filter(pk__in=candidate_ids)
+                .values_list("pk", flat=True)
+            )
+        ),
+        dtype=np.int64,
+    )
+    if not len(ids):
+        return None
+    rows, found = snapshot.positions(ids)
+    fresh = found & ~np.isin(ids, snapshot.changed_ids)
+    columns = (
+        ids[fresh],
+        np.asarray(snapshot.ratings[rows[fresh]], dtype=float),
+        np.asarray(snapshot.coordinates[rows[fresh]], dtype=float),
+        np.asarray(snapshot.features[rows[fresh]], dtype=float),
+    )
+    if fresh.all():
+        return columns
+    loaded = database_columns(queryset, ids[~fresh].tolist())
+    if loaded is None:
+        return columns if fresh.any() else None
+    return tuple(
+        np.concatenate([ours, theirs])
+        for ours, theirs in zip(columns, loaded, strict=True)
+    )
+
+
+def database_columns(queryset, candidate_ids):
+    """Read the :func:`candidate_columns` arrays from the database."""
+    rows = queryset.order_by().filter(pk__in=candidate_ids)
+    # Joins in ``queryset`` can repeat a restaurant.
+    rows = list(
+        {
+            row[0]: row
+            for row in rows.values_list("pk", "rating", "location", *FEATURE_FIELDS)
+        }.values()
+    )
+    if not rows:
+        return None
+    return (
+        np.array([row[0] for row in rows], dtype=np.int64),
+        np.array([float(row[1] or 0) for row in rows]),
+        np.array(
+            [(row[2].x, row[2].y) if row[2] else (np.nan, np.nan) for row in rows]
+        ).reshape(-1, 2),
+        np.array([row[3:] for row in rows], dtype=float),
+    )
+
+
+def haversine_km(lat, lon, lats, lons):
+    lat, lon = np.radians(lat), np.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = (
+        np.sin((lats - lat) / 2) ** 2
+        + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def hybrid_rank(queryset, text, persona=None, lat=None, lon=None):
+    """
+    Return ``[(restaurant_id, score)]``, best first, for the candidates of
+    ``queryset`` matching ``text``, preferring those near ``(lat, lon)``, for
+    a user with the ``persona`` code.
+    """
+    bm25 = scaled(text_candidates(text, settings.HYBRID_TEXT_CANDIDATES))
+    fulltext = fulltext_candidates(queryset, text, settings.HYBRID_TEXT_CANDIDATES)
+    if lat is not None and lon is not None:
+        point = Point(lon, lat, srid=4326)
+        fulltext.update(
+            fulltext_candidates(
+                queryset, text, settings.HYBRID_SPATIAL_CANDIDATES, point=point
+            )
+        )
+    fulltext = scaled(fulltext)
+    text_scores = {
+        pk: max(bm25.get(pk, 0.0), fulltext.get(pk, 0.0))
+        for pk in bm25.keys() | fulltext.keys()
+    }
+    if not text_scores:
+        return []
+
+    columns = candidate_columns(queryset, list(text_scores))
+    if columns is None:
+        return []
+    ids, rating, coordinates, features = columns
+    rating = rating / 5
+    features = features / FEATURE_SCALE
+    relevance = np.array([text_scores[pk] for pk in ids.tolist()])
+
+    weights = settings.HYBRID_WEIGHTS
+    scores = weights["text"] * relevance + weights["rating"] * rating
+
+    if lat is not None and lon is not None:
+        distances = haversine_km(lat, lon, coordinates[:, 1], coordinates[:, 0])
+        decay = np.exp(-distances / settings.HYBRID_DISTANCE_SCALE_KM)
+        scores += weights["distance"] * np.nan_to_num(decay)
+
+    feature = PERSONA_FEATURES.get(persona)
+    if feature is not None:
+        scores += weights["persona"] * features[:, feature]
+
+    order = np.argsort(-scores, kind="stable")
+    return [(int(ids[i]), float(scores[i])) for i in order]
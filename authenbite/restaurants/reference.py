@@ -0,0 +1,93 @@
+"""
+Process-local copies of small, rarely changing tables (cuisines, personas).
+
+Each table is held whole in every process and indexed by its lookup fields.
+Behind it sits one shared cache entry per table version, so a process that
+notices a new version reloads from the cache, and only the first one goes to
+the database. Versions are the response-cache namespace versions, bumped by
+signals after commit; a process checks its table's version at most every
+``REFERENCE_CACHE_CHECK_INTERVAL`` seconds.
+
+A lookup that misses falls back to the database, so rows created since the
+last check are still found.
+"""
+
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+
+from authenbite.restaurants.cache import CUISINE_NAMESPACE
+from authenbite.restaurants.cache import PERSONA_NAMESPACE
+from authenbite.restaurants.cache import get_cache_version
+from authenbite.restaurants.models import Cuisine
+from authenbite.users.models import Persona
+
+
+class ReferenceTable:
+    def __init__(self, name, model, namespace, lookups=()):
+        self.name = name
+        self.model = model
+        self.namespace = namespace
+        self.lookups = ("pk", *lookups)
+        self._lock = threading.Lock()
+        self._indexes = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def _load(self, version):
+        key = f"reference:{self.name}:{version}"
+        rows = cache.get(key)
+        if rows is None:
+            rows = list(self.model.objects.all())
+            cache.set(key, rows, timeout=settings.REFERENCE_CACHE_TTL)
+        return {
+            lookup: {getattr(row, lookup): row for row in rows}
+            for lookup in self.lookups
+        }
+
+    def _current(self):
+        now = time.monotonic()
+        if (
+            self._indexes is not None
+            and now - self._checked_at < settings.REFERENCE_CACHE_CHECK_INTERVAL
+        ):
+            return self._indexes
+        with self._lock:
+            version = get_cache_version(self.namespace)
+            if self._indexes is None or version != self._version:
+                self._indexes = self._load(version)
+                self._version = version
+            self._checked_at = now
+            return self._indexes
+
+    def all(self):
+        return [copy.copy(row) for row in self._current()["pk"].values()]
+
+    def get(self, **lookup):
+        """
+        Return a copy of the row matching a single ``field=value`` lookup, or
+        ``None``.
+        """
+        ((field, value),) = lookup.items()
+        try:
+            value = self.model._meta.get_field(
+                self.model._meta.pk.name if field == "pk" else field
+            ).to_python(value)
+        except ValidationError:
+            return None
+        row = self._current()[field].get(value)
+        if row is None:
+            return self.model.objects.filter(**lookup).first()
+        return copy.copy(row)
+
+    def clear(self):
+        with self._lock:
+            self._indexes = None
+
+
+cuisines = ReferenceTable("cuisines", Cuisine, CUISINE_NAMESPACE)
+personas = ReferenceTable("personas", Persona, PERSONA_NAMESPACE, lookups=("name",))
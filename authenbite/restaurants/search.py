@@ -0,0 +1,153 @@
+"""
+Full-text search over restaurants.
+
+Each restaurant stores a weighted ``tsvector`` in ``search_vector``: name (A),
+cuisine names (B), address (C) and review summary (D). Cuisines live in a
+many-to-many table, so the column is maintained by :func:`update_search_vectors`
+from the catalog signals rather than as a generated column.
+
+Fuzzy matching for misspelt names uses pg_trgm: ``%`` filters on similarity
+and ``<->`` orders by trigram distance, both served by the trigram indexes on
+``Restaurant.name`` (GiST, which also supports KNN ordering) and
+``Cuisine.name`` (GIN).
+
+Free-text queries over review summaries ("cozy ramen with vegan options") go
+to the BM25 index in :mod:`authenbite.restaurants.text_index`.
+"""
+
+import logging
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
+from django.contrib.postgres.search import SearchRank
+from django.contrib.postgres.search import TrigramDistance
+from django.db import connection
+from django.db.models import Case
+from django.db.models import F
+from django.db.models import FloatField
+from django.db.models import Value
+from django.db.models import When
+
+from authenbite.restaurants.models import Cuisine
+from authenbite.restaurants.models import Restaurant
+from authenbite.restaurants.text_index import get_text_index
+
+logger = logging.getLogger(__name__)
+
+RESTAURANT_TABLE = Restaurant._meta.db_table
+CUISINE_TABLE = Cuisine._meta.db_table
+RESTAURANT_CUISINE_TABLE = Restaurant.cuisines.through._meta.db_table
+
+SEARCH_DOCUMENT_SQL = f"""
+    setweight(to_tsvector(%(config)s::regconfig, COALESCE(restaurant.name, '')), 'A')
+    || setweight(to_tsvector(%(config)s::regconfig, COALESCE((
+        SELECT string_agg(cuisine.name, ' ')
+        FROM {RESTAURANT_CUISINE_TABLE} AS link
+        JOIN {CUISINE_TABLE} AS cuisine ON cuisine.id = link.cuisine_id
+        WHERE link.restaurant_id = restaurant.id
+    ), '')), 'B')
+    || setweight(
+        to_tsvector(%(config)s::regconfig, COALESCE(restaurant.address, '')), 'C'
+    )
+    || setweight(
+        to_tsvector(%(config)s::regconfig, COALESCE(restaurant.review_summary, '')),
+        'D'
+    )
+"""  # noqa: S608
+
+
+def update_search_vectors(restaurant_ids=None):
+    """Recompute ``search_vector`` for ``restaurant_ids``, or for every row."""
+    params = {"config": settings.SEARCH_CONFIG}
+    sql = f"UPDATE {RESTAURANT_TABLE} AS restaurant SET search_vector = {SEARCH_DOCUMENT_SQL}"  # noqa: E501, S608
+    if restaurant_ids is not None:
+        restaurant_ids = list(restaurant_ids)
+        if not restaurant_ids:
+            return
+        sql += " WHERE restaurant.id = ANY(%(ids)s)"
+        params["ids"] = restaurant_ids
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def search_restaurants(queryset, text):
+    """Filter ``queryset`` to matches for ``text``, best ``ts_rank`` first."""
+    query = SearchQuery(text, config=settings.SEARCH_CONFIG, search_type="websearch")
+    return (
+        queryset.filter(search_vector=query)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank", "pk")
+    )
+
+
+def set_similarity_threshold(threshold=None):
+    """
+    Set ``pg_trgm.similarity_threshold``, used by the ``%`` operator, for the
+    database session. The value set is remembered per connection, so the
+    statement is only sent when a new connection needs it or the threshold
+    changes.
+    """
+    threshold = settings.FUZZY_SEARCH_THRESHOLD if threshold is None else threshold
+    # The raw connection changes when Django reconnects.
+    current = getattr(connection, "similarity_threshold", None)
+    if connection.connection is not None and current == (
+        connection.connection,
+        threshold,
+    ):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('pg_trgm.similarity_threshold', %s, false)",
+            [str(threshold)],
+        )
+    connection.similarity_threshold = (connection.connection, threshold)
+
+
+def fuzzy_search(queryset, field, text):
+    """
+    Filter ``queryset`` to rows whose ``field`` is trigram-similar to
+    ``text``, nearest first.
+    """
+    set_similarity_threshold()
+    return (
+        queryset.filter(**{f"{field}__trigram_similar": text})
+        .annotate(similarity_distance=TrigramDistance(field, text))
+        .order_by("similarity_distance")
+    )
+
+
+def text_search_restaurants(queryset, text):
+    """
+    Filter ``queryset`` to the best BM25 matches for ``text`` in the review
+    summary index, best first. Falls back to :func:`search_restaurants` when
+    the index has not been built.
+    """
+    index = get_text_index()
+    if index is None:
+        logger.warning("Text index %s not found", settings.TEXT_INDEX_PATH)
+        return search_restaurants(queryset, text)
+
+    return order_by_scores(
+        queryset, index.bm25(text, settings.TEXT_SEARCH_CANDIDATES), "text_score"
+    )
+
+
+def order_by_scores(queryset, ranked, alias):
+    """
+    Restrict ``queryset`` to the ids of ``ranked`` (``[(id, score)]``),
+    annotated with the score as ``alias`` and ordered by it.
+    """
+    if not ranked:
+        return queryset.none()
+    return (
+        queryset.filter(pk__in=[pk for pk, _ in ranked])
+        .annotate(
+            **{
+                alias: Case(
+                    *(When(pk=pk, then=Value(score)) for pk, score in ranked),
+                    output_field=FloatField(),
+                )
+            }
+        )
+        .order_by(f"-{alias}", "pk")
+    )
@@ -0,0 +1,97 @@
+from weakref import WeakKeyDictionary
+
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from authenbite.restaurants.autocomplete import CUISINE
+from authenbite.restaurants.autocomplete import RESTAURANT
+from authenbite.restaurants.models import Cuisine
+from authenbite.restaurants.models import Restaurant
+from authenbite.restaurants.models import UserPreference
+from authenbite.restaurants.models import UserRestaurantInteraction
+from authenbite.restaurants.outbox import record_catalog_change
+from authenbite.restaurants.personalization import invalidate_personalization
+from authenbite.restaurants.search import update_search_vectors
+from authenbite.users.models import UserProfile
+
+
+@receiver(post_save, sender=Restaurant)
+def update_restaurant_search_vector(sender, instance, **kwargs):
+    update_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=Cuisine)
+def update_cuisine_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(
+            instance.restaurant_set.values_list("pk", flat=True).iterator()
+        )
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def publish_restaurant_change(sender, instance, **kwargs):
+    record_catalog_change(RESTAURANT, [instance.pk])
+
+
+@receiver(post_save, sender=Cuisine)
+@receiver(post_delete, sender=Cuisine)
+def publish_cuisine_change(sender, instance, **kwargs):
+    record_catalog_change(CUISINE, [instance.pk])
+
+
+# The other side of links being cleared, by the instance they are cleared
+# from; it is unknown once the links are gone.
+_clearing = WeakKeyDictionary()
+
+
+@receiver(m2m_changed, sender=Restaurant.cuisines.through)
+def cuisine_links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        related = instance.restaurant_set if reverse else instance.cuisines
+        _clearing[instance] = list(related.values_list("pk", flat=True))
+        return
+    if action == "post_clear":
+        pk_set = _clearing.pop(instance, [])
+    elif action not in ("post_add", "post_remove"):
+        return
+    if reverse:
+        restaurant_ids, cuisine_ids = pk_set, [instance.pk]
+    else:
+        restaurant_ids, cuisine_ids = [instance.pk], pk_set
+    update_search_vectors(restaurant_ids)
+    # Restaurants list their cuisines, and cuisine suggestions are weighted by
+    # how many restaurants serve them.
+    record_catalog_change(RESTAURANT, restaurant_ids)
+    record_catalog_change(CUISINE, cuisine_ids)
+
+
+@receiver(post_save, sender=UserPreference)
+@receiver(post_delete, sender=UserPreference)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=UserRestaurantInteraction)
+@receiver(post_delete, sender=UserRestaurantInteraction)
+def invalidate_user_personalization(sender, instance, **kwargs):
+    invalidate_personalization(instance.user_id)
+
+
+@receiver(m2m_changed, sender=UserPreference.favorite_cuisines.through)
+def invalidate_personalization_on_favorites_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_personalization(instance.user_id)
+        return
+    # A cuisine's set of fans changed.
+    preferences = UserPreference.objects.all()
+    if action != "pre_clear":
+        preferences = preferences.filter(pk__in=pk_set)
+    else:
+        preferences = preferences.filter(favorite_cuisines=instance)
+    for user_id in preferences.values_list("user_id", flat=True):
+        invalidate_personalization(user_id)
@@ -0,0 +1,149 @@
+"""
+Single-flight caching for expensive results.
+
+Entries are kept past their TTL for a stale period and carry the version
+(typically the catalog version) they were computed under. A fresh entry is
+served as is. A stale entry, expired or from an older version, is refreshed
+by whichever caller wins a per-key lock in the shared cache while every
+other caller keeps serving the stale value.
+
+With no entry at all, concurrent callers in one process wait on a single
+future, and across processes the lock holder computes while the others poll
+for its result, for at most ``SINGLE_FLIGHT_WAIT_TIMEOUT`` seconds.
+
+Entries are also refreshed early with a probability that rises as expiry
+approaches and with how long the value took to compute ("XFetch", Vattani,
+Chierichetti and Lowenstein, *Optimal Probabilistic Cache Stampede
+Prevention*), so popular keys are usually recomputed before they expire.
+"""
+
+import math
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+
+class _Flights:
+    lock = threading.Lock()
+    futures = {}
+
+
+def _lock_key(key):
+    return f"{key}:lock"
+
+
+def _acquire(key):
+    token = uuid.uuid4().hex
+    if cache.add(_lock_key(key), token, timeout=settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def _release(key, token):
+    # Another caller may hold the lock if ours timed out mid-computation.
+    if cache.get(_lock_key(key)) == token:
+        cache.delete(_lock_key(key))
+
+
+def is_fresh(entry, version, now):
+    if entry["version"] != version:
+        return False
+    gap = -entry["delta"] * settings.SINGLE_FLIGHT_BETA * math.log(1 - random.random())  # noqa: S311
+    return now + gap < entry["expires_at"]
+
+
+def _compute_and_store(key, compute, ttl, version):
+    started = time.time()
+    value = compute()
+    finished = time.time()
+    if value is not None:
+        entry = {
+            "value": value,
+            "version": version,
+            "expires_at": finished + ttl,
+            "delta": finished - started,
+        }
+        cache.set(key, entry, timeout=ttl + settings.SINGLE_FLIGHT_STALE_TTL)
+    return value
+
+
+def _refresh(key, compute, ttl, version):
+    """Compute under the shared lock, or wait for the process holding it."""
+    token = _acquire(key)
+    if token is not None:
+        try:
+            return _compute_and_store(key, compute, ttl, version), MISS
+        finally:
+            _release(key, token)
+
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry["version"] == version:
+            return entry["value"], HIT
+        if cache.get(_lock_key(key)) is None:
+            break
+    return _compute_and_store(key, compute, ttl, version), MISS
+
+
+def _coalesced(key, compute, ttl, version):
+    with _Flights.lock:
+        future = _Flights.futures.get(key)
+        leader = future is None
+        if leader:
+            future = _Flights.futures[key] = Future()
+
+    if not leader:
+        try:
+            value = future.result(timeout=settings.SINGLE_FLIGHT_WAIT_TIMEOUT)
+        except FutureTimeoutError:
+            return _compute_and_store(key, compute, ttl, version), MISS
+        if value is None:
+            # The leader's result was not cacheable; it may differ per caller.
+            return compute(), MISS
+        return value, HIT
+
+    try:
+        value, status = _refresh(key, compute, ttl, version)
+    except BaseException as error:
+        future.set_exception(error)
+        raise
+    else:
+        future.set_result(value)
+        return value, status
+    finally:
+        with _Flights.lock:
+            _Flights.futures.pop(key, None)
+
+
+def get_or_compute(key, compute, ttl, version=None):
+    """
+    Return ``(value, status)`` for ``key``, calling ``compute()`` only when
+    this caller is the one chosen to refresh it. ``status`` is ``HIT``,
+    ``STALE`` or ``MISS`` (computed by this call). ``None`` results are
+    returned but never cached.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return _coalesced(key, compute, ttl, version)
+    if is_fresh(entry, version, time.time()):
+        return entry["value"], HIT
+
+    token = _acquire(key)
+    if token is None:
+        return entry["value"], STALE
+    try:
+        return _compute_and_store(key, compute, ttl, version), MISS
+    finally:
+        _release(key, token)
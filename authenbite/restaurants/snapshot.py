@@ -0,0 +1,257 @@
+"""
+Column-oriented catalog snapshot shared by every worker on a host.
+
+``build_catalog_snapshot`` writes one ``.npy`` file per column into a new
+directory under ``CATALOG_SNAPSHOT_ROOT`` and then repoints the ``current``
+symlink at it, which is atomic. Workers load the columns with
+``np.load(mmap_mode="r")``, so all of them share one copy through the page
+cache, loading is just mapping the files, and adding workers leaves memory
+flat. Columns, one row per restaurant in id order:
+
+* ``ids`` (int64) and ``coordinates`` (float64 longitude, latitude; NaN
+  when unknown);
+* ``ratings`` (float32, 0 when unknown) and ``features`` (float32, one
+  column per :data:`FEATURE_FIELDS`).
+
+The build also records the position of the ``catalog:changes`` stream
+(:mod:`authenbite.restaurants.outbox`) read before loading the rows. Workers
+follow the stream from there and collect the restaurants changed since, which
+readers take from the database instead (see :attr:`CatalogSnapshot.changed_ids`).
+Past ``CATALOG_SNAPSHOT_MAX_CHANGES`` changes, or when the stream no longer
+reaches back to the build, the snapshot is not used until it is rebuilt.
+
+Workers check for a new snapshot, and for changes, at most every
+``CATALOG_SNAPSHOT_CHECK_INTERVAL`` seconds.
+"""
+
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from authenbite.restaurants.autocomplete import CHANGES_STREAM_KEY
+from authenbite.restaurants.autocomplete import RESTAURANT
+from authenbite.restaurants.autocomplete import last_change_id
+from authenbite.restaurants.models import Restaurant
+from authenbite.restaurants.store import decode
+from authenbite.restaurants.store import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Persona-related restaurant features, in the column order of ``features``.
+FEATURE_FIELDS = (
+    "adventure_rating",
+    "cultural_significance",
+    "planning_friendly",
+    "instagram_worthiness",
+)
+
+CURRENT = "current"
+# Stream position the snapshot was built at.
+CHANGE_ID_FILE = "last_change_id"
+COLUMNS = ("ids", "coordinates", "ratings", "features")
+
+
+def build(rows, path):
+    """
+    Write the snapshot for ``rows`` (``(id, location, rating, features)``
+    tuples in id order) into the directory ``path``.
+    """
+    rows = list(rows)
+    count = len(rows)
+    ids = np.empty(count, dtype=np.int64)
+    coordinates = np.full((count, 2), np.nan)
+    ratings = np.zeros(count, dtype=np.float32)
+    features = np.zeros((count, len(FEATURE_FIELDS)), dtype=np.float32)
+    for number, (pk, location, rating, row_features) in enumerate(rows):
+        ids[number] = pk
+        if location is not None:
+            coordinates[number] = (location.x, location.y)
+        ratings[number] = float(rating or 0)
+        features[number] = [float(value or 0) for value in row_features]
+
+    path = Path(path)
+    path.mkdir(parents=True)
+    for name, values in (
+        ("ids", ids),
+        ("coordinates", coordinates),
+        ("ratings", ratings),
+        ("features", features),
+    ):
+        np.save(path / f"{name}.npy", values)
+    return count
+
+
+def publish(root, directory):
+    """Point ``root/current`` at ``directory`` atomically."""
+    link = Path(root) / CURRENT
+    temporary = Path(root) / f".{CURRENT}.{os.getpid()}.tmp"
+    temporary.unlink(missing_ok=True)
+    temporary.symlink_to(Path(directory).name)
+    temporary.replace(link)
+
+
+def build_catalog_snapshot(root=None):
+    """Snapshot the catalog under ``root`` and make it current."""
+    root = Path(root or settings.CATALOG_SNAPSHOT_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    directory = root / timezone.now().strftime("%Y%m%dT%H%M%S%f")
+    # Read the stream position first so that changes committed while the
+    # rows are loading are treated as changed since the snapshot.
+    change_id = last_change_id(get_redis_client())
+    rows = (
+        Restaurant.objects.order_by("pk")
+        .values_list("pk", "location", "rating", *FEATURE_FIELDS)
+        .iterator(chunk_size=settings.RESTAURANT_EXPORT_CHUNK_SIZE)
+    )
+    count = build(((row[0], row[1], row[2], row[3:]) for row in rows), directory)
+    (directory / CHANGE_ID_FILE).write_text(change_id)
+    publish(root, directory)
+    _remove_old_snapshots(root, keep=directory)
+    return count, directory
+
+
+def _remove_old_snapshots(root, keep):
+    # Workers still mapping an older snapshot keep their mappings after the
+    # files are unlinked; only directories beyond the newest few are removed.
+    directories = sorted(
+        (path for path in root.iterdir() if path.is_dir() and not path.is_symlink()),
+        reverse=True,
+    )
+    for path in directories[settings.CATALOG_SNAPSHOT_KEEP :]:
+        if path != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class CatalogSnapshot:
+    """Read-only view over one snapshot directory."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        for name in COLUMNS:
+            setattr(self, name, np.load(self.path / f"{name}.npy", mmap_mode="r"))
+        change_file = self.path / CHANGE_ID_FILE
+        self.built_change_id = (
+            change_file.read_text() if change_file.exists() else "0-0"
+        )
+        self.last_change_id = self.built_change_id
+        self.change_count = 0
+        # Sorted ids of the restaurants changed since the build.
+        self.changed_ids = np.empty(0, dtype=np.int64)
+        self.outdated = False
+
+    def catch_up(self, client):
+        """
+        Collect the restaurants changed since the last call from the change
+        stream, marking the snapshot outdated when there are too many or the
+        stream was trimmed past the build.
+        """
+        if self.outdated:
+            return
+        if self.last_change_id == self.built_change_id != "0-0" and not (
+            client.xrange(
+                CHANGES_STREAM_KEY,
+                min=self.built_change_id,
+                max=self.built_change_id,
+            )
+        ):
+            self.outdated = True
+            return
+
+        limit = settings.CATALOG_SNAPSHOT_MAX_CHANGES
+        entries = client.xrange(
+            CHANGES_STREAM_KEY,
+            min=f"({self.last_change_id}",
+            count=max(limit - self.change_count, 0) + 1,
+        )
+        self.change_count += len(entries)
+        if self.change_count > limit:
+            self.outdated = True
+            return
+
+        changed = set()
+        for entry_id, raw_fields in entries:
+            fields = {decode(key): decode(value) for key, value in raw_fields.items()}
+            if fields["kind"] == RESTAURANT:
+                changed.update(map(int, fields["ids"].split(",")))
+            self.last_change_id = decode(entry_id)
+        if changed:
+            self.changed_ids = np.union1d(
+                self.changed_ids, np.array(sorted(changed), dtype=np.int64)
+            )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def prefault(self):
+        """Read one byte of every page so first lookups do not hit the disk."""
+        page = mmap.PAGESIZE
+        for name in COLUMNS:
+            column = getattr(self, name)
+            if column.size:
+                int(column.reshape(-1).view(np.uint8)[::page].sum())
+
+    def positions(self, restaurant_ids):
+        """
+        Return the row of each of ``restaurant_ids``, and a mask of which ones
+        are in the snapshot.
+        """
+        restaurant_ids = np.asarray(restaurant_ids, dtype=np.int64)
+        rows = np.searchsorted(self.ids, restaurant_ids)
+        rows = np.minimum(rows, max(len(self.ids) - 1, 0))
+        found = (
+            self.ids[rows] == restaurant_ids
+            if len(self.ids)
+            else np.zeros(len(restaurant_ids), dtype=bool)
+        )
+        return rows, found
+
+
+class _State:
+    lock = threading.Lock()
+    snapshot = None
+    target = None
+    checked_at = 0.0
+    # ``snapshot`` while it is caught up with the change stream, else None.
+    current = None
+
+
+def get_catalog_snapshot():
+    """
+    Return this process's mapping of the current snapshot, or ``None`` if
+    none has been built, it is outdated, or its changes cannot be read.
+    """
+    now = time.monotonic()
+    if now - _State.checked_at < settings.CATALOG_SNAPSHOT_CHECK_INTERVAL:
+        return _State.current
+
+    with _State.lock:
+        _State.checked_at = now
+        try:
+            target = (Path(settings.CATALOG_SNAPSHOT_ROOT) / CURRENT).resolve(
+                strict=True
+            )
+        except FileNotFoundError:
+            _State.snapshot = _State.target = _State.current = None
+            return None
+        if target != _State.target:
+            _State.snapshot = CatalogSnapshot(target)
+            _State.target = target
+        _State.current = None
+        try:
+            _State.snapshot.catch_up(get_redis_client())
+        except Exception:
+            # Without the stream the changed rows are unknown; the next check
+            # resumes from the last change read.
+            logger.exception("Could not read catalog changes")
+            return None
+        if not _State.snapshot.outdated:
+            _State.current = _State.snapshot
+        return _State.current
@@ -0,0 +1,149 @@
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.db import connection
+from django.utils import timezone
+
+from authenbite.restaurants.models import RestaurantStats
+from authenbite.restaurants.models import UserRestaurantInteraction
+
+STATS_TABLE = RestaurantStats._meta.db_table
+INTERACTION_TABLE = UserRestaurantInteraction._meta.db_table
+
+
+@dataclass
+class StatsDelta:
+    like_count: int = 0
+    visit_count: int = 0
+    rating_count: int = 0
+    rating_sum: int = 0
+
+    def __bool__(self):
+        return any(
+            (self.like_count, self.visit_count, self.rating_count, self.rating_sum)
+        )
+
+    def add(self, before, after):
+        """Accumulate the change between two interaction states (or ``None``)."""
+        before = before or {}
+        after = after or {}
+        self.like_count += (after.get("liked") is True) - (before.get("liked") is True)
+        self.visit_count += bool(after.get("visited")) - bool(before.get("visited"))
+        old_rating = before.get("user_rating")
+        new_rating = after.get("user_rating")
+        self.rating_count += (new_rating is not None) - (old_rating is not None)
+        self.rating_sum += (new_rating or 0) - (old_rating or 0)
+
+
+def interaction_state(interaction):
+    return {
+        "liked": interaction.liked,
+        "visited": interaction.visited,
+        "user_rating": interaction.user_rating,
+        "interaction_date": interaction.interaction_date,
+    }
+
+
+def apply_stats_deltas(deltas):
+    """
+    Add ``{restaurant_id: StatsDelta}`` to ``RestaurantStats`` in one
+    ``INSERT ... ON CONFLICT DO UPDATE`` statement.
+    """
+    deltas = {restaurant_id: delta for restaurant_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    now = timezone.now()
+    rows = []
+    params = []
+    for restaurant_id, delta in deltas.items():
+        rows.append("(%s, %s, %s, %s, %s, %s, %s)")
+        average = delta.rating_sum / delta.rating_count if delta.rating_count else None
+        params += [
+            restaurant_id,
+            delta.like_count,
+            delta.visit_count,
+            delta.rating_count,
+            delta.rating_sum,
+            average,
+            now,
+        ]
+
+    sql = f"""
+        INSERT INTO {STATS_TABLE} AS stats (
+            restaurant_id, like_count, visit_count, rating_count, rating_sum,
+            average_user_rating, updated_at
+        )
+        VALUES {", ".join(rows)}
+        ON CONFLICT (restaurant_id) DO UPDATE SET
+            like_count = stats.like_count + EXCLUDED.like_count,
+            visit_count = stats.visit_count + EXCLUDED.visit_count,
+            rating_count = stats.rating_count + EXCLUDED.rating_count,
+            rating_sum = stats.rating_sum + EXCLUDED.rating_sum,
+            average_user_rating = (stats.rating_sum + EXCLUDED.rating_sum)::numeric
+                / NULLIF(stats.rating_count + EXCLUDED.rating_count, 0),
+            updated_at = EXCLUDED.updated_at
+    """  # noqa: S608
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def reconcile_restaurant_stats():
+    """Recompute every ``RestaurantStats`` row from the interactions table."""
+    sql = f"""
+        INSERT INTO {STATS_TABLE} AS stats (
+            restaurant_id, like_count, visit_count, rating_count, rating_sum,
+            average_user_rating, updated_at
+        )
+        SELECT
+            restaurant_id,
+            COUNT(*) FILTER (WHERE liked),
+            COUNT(*) FILTER (WHERE visited),
+            COUNT(user_rating),
+            COALESCE(SUM(user_rating), 0),
+            AVG(user_rating),
+            NOW()
+        FROM {INTERACTION_TABLE}
+        GROUP BY restaurant_id
+        ON CONFLICT (restaurant_id) DO UPDATE SET
+            like_count = EXCLUDED.like_count,
+            visit_count = EXCLUDED.visit_count,
+            rating_count = EXCLUDED.rating_count,
+            rating_sum = EXCLUDED.rating_sum,
+            average_user_rating = EXCLUDED.average_user_rating,
+            updated_at = EXCLUDED.updated_at
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        cursor.execute(
+            f"""
+            UPDATE {STATS_TABLE}
+            SET like_count = 0, visit_count = 0, rating_count = 0,
+                rating_sum = 0, average_user_rating = NULL, updated_at = NOW()
+            WHERE restaurant_id NOT IN (
+                SELECT DISTINCT restaurant_id FROM {INTERACTION_TABLE}
+            )
+            """  # noqa: S608
+        )
+
+
+def collect_changes(changes, existing):
+    """
+    Build ``[(restaurant_id, before, after)]`` for upserting ``changes``
+    (``{(user_id, restaurant_id): {field: value}}``) over ``existing``
+    (``{(user_id, restaurant_id): state}``).
+    """
+    collected = []
+    for key, fields in changes.items():
+        before = existing.get(key)
+        after = {**(before or {"liked": None, "visited": False}), **fields}
+        collected.append((key[1], before, after))
+    return collected
+
+
+def collect_deltas(changes):
+    """Sum ``[(restaurant_id, before, after)]`` into ``{restaurant_id: StatsDelta}``."""
+    deltas = defaultdict(StatsDelta)
+    for restaurant_id, before, after in changes:
+        deltas[restaurant_id].add(before, after)
+    return deltas
@@ -0,0 +1,53 @@
+"""
+Access to the Redis server behind the default cache.
+
+Features that need Redis data structures (streams, hashes) go through
+:func:`get_redis_client`, which returns the django-redis connection of the
+default cache. Where there is no Redis server (local development, tests),
+``REDIS_CLIENT_CLASS`` names a client class, such as ``fakeredis.FakeRedis``,
+whose instance is shared by the process instead.
+"""
+
+import logging
+from functools import cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from django_redis import get_redis_connection
+from redis import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+def get_redis_client():
+    if settings.REDIS_CLIENT_CLASS:
+        return _process_client(settings.REDIS_CLIENT_CLASS)
+    return get_redis_connection("default")
+
+
+@cache
+def _process_client(client_class):
+    return import_string(client_class)()
+
+
+def decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def write_after_commit(write, *args):
+    """
+    Call ``write(*args)``, which writes data derived from the current
+    transaction to Redis, once the transaction commits. A Redis error is
+    logged rather than raised: the committed data is the source of truth,
+    popularity scores are rebuilt from it (manage.py rebuild_popularity) and
+    trending buckets expire on their own.
+    """
+
+    def callback():
+        try:
+            write(*args)
+        except RedisError:
+            logger.exception("Could not write %s to Redis", write.__name__)
+
+    transaction.on_commit(callback)
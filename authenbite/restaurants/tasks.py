@@ -0,0 +1,30 @@
+from celery import shared_task
+
+from .outbox import prune_catalog_changes
+from .outbox import relay_catalog_changes
+from .stats import reconcile_restaurant_stats
+from .write_behind import flush_interaction_events
+
+
+@shared_task()
+def flush_interactions():
+    """Apply queued write-behind interaction events to the database."""
+    return flush_interaction_events()
+
+
+@shared_task()
+def reconcile_stats():
+    """Correct drift in RestaurantStats from missed or concurrent deltas."""
+    reconcile_restaurant_stats()
+
+
+@shared_task()
+def relay_catalog_outbox():
+    """Publish catalog changes left in the outbox to the change stream."""
+    return relay_catalog_changes()
+
+
+@shared_task()
+def prune_catalog_outbox():
+    """Delete catalog outbox rows that were published long ago."""
+    return prune_catalog_changes()
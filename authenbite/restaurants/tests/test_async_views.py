@@ -0,0 +1,128 @@
+from asgiref.sync import sync_to_async
+from django.contrib.gis.geos import Point
+from django.test import TestCase
+from django.test import override_settings
+from django.urls import include
+from django.urls import path
+from rest_framework import status
+from rest_framework.routers import DefaultRouter
+
+from authenbite.restaurants.api.async_views import AsyncRestaurantViewSet
+from authenbite.restaurants.api.async_views import AsyncUserRestaurantInteractionViewSet
+from authenbite.restaurants.models import UserRestaurantInteraction
+from authenbite.restaurants.tests.factories import RestaurantFactory
+from authenbite.restaurants.tests.factories import UserFactory
+from authenbite.users.models import Persona
+from authenbite.users.tests.factories import PersonaFactory
+from authenbite.users.tests.factories import UserProfileFactory
+
+router = DefaultRouter()
+router.register("restaurants", AsyncRestaurantViewSet)
+router.register(
+    "user-restaurant-interactions",
+    AsyncUserRestaurantInteractionViewSet,
+    basename="user-restaurant-interaction",
+)
+urlpatterns = [path("api/", include(router.urls))]
+
+
+# Requests go through the full ASGI handler, which rejects async views that
+# would run under ATOMIC_REQUESTS.
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewSetTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        UserProfileFactory(user=cls.user, persona=PersonaFactory(name=Persona.ESCAPIST))
+        cls.restaurants = [
+            RestaurantFactory(
+                name=f"Noodle Bar {number}",
+                location=Point(2.35 + number / 100, 48.85, srid=4326),
+                adventure_rating=number % 10 + 1,
+            )
+            for number in range(12)
+        ]
+
+    async def login(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+
+    async def test_nearest_pages_through_results(self):
+        await self.login()
+        url = "/api/restaurants/nearest/"
+
+        response = await self.async_client.get(url, {"lat": 48.85, "lon": 2.35})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 12)
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]],
+            [restaurant.pk for restaurant in self.restaurants[:10]],
+        )
+        self.assertIsNotNone(response.data["next"])
+
+        response = await self.async_client.get(
+            url, {"lat": 48.85, "lon": 2.35, "page": 2}
+        )
+        self.assertEqual(len(response.data["results"]), 2)
+        response = await self.async_client.get(
+            url, {"lat": 48.85, "lon": 2.35, "page": 3}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_persona_recommendations_follow_persona(self):
+        await self.login()
+        response = await self.async_client.get(
+            "/api/restaurants/persona_recommendations/"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ratings = {
+            restaurant.pk: restaurant.adventure_rating
+            for restaurant in self.restaurants
+        }
+        results = [ratings[row["id"]] for row in response.data["results"]]
+        self.assertEqual(results, sorted(results, reverse=True))
+
+    async def test_search(self):
+        await self.login()
+        response = await self.async_client.get(
+            "/api/restaurants/search/", {"search": "Noodle Bar 11"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            self.restaurants[11].pk, [row["id"] for row in response.data["results"]]
+        )
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(
+            "/api/restaurants/nearest/", {"lat": 48.85, "lon": 2.35}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_interaction_actions(self):
+        await self.login()
+        url = "/api/user-restaurant-interactions/"
+        restaurant = self.restaurants[0]
+
+        response = await self.async_client.post(
+            f"{url}like_restaurant/", {"restaurant_id": restaurant.pk}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await self.async_client.post(
+            f"{url}rate_restaurant/", {"restaurant_id": restaurant.pk, "rating": 4}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        interaction = await UserRestaurantInteraction.objects.aget(
+            user=self.user, restaurant=restaurant
+        )
+        self.assertTrue(interaction.liked)
+        self.assertEqual(interaction.user_rating, 4)
+
+        response = await self.async_client.post(
+            f"{url}mark_visited/", {"restaurant_id": 999999}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,71 @@
+from django.contrib.gis.geos import Point
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from authenbite.restaurants import autocomplete
+from authenbite.restaurants.store import get_redis_client
+from authenbite.restaurants.tests.factories import CuisineFactory
+from authenbite.restaurants.tests.factories import RestaurantFactory
+from authenbite.restaurants.tests.factories import UserFactory
+
+
+@override_settings(AUTOCOMPLETE_REFRESH_INTERVAL=0)
+class AutocompleteTestCase(APITestCase):
+    url = "/api/autocomplete/"
+
+    def setUp(self):
+        get_redis_client().flushall()
+        autocomplete._State.index = None  # noqa: SLF001
+        self.client.force_authenticate(user=UserFactory())
+        self.near = RestaurantFactory(
+            name="Ramen Nagi", rating=4.0, location=Point(139.70, 35.66)
+        )
+        self.far = RestaurantFactory(
+            name="Ramen Café", rating=4.5, location=Point(-0.13, 51.51)
+        )
+        self.cuisine = CuisineFactory(name="Ramen")
+
+    def labels(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["label"] for item in response.data["results"]]
+
+    def test_prefix_matches_any_word(self):
+        self.assertEqual(self.labels(q="nag"), ["Ramen Nagi"])
+        self.assertEqual(self.labels(q="cafe"), ["Ramen Café"])
+
+    def test_distance_bias(self):
+        self.assertEqual(self.labels(q="ram")[0], "Ramen Café")
+        self.assertEqual(self.labels(q="ram", lat=35.66, lon=139.70)[0], "Ramen Nagi")
+
+    def test_queries_are_served_from_memory(self):
+        self.labels(q="ra")
+        with CaptureQueriesContext(connection) as queries:
+            self.labels(q="ramen n")
+        self.assertFalse(
+            [query for query in queries if query["sql"].startswith("SELECT")]
+        )
+
+    def test_catalog_changes_are_applied(self):
+        self.labels(q="ra")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.near.name = "Udon Shin"
+            self.near.save()
+        self.assertEqual(self.labels(q="udon"), ["Udon Shin"])
+        self.assertNotIn("Ramen Nagi", self.labels(q="ramen"))
+
+    @override_settings(AUTOCOMPLETE_BACKGROUND_REFRESH=True)
+    def test_refresh_does_not_hold_up_requests(self):
+        autocomplete.build_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.near.name = "Udon Shin"
+            self.near.save()
+        with CaptureQueriesContext(connection) as queries:
+            self.labels(q="ramen")
+        autocomplete._State.thread.join()  # noqa: SLF001
+        self.assertFalse(
+            [query for query in queries if query["sql"].startswith("SELECT")]
+        )
@@ -0,0 +1,70 @@
+from django.test import TestCase
+
+from authenbite.restaurants.autocomplete import CHANGES_STREAM_KEY
+from authenbite.restaurants.models import CatalogChange
+from authenbite.restaurants.outbox import _relay_after_commit
+from authenbite.restaurants.outbox import relay_catalog_changes
+from authenbite.restaurants.store import decode
+from authenbite.restaurants.store import get_redis_client
+from authenbite.restaurants.tests.factories import CuisineFactory
+from authenbite.restaurants.tests.factories import RestaurantFactory
+
+
+class CatalogOutboxTestCase(TestCase):
+    def setUp(self):
+        get_redis_client().flushall()
+        CatalogChange.objects.all().delete()
+
+    def events(self):
+        return [
+            {decode(key): decode(value) for key, value in fields.items()}
+            for _, fields in get_redis_client().xrange(CHANGES_STREAM_KEY)
+        ]
+
+    def test_changes_are_recorded_in_the_writing_transaction(self):
+        restaurant = RestaurantFactory()
+        cuisine = CuisineFactory()
+        restaurant.cuisines.add(cuisine)
+
+        self.assertEqual(self.events(), [])
+        self.assertTrue(
+            CatalogChange.objects.filter(
+                kind=CatalogChange.RESTAURANT, object_ids=[restaurant.pk]
+            ).exists()
+        )
+
+        self.assertEqual(relay_catalog_changes(), CatalogChange.objects.count())
+        self.assertEqual(
+            self.events(),
+            [
+                {"kind": "restaurant", "ids": str(restaurant.pk)},
+                {"kind": "cuisine", "ids": str(cuisine.pk)},
+            ],
+        )
+        self.assertFalse(CatalogChange.objects.filter(published_at__isnull=True))
+        self.assertEqual(relay_catalog_changes(), 0)
+
+    def test_changes_are_relayed_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            restaurant = RestaurantFactory()
+
+        self.assertEqual(
+            self.events(), [{"kind": "restaurant", "ids": str(restaurant.pk)}]
+        )
+
+    def test_repeated_relays_publish_each_change_once(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            restaurants = RestaurantFactory.create_batch(3)
+
+        self.assertEqual(
+            callbacks.count(_relay_after_commit), CatalogChange.objects.count()
+        )
+        self.assertEqual(
+            self.events(),
+            [
+                {
+                    "kind": "restaurant",
+                    "ids": ",".join(str(restaurant.pk) for restaurant in restaurants),
+                }
+            ],
+        )
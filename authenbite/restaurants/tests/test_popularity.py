@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from authenbite.restaurants import popularity
+from authenbite.restaurants.store import get_redis_client
+from authenbite.restaurants.tests.factories import CuisineFactory
+from authenbite.restaurants.tests.factories import RestaurantFactory
+from authenbite.restaurants.tests.factories import UserFactory
+
+
+class PopularityTestCase(APITestCase):
+    def setUp(self):
+        get_redis_client().flushall()
+        self.user = UserFactory()
+        self.cuisines = CuisineFactory.create_batch(2)
+        self.restaurant = RestaurantFactory()
+        self.restaurant.cuisines.set([self.cuisines[1]])
+        self.client.force_authenticate(user=self.user)
+
+    def like(self, restaurant):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/user-restaurant-interactions/like_restaurant/",
+                {"restaurant_id": restaurant.pk},
+            )
+
+    def test_liked_restaurant_and_cuisine_rank_first(self):
+        self.like(self.restaurant)
+
+        response = self.client.get("/api/cuisines/popular/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["id"], self.cuisines[1].pk)
+        self.assertGreater(response.data[0]["score"], 0)
+
+        response = self.client.get("/api/restaurants/popular/", {"window": "week"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.data], [self.restaurant.pk])
+
+    def test_unlike_takes_back_what_the_like_added(self):
+        liked_at = timezone.now() - timedelta(days=30)
+        liked = {"liked": True, "visited": False, "user_rating": None}
+        popularity.record_interaction_popularity(
+            [(self.restaurant.pk, None, liked)], at=liked_at
+        )
+        popularity.record_interaction_popularity(
+            [
+                (
+                    self.restaurant.pk,
+                    {**liked, "interaction_date": liked_at},
+                    {**liked, "liked": False},
+                )
+            ]
+        )
+
+        score = popularity.scores(popularity.RESTAURANTS, [self.restaurant.pk])
+        self.assertAlmostEqual(score[self.restaurant.pk], 0)
+        self.assertEqual(popularity.top(popularity.RESTAURANTS, 10, window="week"), [])
+
+    def test_repeated_favorite_cuisine_counts_once(self):
+        cuisine = self.cuisines[0]
+        weight = settings.POPULARITY_WEIGHTS["favorite"]
+        # Removals are not debited, the credit decays instead.
+        for action, expected in (
+            ("add_favorite_cuisine", weight),
+            ("remove_favorite_cuisine", weight),
+            ("add_favorite_cuisine", weight * 2),
+        ):
+            for _ in range(3):
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.post(
+                        f"/api/user-preferences/{action}/",
+                        {"cuisine_id": cuisine.pk},
+                    )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+            score = popularity.scores(popularity.CUISINES, [cuisine.pk])
+            self.assertAlmostEqual(score[cuisine.pk], expected)
+
+    def test_popular_cuisines_without_activity(self):
+        response = self.client.get("/api/cuisines/popular/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["id"], self.cuisines[1].pk)
+        self.assertEqual(response.data[0]["score"], 0)
+
+    def test_unknown_window(self):
+        response = self.client.get("/api/cuisines/popular/", {"window": "year"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_trending_near_location(self):
+        self.restaurant.location = Point(-0.1276, 51.5072, srid=4326)
+        self.restaurant.save()
+        self.like(self.restaurant)
+
+        response = self.client.get(
+            "/api/restaurants/trending/",
+            {"lat": "51.51", "lon": "-0.13", "window": "1h"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.data], [self.restaurant.pk])
+
+        response = self.client.get(
+            "/api/restaurants/trending/", {"lat": "40.71", "lon": "-74.0"}
+        )
+        self.assertEqual(response.data, [])
+
+    def test_trending_requires_both_coordinates(self):
+        response = self.client.get("/api/restaurants/trending/", {"lat": "51.5"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,44 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.test import override_settings
+
+from authenbite.restaurants import reference
+from authenbite.restaurants.tests.factories import CuisineFactory
+from authenbite.users.models import Persona
+from authenbite.users.tests.factories import PersonaFactory
+
+
+@override_settings(REFERENCE_CACHE_CHECK_INTERVAL=0)
+class ReferenceTableTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        reference.cuisines.clear()
+        reference.personas.clear()
+        self.cuisine = CuisineFactory(name="Thai")
+
+    def test_lookups_are_served_from_memory(self):
+        self.assertEqual(reference.cuisines.get(pk=str(self.cuisine.pk)).name, "Thai")
+        with self.assertNumQueries(0):
+            self.assertEqual(reference.cuisines.get(pk=self.cuisine.pk).name, "Thai")
+
+        persona = PersonaFactory(name=Persona.PLANNER)
+        self.assertEqual(reference.personas.get(name=Persona.PLANNER), persona)
+        with self.assertNumQueries(0):
+            self.assertIsNone(reference.cuisines.get(pk="not-a-number"))
+
+    def test_version_bump_reloads_table(self):
+        reference.cuisines.get(pk=self.cuisine.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cuisine.name = "Thai Street Food"
+            self.cuisine.save()
+
+        self.assertEqual(
+            reference.cuisines.get(pk=self.cuisine.pk).name, "Thai Street Food"
+        )
+
+    def test_missing_rows_fall_back_to_database(self):
+        reference.cuisines.get(pk=self.cuisine.pk)
+        created = CuisineFactory(name="Lao")
+
+        self.assertEqual(reference.cuisines.get(pk=created.pk), created)
+        self.assertIsNone(reference.cuisines.get(pk=created.pk + 1))
@@ -0,0 +1,112 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from authenbite.restaurants.cache import CACHE_STATUS_HEADER
+from authenbite.restaurants.singleflight import HIT
+from authenbite.restaurants.singleflight import MISS
+from authenbite.restaurants.singleflight import STALE
+from authenbite.restaurants.singleflight import get_or_compute
+from authenbite.restaurants.tests.factories import RestaurantFactory
+from authenbite.restaurants.tests.factories import UserFactory
+from authenbite.users.models import Persona
+from authenbite.users.tests.factories import PersonaFactory
+from authenbite.users.tests.factories import UserProfileFactory
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory()
+        self.restaurants = RestaurantFactory.create_batch(3)
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_is_served_from_cache(self):
+        first = self.client.get("/api/restaurants/", {"ordering": "name"})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first[CACHE_STATUS_HEADER], "MISS")
+
+        second = self.client.get("/api/restaurants/", {"ordering": "name"})
+        self.assertEqual(second[CACHE_STATUS_HEADER], "HIT")
+        self.assertEqual(first.content, second.content)
+
+    def test_query_params_are_normalized(self):
+        self.client.get("/api/restaurants/", {"ordering": "name", "name": ""})
+        response = self.client.get("/api/restaurants/", {"ordering": "name"})
+        self.assertEqual(response[CACHE_STATUS_HEADER], "HIT")
+
+    def test_catalog_write_invalidates(self):
+        self.client.get("/api/restaurants/")
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantFactory()
+
+        response = self.client.get("/api/restaurants/")
+        self.assertEqual(response[CACHE_STATUS_HEADER], "MISS")
+        self.assertEqual(response.data["count"], 4)
+
+    def test_per_user_filters_bypass_cache(self):
+        self.client.get("/api/restaurants/", {"is_favorite": "true"})
+        response = self.client.get("/api/restaurants/", {"is_favorite": "true"})
+        self.assertNotIn(CACHE_STATUS_HEADER, response)
+
+    def test_nearest_shares_entry_for_rounded_coordinates(self):
+        self.client.get("/api/restaurants/nearest/", {"lat": 1.00001, "lon": 1.00001})
+        response = self.client.get(
+            "/api/restaurants/nearest/", {"lat": 1.00002, "lon": 1.00002}
+        )
+        self.assertEqual(response[CACHE_STATUS_HEADER], "HIT")
+
+    def test_persona_recommendations_are_shared_per_persona(self):
+        persona = PersonaFactory(name=Persona.DREAMER)
+        UserProfileFactory(user=self.user, persona=persona)
+        other = UserFactory()
+        UserProfileFactory(user=other, persona=persona)
+
+        response = self.client.get("/api/restaurants/persona_recommendations/")
+        self.assertEqual(response[CACHE_STATUS_HEADER], "MISS")
+        self.client.force_authenticate(user=other)
+        response = self.client.get("/api/restaurants/persona_recommendations/")
+        self.assertEqual(response[CACHE_STATUS_HEADER], "HIT")
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stale_value_is_served_while_another_caller_refreshes(self):
+        self.assertEqual(get_or_compute("key", lambda: 1, 60, version=1), (1, MISS))
+        self.assertEqual(get_or_compute("key", lambda: 2, 60, version=1), (1, HIT))
+
+        cache.add("key:lock", "another-worker")
+        self.assertEqual(get_or_compute("key", lambda: 2, 60, version=2), (1, STALE))
+        cache.delete("key:lock")
+        self.assertEqual(get_or_compute("key", lambda: 2, 60, version=2), (2, MISS))
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(get_or_compute("key", compute, 60))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({value for value, _ in results}, {"value"})
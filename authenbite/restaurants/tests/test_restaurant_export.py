@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from authenbite.restaurants.export import EXPORT_FIELDS
+from authenbite.restaurants.tests.factories import CuisineFactory
+from authenbite.restaurants.tests.factories import RestaurantFactory
+from authenbite.restaurants.tests.factories import UserFactory
+
+
+class RestaurantExportTestCase(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.cuisine = CuisineFactory(name="Italian")
+        self.restaurants = RestaurantFactory.create_batch(
+            12, cuisines=[self.cuisine], price_level=2
+        )
+        RestaurantFactory(price_level=4)
+        self.client.force_authenticate(user=self.user)
+
+    def test_export_ndjson(self):
+        response = self.client.get("/api/restaurants/export/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 13)
+        row = json.loads(lines[0])
+        self.assertEqual(row["id"], self.restaurants[0].id)
+        self.assertEqual(row["cuisines"], ["Italian"])
+
+    def test_export_csv_applies_filters(self):
+        response = self.client.get(
+            "/api/restaurants/export/", {"export_format": "csv", "max_price": 2}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], EXPORT_FIELDS)
+        self.assertEqual(len(rows), 13)
+
+    def test_export_rejects_unknown_format(self):
+        response = self.client.get("/api/restaurants/export/", {"export_format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        out = io.StringIO()
+        call_command(
+            "export_restaurants", "--chunk-size=5", "--filter=max_price=2", stdout=out
+        )
+        self.assertEqual(len(out.getvalue().splitlines()), 12)
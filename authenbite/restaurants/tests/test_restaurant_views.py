@@ -1,7 +1,19 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
 from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from authenbite.restaurants import snapshot
+from authenbite.restaurants import text_index
 from authenbite.restaurants.models import UserPreference, UserRestaurantInteraction
 from authenbite.restaurants.tests.factories import (
     CuisineFactory,
@@ -73,6 +85,145 @@ class RestaurantViewSetTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertGreater(len(response.data["results"]), 0)
 
+    def test_full_text_search_ranks_name_matches_first(self):
+        self.client.force_authenticate(user=self.user)
+        by_summary = RestaurantFactory(review_summary="Famous for its gnocchi")
+        by_name = RestaurantFactory(name="Gnocchi House")
+        by_cuisine = RestaurantFactory()
+        by_cuisine.cuisines.add(CuisineFactory(name="Gnocchi"))
+
+        response = self.client.get("/api/restaurants/search/", {"search": "gnocchi"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]],
+            [by_name.pk, by_cuisine.pk, by_summary.pk],
+        )
+
+    def test_fuzzy_search_matches_misspelt_names(self):
+        self.client.force_authenticate(user=self.user)
+        restaurant = RestaurantFactory(name="Trattoria Napoli")
+
+        response = self.client.get(
+            "/api/restaurants/search/", {"search": "Tratoria Napolli", "mode": "fuzzy"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["id"], restaurant.pk)
+
+        response = self.client.get(
+            "/api/cuisines/", {"search": "Itallian", "mode": "fuzzy"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["id"], self.cuisine.pk)
+
+    def test_text_search_over_review_summaries(self):
+        self.client.force_authenticate(user=self.user)
+        cozy = RestaurantFactory(
+            review_summary="A cozy ramen bar with rich broth and vegan options."
+        )
+        RestaurantFactory(review_summary="Loud sports bar known for its wings.")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "review-summaries.idx"
+            with override_settings(TEXT_INDEX_PATH=path, TEXT_INDEX_CHECK_INTERVAL=0):
+                call_command("build_text_index", stdout=StringIO())
+                response = self.client.get(
+                    "/api/restaurants/search/",
+                    {"search": "cozy ramen with vegan options", "mode": "text"},
+                )
+                # Do not keep the deleted index mapped for later tests.
+                text_index._State.index = None  # noqa: SLF001
+                text_index._State.signature = None  # noqa: SLF001
+                text_index._State.checked_at = 0.0  # noqa: SLF001
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.data["results"]], [cozy.pk])
+
+    def test_hybrid_search_prefers_nearby_matches(self):
+        self.client.force_authenticate(user=self.escapist_user)
+        far = RestaurantFactory(
+            name="Ramen Far", location=Point(10.0, 50.0, srid=4326), rating=5
+        )
+        near = RestaurantFactory(
+            name="Ramen Near",
+            location=Point(2.35, 48.85, srid=4326),
+            rating=3,
+            adventure_rating=9,
+        )
+        unrelated = RestaurantFactory(
+            name="Burger Corner", location=Point(2.35, 48.86, srid=4326), rating=5
+        )
+
+        response = self.client.get(
+            "/api/restaurants/search/",
+            {"search": "ramen", "mode": "hybrid", "lat": 48.86, "lon": 2.35},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual(ids[:1], [near.pk])
+        self.assertIn(far.pk, ids)
+        self.assertNotIn(unrelated.pk, ids)
+
+        response = self.client.get(
+            "/api/restaurants/search/",
+            {"search": "ramen", "mode": "hybrid", "lat": 48.86},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_hybrid_list_is_cached_per_persona(self):
+        cache.clear()
+        location = Point(2.35, 48.85, srid=4326)
+        common = {"location": location, "rating": 4}
+        adventurous = RestaurantFactory(
+            name="Ramen Volcano", adventure_rating=10, cultural_significance=0, **common
+        )
+        traditional = RestaurantFactory(
+            name="Ramen Heritage",
+            adventure_rating=0,
+            cultural_significance=10,
+            **common,
+        )
+        params = {"search": "ramen", "mode": "hybrid", "lat": 48.85, "lon": 2.35}
+
+        for user, expected in (
+            (self.escapist_user, adventurous),
+            (self.learner_user, traditional),
+        ):
+            self.client.force_authenticate(user=user)
+            response = self.client.get("/api/restaurants/", params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["results"][0]["id"], expected.pk)
+
+    def test_hybrid_search_reads_catalog_snapshot(self):
+        self.client.force_authenticate(user=self.escapist_user)
+        near = RestaurantFactory(
+            name="Ramen Near", location=Point(2.35, 48.85, srid=4326), rating=3
+        )
+        RestaurantFactory(name="Ramen Far", location=Point(10.0, 50.0, srid=4326))
+
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                CATALOG_SNAPSHOT_ROOT=Path(directory),
+                CATALOG_SNAPSHOT_CHECK_INTERVAL=0,
+            ):
+                call_command("build_catalog_snapshot", stdout=StringIO())
+                response = self.client.get(
+                    "/api/restaurants/search/",
+                    {"search": "ramen", "mode": "hybrid", "lat": 48.86, "lon": 2.35},
+                )
+                # Do not keep the deleted snapshot mapped for later tests.
+                snapshot._State.snapshot = None  # noqa: SLF001
+                snapshot._State.current = None  # noqa: SLF001
+                snapshot._State.checked_at = 0.0  # noqa: SLF001
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["id"], near.pk)
+
+    def test_search_rejects_unknown_mode(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(
+            "/api/restaurants/search/", {"search": "pizza", "mode": "psychic"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_nearest_restaurants(self):
         self.client.force_authenticate(user=self.user)
         url = "/api/restaurants/nearest/"
@@ -127,6 +278,29 @@ class RestaurantViewSetTestCase(APITestCase):
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             self.assertGreater(len(response.data["results"]), 0)
 
+    def test_suggest_refreshes_personalization_after_dislike(self):
+        self.client.force_authenticate(user=self.user)
+        UserPreference.objects.filter(user=self.user).update(
+            preferred_price_level=None, preferred_rating=None
+        )
+        self.user.userpreference.favorite_cuisines.clear()
+        restaurant = self.restaurants[1]
+        params = {"suggest": "true", "name": restaurant.name}
+
+        response = self.client.get("/api/restaurants/", params)
+        self.assertIn(restaurant.pk, [item["id"] for item in response.data["results"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserRestaurantInteraction.objects.create(
+                user=self.user, restaurant=restaurant, liked=False
+            )
+
+        response = self.client.get("/api/restaurants/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(
+            restaurant.pk, [item["id"] for item in response.data["results"]]
+        )
+
     def test_persona_recommendations(self):
         for user in [
             self.escapist_user,
@@ -183,3 +357,78 @@ class RestaurantViewSetTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["results"]), 5)
         self.assertIsNotNone(response.data["next"])
+
+    def test_bulk_restaurants(self):
+        self.client.force_authenticate(user=self.user)
+        ids = [self.restaurants[3].pk, self.restaurants[1].pk, 999999]
+        response = self.client.get(
+            "/api/restaurants/bulk/", {"ids": ",".join(map(str, ids))}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in response.data["results"]], ids[:2])
+        self.assertEqual(response.data["missing"], [999999])
+
+    def test_bulk_restaurants_invalid_ids(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get("/api/restaurants/bulk/", {"ids": "1,abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RestaurantFacetsTestCase(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=UserFactory())
+        self.italian = CuisineFactory(name="Italian")
+        self.thai = CuisineFactory(name="Thai")
+        RestaurantFactory(
+            price_level=1, vegan_options=True, rating=4.5, cuisines=[self.italian]
+        )
+        RestaurantFactory(
+            price_level=1,
+            vegan_options=False,
+            rating=3.2,
+            cuisines=[self.italian, self.thai],
+        )
+        RestaurantFactory(price_level=3, vegan_options=False, rating=4.1)
+
+    def test_facets_follow_filters(self):
+        response = self.client.get(
+            "/api/restaurants/",
+            {"facets": "cuisine,price_level,vegan_options,rating", "max_price": 2},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+        facets = response.data["facets"]
+        self.assertEqual(
+            [(bucket["label"], bucket["count"]) for bucket in facets["cuisine"]],
+            [("Italian", 2), ("Thai", 1)],
+        )
+        self.assertEqual(facets["price_level"], [{"value": 1, "count": 2}])
+        self.assertEqual(
+            facets["vegan_options"],
+            [{"value": False, "count": 1}, {"value": True, "count": 1}],
+        )
+        self.assertEqual(
+            facets["rating"], [{"value": 3, "count": 1}, {"value": 4, "count": 1}]
+        )
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_facet_counts_are_shared_across_locations(self):
+        cache.clear()
+        for lat, lon in (("51.51", "-0.13"), ("35.66", "139.70")):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    "/api/restaurants/",
+                    {"facets": "price_level", "lat": lat, "lon": lon},
+                )
+            self.assertEqual(
+                response.data["facets"]["price_level"],
+                [{"value": 1, "count": 2}, {"value": 3, "count": 1}],
+            )
+        # The second location reused the counts of the first.
+        self.assertFalse(
+            [query for query in queries if "GROUPING SETS" in query["sql"]]
+        )
+
+    def test_unknown_facet(self):
+        response = self.client.get("/api/restaurants/", {"facets": "colour"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,63 @@
+import tempfile
+from pathlib import Path
+
+from django.contrib.gis.geos import Point
+from django.test import TestCase
+from django.test import override_settings
+
+from authenbite.restaurants import snapshot
+from authenbite.restaurants.outbox import relay_catalog_changes
+from authenbite.restaurants.tests.factories import RestaurantFactory
+
+
+class CatalogSnapshotTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            CATALOG_SNAPSHOT_ROOT=Path(directory.name),
+            CATALOG_SNAPSHOT_CHECK_INTERVAL=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(self.forget_snapshot)
+
+        self.late = RestaurantFactory(location=Point(2.35, 48.85, srid=4326))
+        self.other = RestaurantFactory()
+
+    def forget_snapshot(self):
+        state = snapshot._State  # noqa: SLF001
+        state.snapshot = state.target = state.current = None
+        state.checked_at = 0.0
+
+    def test_snapshot_columns(self):
+        count, _ = snapshot.build_catalog_snapshot()
+        current = snapshot.get_catalog_snapshot()
+
+        self.assertEqual(count, 2)
+        rows, found = current.positions([self.other.pk, self.late.pk, 0])
+        self.assertEqual(found.tolist(), [True, True, False])
+        self.assertEqual(current.ids[rows[1]], self.late.pk)
+        self.assertEqual(current.coordinates[rows[1]].tolist(), [2.35, 48.85])
+
+    def test_new_snapshot_replaces_current(self):
+        snapshot.build_catalog_snapshot()
+        first = snapshot.get_catalog_snapshot()
+        RestaurantFactory()
+        snapshot.build_catalog_snapshot()
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(snapshot.get_catalog_snapshot()), 3)
+
+    def test_restaurants_changed_since_the_build_are_tracked(self):
+        relay_catalog_changes()
+        snapshot.build_catalog_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.late.rating = 1
+            self.late.save()
+
+        current = snapshot.get_catalog_snapshot()
+        self.assertEqual(current.changed_ids.tolist(), [self.late.pk])
+
+        with override_settings(CATALOG_SNAPSHOT_MAX_CHANGES=0):
+            self.assertIsNone(snapshot.get_catalog_snapshot())
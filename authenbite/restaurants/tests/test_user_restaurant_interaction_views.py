@@ -0,0 +1,182 @@
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from authenbite.restaurants.models import RestaurantStats
+from authenbite.restaurants.models import UserRestaurantInteraction
+from authenbite.restaurants.stats import reconcile_restaurant_stats
+from authenbite.restaurants.store import get_redis_client
+from authenbite.restaurants.tests.factories import RestaurantFactory
+from authenbite.restaurants.tests.factories import UserFactory
+from authenbite.restaurants.write_behind import flush_interaction_events
+
+
+class UserRestaurantInteractionViewSetTestCase(APITestCase):
+    url = "/api/user-restaurant-interactions/"
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.restaurants = RestaurantFactory.create_batch(3)
+        self.client.force_authenticate(user=self.user)
+
+    def test_like_then_rate_keeps_both_fields(self):
+        restaurant = self.restaurants[0]
+        response = self.client.post(
+            f"{self.url}like_restaurant/", {"restaurant_id": restaurant.pk}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["liked"])
+
+        response = self.client.post(
+            f"{self.url}rate_restaurant/", {"restaurant_id": restaurant.pk, "rating": 4}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        interaction = UserRestaurantInteraction.objects.get(
+            user=self.user, restaurant=restaurant
+        )
+        self.assertTrue(interaction.liked)
+        self.assertEqual(interaction.user_rating, 4)
+
+    def test_like_unknown_restaurant(self):
+        response = self.client.post(
+            f"{self.url}like_restaurant/", {"restaurant_id": 999999}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rate_restaurant_out_of_range(self):
+        response = self.client.post(
+            f"{self.url}rate_restaurant/",
+            {"restaurant_id": self.restaurants[0].pk, "rating": 6},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch(self):
+        first, second, third = self.restaurants
+        UserRestaurantInteraction.objects.create(
+            user=self.user, restaurant=third, visited=True
+        )
+        operations = [
+            {"restaurant_id": first.pk, "liked": True},
+            {"restaurant_id": first.pk, "rating": 5},
+            {"restaurant_id": second.pk, "visited": True},
+            {"restaurant_id": third.pk, "liked": False},
+            {"restaurant_id": 999999, "liked": True},
+        ]
+        response = self.client.post(
+            f"{self.url}batch/", {"operations": operations}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["missing"], [999999])
+        self.assertEqual(len(response.data["results"]), 3)
+
+        interactions = {
+            interaction.restaurant_id: interaction
+            for interaction in UserRestaurantInteraction.objects.filter(user=self.user)
+        }
+        self.assertTrue(interactions[first.pk].liked)
+        self.assertEqual(interactions[first.pk].user_rating, 5)
+        self.assertTrue(interactions[second.pk].visited)
+        self.assertFalse(interactions[third.pk].liked)
+        self.assertTrue(interactions[third.pk].visited)
+
+    def test_batch_requires_a_change(self):
+        response = self.client.post(
+            f"{self.url}batch/",
+            {"operations": [{"restaurant_id": self.restaurants[0].pk}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stats_follow_interactions(self):
+        restaurant = self.restaurants[0]
+        other_user = UserFactory()
+        UserRestaurantInteraction.objects.create(
+            user=other_user, restaurant=restaurant, liked=True, user_rating=2
+        )
+        reconcile_restaurant_stats()
+
+        self.client.post(
+            f"{self.url}like_restaurant/", {"restaurant_id": restaurant.pk}
+        )
+        self.client.post(
+            f"{self.url}rate_restaurant/", {"restaurant_id": restaurant.pk, "rating": 5}
+        )
+        stats = RestaurantStats.objects.get(restaurant=restaurant)
+        self.assertEqual(stats.like_count, 2)
+        self.assertEqual(stats.rating_count, 2)
+        self.assertEqual(float(stats.average_user_rating), 3.5)
+
+        self.client.post(
+            f"{self.url}unlike_restaurant/", {"restaurant_id": restaurant.pk}
+        )
+        stats.refresh_from_db()
+        self.assertEqual(stats.like_count, 1)
+
+        response = self.client.get(
+            "/api/restaurants/", {"ordering": "-like_count", "min_likes": 1}
+        )
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["like_count"], 1)
+
+
+@override_settings(INTERACTION_WRITE_BEHIND=True)
+class WriteBehindInteractionTestCase(APITestCase):
+    url = "/api/user-restaurant-interactions/"
+
+    def setUp(self):
+        get_redis_client().flushall()
+        self.user = UserFactory()
+        self.restaurant = RestaurantFactory()
+        self.client.force_authenticate(user=self.user)
+
+    def test_like_is_queued_and_visible_to_the_user(self):
+        response = self.client.post(
+            f"{self.url}like_restaurant/", {"restaurant_id": self.restaurant.pk}
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(response.data["liked"])
+        self.assertFalse(UserRestaurantInteraction.objects.exists())
+
+        response = self.client.get(f"{self.url}liked_restaurants/")
+        self.assertEqual(
+            [item["restaurant"] for item in response.data], [self.restaurant.pk]
+        )
+
+    def test_queued_likes_apply_to_the_users_filtered_reads(self):
+        disliked = RestaurantFactory()
+        self.client.post(
+            f"{self.url}like_restaurant/", {"restaurant_id": self.restaurant.pk}
+        )
+        self.client.post(
+            f"{self.url}unlike_restaurant/", {"restaurant_id": disliked.pk}
+        )
+
+        response = self.client.get("/api/restaurants/", {"is_favorite": "true"})
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]], [self.restaurant.pk]
+        )
+
+        response = self.client.get(self.url, {"liked": "false"})
+        self.assertEqual(
+            [item["restaurant"] for item in response.data["results"]], [disliked.pk]
+        )
+
+        response = self.client.get("/api/restaurants/", {"suggest": "true"})
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertIn(self.restaurant.pk, ids)
+        self.assertNotIn(disliked.pk, ids)
+
+    def test_flush_coalesces_events(self):
+        self.client.post(
+            f"{self.url}like_restaurant/", {"restaurant_id": self.restaurant.pk}
+        )
+        self.client.post(
+            f"{self.url}rate_restaurant/",
+            {"restaurant_id": self.restaurant.pk, "rating": 3},
+        )
+
+        self.assertEqual(flush_interaction_events(), 2)
+        interaction = UserRestaurantInteraction.objects.get(user=self.user)
+        self.assertTrue(interaction.liked)
+        self.assertEqual(interaction.user_rating, 3)
+        self.assertEqual(flush_interaction_events(), 0)
@@ -0,0 +1,56 @@
+from django.test import TestCase
+from django.test import override_settings
+
+from config import warmup
+
+
+def failing_step():
+    raise RuntimeError
+
+
+@override_settings(WARM_UP_REQUIRED=True)
+class WarmUpTestCase(TestCase):
+    def setUp(self):
+        state = warmup._State  # noqa: SLF001
+        self.addCleanup(setattr, state, "ready", state.ready)
+        state.ready = False
+
+    def probe(self):
+        def application(environ, start_response):
+            start_response("404 Not Found", [])
+            return [b"application"]
+
+        statuses = []
+        body = warmup.ReadinessProbe(application)(
+            {"PATH_INFO": "/readyz/"},
+            lambda status, headers: statuses.append(status),
+        )
+        return statuses[0], b"".join(body)
+
+    def test_probe_fails_until_warm_up_has_run(self):
+        self.assertEqual(self.probe(), ("503 Service Unavailable", b"warming up\n"))
+
+        timings = warmup.warm_up()
+
+        self.assertEqual(set(timings), {name for name, _ in warmup.STEPS})
+        self.assertNotIn(None, timings.values())
+        self.assertEqual(self.probe(), ("200 OK", b"ready\n"))
+
+    def test_failing_step_does_not_block_readiness(self):
+        timings = warmup.warm_up(
+            steps=(("broken", failing_step), ("url_resolver", warmup.warm_url_resolver))
+        )
+
+        self.assertIsNone(timings["broken"])
+        self.assertIsNotNone(timings["url_resolver"])
+        self.assertTrue(warmup.is_ready())
+
+    def test_other_paths_reach_the_application(self):
+        def application(environ, start_response):
+            start_response("404 Not Found", [])
+            return [b"application"]
+
+        body = warmup.ReadinessProbe(application)(
+            {"PATH_INFO": "/api/restaurants/"}, lambda status, headers: None
+        )
+        self.assertEqual(body, [b"application"])
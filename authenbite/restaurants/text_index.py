@@ -0,0 +1,255 @@
+"""
+BM25 inverted index over ``Restaurant.review_summary``.
+
+``build_text_index`` writes the index to a single file that web workers map
+into memory read-only, so every worker on a host shares one copy through the
+page cache. All sections are flat arrays:
+
+* restaurant ids and document lengths, one entry per document;
+* the vocabulary as sorted, newline-separated UTF-8 terms, with each term's
+  postings offset and document frequency;
+* postings: document numbers and term frequencies, grouped by term.
+
+The file is replaced atomically, and workers pick up a new one on their next
+check.
+"""
+
+import heapq
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from collections import Counter
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+from authenbite.restaurants.autocomplete import normalize
+from authenbite.restaurants.models import Restaurant
+
+MAGIC = b"ABTX"
+FORMAT_VERSION = 1
+# magic, version, documents, terms, postings, average document length
+HEADER = struct.Struct("<4sIIIQd")
+ALIGNMENT = 8
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be but by for from has have in is it its of on or our
+    so that the their there this to was were which while with you your
+    """.split()
+)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lower-case word tokens with stopwords dropped and plurals folded."""
+    tokens = []
+    for word in _TOKEN.findall(normalize(text)):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):  # noqa: PLR2004
+            tokens.append(word[:-1])
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def _padded(data):
+    return data + b"\0" * (-len(data) % ALIGNMENT)
+
+
+def build(documents, path):
+    """
+    Write the index for ``documents`` (``(restaurant_id, text)`` pairs) to
+    ``path``, replacing any previous file atomically.
+    """
+    doc_ids = array("q")
+    doc_lengths = array("I")
+    postings = defaultdict(list)
+    for restaurant_id, text in documents:
+        counts = Counter(tokenize(text))
+        if not counts:
+            continue
+        document = len(doc_ids)
+        doc_ids.append(restaurant_id)
+        doc_lengths.append(sum(counts.values()))
+        for term, count in counts.items():
+            postings[term].append((document, count))
+
+    terms = sorted(postings)
+    offsets = array("Q")
+    frequencies = array("I")
+    posting_docs = array("I")
+    posting_counts = array("H")
+    for term in terms:
+        offsets.append(len(posting_docs))
+        frequencies.append(len(postings[term]))
+        for document, count in postings[term]:
+            posting_docs.append(document)
+            posting_counts.append(min(count, 0xFFFF))
+    offsets.append(len(posting_docs))
+
+    sections = [
+        doc_ids,
+        doc_lengths,
+        offsets,
+        frequencies,
+        posting_docs,
+        posting_counts,
+    ]
+    average_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+    vocabulary = "\n".join(terms).encode()
+    header = HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        len(doc_ids),
+        len(terms),
+        len(posting_docs),
+        average_length,
+    )
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with temporary.open("wb") as file:
+        file.write(_padded(header))
+        file.write(struct.pack("<Q", len(vocabulary)))
+        file.write(_padded(vocabulary))
+        for section in sections:
+            file.write(_padded(section.tobytes()))
+    temporary.replace(path)
+    return len(doc_ids), len(terms)
+
+
+class TextIndex:
+    """Read-only view over an index file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with self.path.open("rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        (
+            magic,
+            version,
+            self.document_count,
+            term_count,
+            posting_count,
+            self.average_length,
+        ) = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            msg = f"{path} is not a version {FORMAT_VERSION} text index"
+            raise ValueError(msg)
+
+        position = HEADER.size + (-HEADER.size % ALIGNMENT)
+        (vocabulary_size,) = struct.unpack_from("<Q", view, position)
+        position += 8
+        vocabulary = bytes(view[position : position + vocabulary_size]).decode()
+        position += vocabulary_size + (-vocabulary_size % ALIGNMENT)
+        terms = vocabulary.split("\n") if term_count else []
+        self._terms = {term: number for number, term in enumerate(terms)}
+
+        def section(typecode, length):
+            nonlocal position
+            itemsize = array(typecode).itemsize
+            values = view[position : position + length * itemsize].cast(typecode)
+            position += length * itemsize + (-(length * itemsize) % ALIGNMENT)
+            return values
+
+        self.doc_ids = section("q", self.document_count)
+        self.doc_lengths = section("I", self.document_count)
+        self._offsets = section("Q", term_count + 1)
+        self._frequencies = section("I", term_count)
+        self._posting_docs = section("I", posting_count)
+        self._posting_counts = section("H", posting_count)
+        self._norms = None
+
+    def _length_norms(self, k1, b):
+        # Per-document BM25 length normalization, computed once per process
+        # for the configured parameters.
+        if self._norms is None or self._norms[0] != (k1, b):
+            average_length = self.average_length or 1.0
+            norms = array(
+                "d",
+                (
+                    k1 * (1 - b + b * length / average_length)
+                    for length in self.doc_lengths
+                ),
+            )
+            self._norms = ((k1, b), norms)
+        return self._norms[1]
+
+    def bm25(self, text, limit):
+        """Return ``[(restaurant_id, score)]`` for the best ``limit`` matches."""
+        k1 = settings.TEXT_SEARCH_BM25_K1
+        norms = self._length_norms(k1, settings.TEXT_SEARCH_BM25_B)
+        scores = defaultdict(float)
+        for term in set(tokenize(text)):
+            number = self._terms.get(term)
+            if number is None:
+                continue
+            frequency = self._frequencies[number]
+            weight = (k1 + 1) * math.log(
+                1 + (self.document_count - frequency + 0.5) / (frequency + 0.5)
+            )
+            start, end = self._offsets[number], self._offsets[number + 1]
+            for document, count in zip(
+                self._posting_docs[start:end],
+                self._posting_counts[start:end],
+                strict=True,
+            ):
+                scores[document] += weight * count / (count + norms[document])
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[document], score) for document, score in best]
+
+
+class _State:
+    lock = threading.Lock()
+    index = None
+    signature = None
+    checked_at = 0.0
+
+
+def build_text_index(path=None):
+    documents = (
+        Restaurant.objects.exclude(review_summary__isnull=True)
+        .exclude(review_summary="")
+        .values_list("pk", "review_summary")
+        .order_by("pk")
+        .iterator(chunk_size=2000)
+    )
+    return build(documents, path or settings.TEXT_INDEX_PATH)
+
+
+def get_text_index():
+    """
+    Return this process's mapping of ``TEXT_INDEX_PATH``, or ``None`` if no
+    index has been built. The file is checked for replacement at most every
+    ``TEXT_INDEX_CHECK_INTERVAL`` seconds.
+    """
+    now = time.monotonic()
+    if now - _State.checked_at < settings.TEXT_INDEX_CHECK_INTERVAL:
+        return _State.index
+
+    with _State.lock:
+        _State.checked_at = now
+        try:
+            stat = Path(settings.TEXT_INDEX_PATH).stat()
+        except FileNotFoundError:
+            _State.index = _State.signature = None
+            return None
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature != _State.signature:
+            # The previous mapping stays valid for requests still using it
+            # and is released when they drop their reference.
+            _State.index = TextIndex(settings.TEXT_INDEX_PATH)
+            _State.signature = signature
+        return _State.index
@@ -0,0 +1,122 @@
+"""
+Trending restaurants from recent interactions.
+
+Every interaction delta increments one counter per bucket granularity in a
+Redis sorted set keyed by time bucket, once globally and once for each
+neighbourhood (3x3 block of geo cells) that contains the restaurant's cell,
+so the write path is O(1) per event. Bucket keys expire on their own. A
+trending read merges the buckets covering the requested window, for the
+caller's neighbourhood, with a single ``ZUNIONSTORE`` of at most 24 keys
+whose result is reused for a few seconds.
+"""
+
+import math
+
+from django.conf import settings
+from django.utils import timezone
+
+from authenbite.restaurants.models import Restaurant
+from authenbite.restaurants.popularity import interaction_weight
+from authenbite.restaurants.store import decode
+from authenbite.restaurants.store import get_redis_client
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# window -> (bucket size in seconds, number of buckets merged)
+WINDOWS = {
+    "1h": (5 * MINUTE, 12),
+    "24h": (HOUR, 24),
+    "7d": (DAY, 7),
+}
+DEFAULT_WINDOW = "24h"
+
+GLOBAL_SCOPE = "all"
+
+
+def cell_for(lon, lat):
+    size = settings.TRENDING_CELL_DEGREES
+    return math.floor(lon / size), math.floor(lat / size)
+
+
+def _neighbourhood_scope(cell):
+    # The 3x3 block of cells centred on ``cell``.
+    return f"near:{cell[0]}:{cell[1]}"
+
+
+def _containing_scopes(cell):
+    """Return the neighbourhoods that ``cell`` is part of."""
+    x, y = cell
+    return [
+        _neighbourhood_scope((x + dx, y + dy)) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+    ]
+
+
+def _bucket_key(scope, bucket_size, bucket):
+    return f"trending:{scope}:{bucket_size}:{bucket}"
+
+
+def _result_key(window, scope):
+    return f"trending:result:{window}:{scope}"
+
+
+def record_interaction_trending(deltas, at=None):
+    """Count ``{restaurant_id: StatsDelta}`` in the current time buckets."""
+    weights = {
+        restaurant_id: interaction_weight(delta)
+        for restaurant_id, delta in deltas.items()
+    }
+    weights = {k: v for k, v in weights.items() if v}
+    if not weights:
+        return
+
+    locations = Restaurant.objects.filter(pk__in=weights).values_list("pk", "location")
+    scopes = {restaurant_id: [GLOBAL_SCOPE] for restaurant_id in weights}
+    for restaurant_id, location in locations:
+        if location is not None:
+            scopes[restaurant_id].extend(
+                _containing_scopes(cell_for(location.x, location.y))
+            )
+
+    timestamp = (at or timezone.now()).timestamp()
+    pipe = get_redis_client().pipeline(transaction=False)
+    for bucket_size, count in set(WINDOWS.values()):
+        bucket = int(timestamp // bucket_size)
+        for restaurant_id, weight in weights.items():
+            for scope in scopes[restaurant_id]:
+                key = _bucket_key(scope, bucket_size, bucket)
+                pipe.zincrby(key, weight, restaurant_id)
+                pipe.expire(key, bucket_size * (count + 1))
+    pipe.execute()
+
+
+def top_trending(window, limit, lon=None, lat=None):
+    """
+    Return ``[(restaurant_id, score)]`` for the ``limit`` restaurants with the
+    most activity in ``window``, near ``(lon, lat)`` when given.
+    """
+    bucket_size, count = WINDOWS[window]
+    if lon is None or lat is None:
+        scope = GLOBAL_SCOPE
+    else:
+        scope = _neighbourhood_scope(cell_for(lon, lat))
+
+    client = get_redis_client()
+    key = _result_key(window, scope)
+    if not client.exists(key):
+        current = int(timezone.now().timestamp() // bucket_size)
+        bucket_keys = [
+            _bucket_key(scope, bucket_size, bucket)
+            for bucket in range(current - count + 1, current + 1)
+        ]
+        pipe = client.pipeline(transaction=False)
+        pipe.zunionstore(key, bucket_keys)
+        pipe.expire(key, settings.TRENDING_CACHE_TTL)
+        pipe.execute()
+
+    return [
+        (int(decode(member)), score)
+        for member, score in client.zrevrange(key, 0, limit - 1, withscores=True)
+        if score > 0
+    ]
@@ -1,19 +1,31 @@
+from django.conf import settings
 from rest_framework.routers import DefaultRouter
 
+from authenbite.restaurants.api import async_views
 from authenbite.restaurants.api.views import (
+    AutocompleteViewSet,
     CuisineViewSet,
     RestaurantViewSet,
     UserPreferenceViewSet,
     UserRestaurantInteractionViewSet,
 )
 
+# The ASGI entry point (config/asgi.py) serves the async viewsets.
+if settings.ASYNC_API_VIEWS:
+    restaurant_viewset = async_views.AsyncRestaurantViewSet
+    interaction_viewset = async_views.AsyncUserRestaurantInteractionViewSet
+else:
+    restaurant_viewset = RestaurantViewSet
+    interaction_viewset = UserRestaurantInteractionViewSet
+
 router = DefaultRouter()
+router.register(r"autocomplete", AutocompleteViewSet, basename="autocomplete")
 router.register(r"cuisines", CuisineViewSet)
-router.register(r"restaurants", RestaurantViewSet)
+router.register(r"restaurants", restaurant_viewset)
 router.register(r"user-preferences", UserPreferenceViewSet, basename="user-preference")
 router.register(
     r"user-restaurant-interactions",
-    UserRestaurantInteractionViewSet,
+    interaction_viewset,
     basename="user-restaurant-interaction",
 )
 
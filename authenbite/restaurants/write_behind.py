@@ -0,0 +1,177 @@
+"""
+Write-behind mode for user/restaurant interactions.
+
+With ``INTERACTION_WRITE_BEHIND`` enabled, interaction actions append their
+changes to a Redis stream and return without touching
+``UserRestaurantInteraction``. :func:`flush_interaction_events` (run by Celery
+beat) coalesces the stream per (user, restaurant) and applies it with bulk
+upserts. Until then, the same changes are kept per user in a pending hash that
+the user's own reads overlay on top of the database rows: the interaction
+endpoints and their filters, ``?is_favorite=`` and the disliked restaurants
+left out of suggestions. Other users see the changes once they are flushed.
+"""
+
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from authenbite.restaurants.interactions import find_missing_restaurants
+from authenbite.restaurants.interactions import upsert_interaction_changes
+from authenbite.restaurants.models import UserRestaurantInteraction
+from authenbite.restaurants.store import decode
+from authenbite.restaurants.store import get_redis_client
+
+User = get_user_model()
+
+STREAM_KEY = "interactions:events"
+FLUSH_LOCK_KEY = "interactions:flush-lock"
+
+
+def _pending_key(user_id):
+    return f"interactions:pending:{user_id}"
+
+
+def enqueue_interaction_changes(user_id, changes_by_restaurant):
+    """Append ``{restaurant_id: {field: value}}`` for ``user_id`` to the stream."""
+    timestamp = timezone.now().isoformat()
+    pending = {}
+    client = get_redis_client()
+    pipe = client.pipeline(transaction=False)
+    for restaurant_id, changes in changes_by_restaurant.items():
+        pipe.xadd(
+            STREAM_KEY,
+            {
+                "user": user_id,
+                "restaurant": restaurant_id,
+                "changes": json.dumps(changes),
+            },
+        )
+        for field, value in changes.items():
+            pending[f"{restaurant_id}:{field}"] = json.dumps([value, timestamp])
+    pipe.hset(_pending_key(user_id), mapping=pending)
+    pipe.expire(_pending_key(user_id), settings.INTERACTION_PENDING_TTL)
+    pipe.execute()
+
+
+def get_pending_changes(user_id):
+    """Return ``{restaurant_id: {field: (value, queued_at)}}`` for ``user_id``."""
+    pending = {}
+    for key, item in get_redis_client().hgetall(_pending_key(user_id)).items():
+        restaurant_id, field = decode(key).split(":", 1)
+        value, queued_at = json.loads(decode(item))
+        pending.setdefault(int(restaurant_id), {})[field] = (
+            value,
+            datetime.fromisoformat(queued_at),
+        )
+    return pending
+
+
+def overlay_pending(user, interactions, restaurant_ids=None):
+    """
+    Apply queued changes for ``user`` on top of ``interactions``.
+
+    A queued value wins unless the stored row was written after it was queued,
+    which means the flush has already applied it. Restaurants that only have
+    queued changes come back as unsaved interactions.
+    """
+    by_restaurant = {
+        interaction.restaurant_id: interaction for interaction in interactions
+    }
+    for restaurant_id, fields in get_pending_changes(user.pk).items():
+        if restaurant_ids is not None and restaurant_id not in restaurant_ids:
+            continue
+        interaction = by_restaurant.get(restaurant_id)
+        if interaction is None:
+            interaction = UserRestaurantInteraction(
+                user=user, restaurant_id=restaurant_id
+            )
+        for field, (value, queued_at) in fields.items():
+            written_at = interaction.interaction_date
+            if written_at is None or queued_at > written_at:
+                setattr(interaction, field, value)
+        by_restaurant[restaurant_id] = interaction
+    return list(by_restaurant.values())
+
+
+def pending_values(user_id, field):
+    """
+    Return ``{restaurant_id: value}`` for the queued ``field`` changes of
+    ``user_id`` that the database does not have yet, for reads that filter on
+    ``field`` in the database.
+    """
+    queued = {
+        restaurant_id: fields[field]
+        for restaurant_id, fields in get_pending_changes(user_id).items()
+        if field in fields
+    }
+    if not queued:
+        return {}
+    written_at = dict(
+        UserRestaurantInteraction.objects.filter(
+            user_id=user_id, restaurant_id__in=list(queued)
+        ).values_list("restaurant_id", "interaction_date")
+    )
+    return {
+        restaurant_id: value
+        for restaurant_id, (value, queued_at) in queued.items()
+        if written_at.get(restaurant_id) is None
+        or queued_at > written_at[restaurant_id]
+    }
+
+
+def flush_interaction_events(batch_size=None, max_batches=None):
+    """
+    Drain the event stream into ``UserRestaurantInteraction``.
+
+    Events are only removed from the stream once their batch has committed.
+    Upserts set absolute values, so replaying a batch after a crash is safe.
+    """
+    batch_size = batch_size or settings.INTERACTION_FLUSH_BATCH_SIZE
+    max_batches = max_batches or settings.INTERACTION_FLUSH_MAX_BATCHES
+    if not cache.add(FLUSH_LOCK_KEY, 1, timeout=settings.CELERY_TASK_SOFT_TIME_LIMIT):
+        return 0
+
+    flushed = 0
+    client = get_redis_client()
+    try:
+        for _ in range(max_batches):
+            entries = client.xrange(STREAM_KEY, count=batch_size)
+            if not entries:
+                break
+            _apply_events(entries)
+            client.xdel(STREAM_KEY, *[entry_id for entry_id, _ in entries])
+            flushed += len(entries)
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+    return flushed
+
+
+def _apply_events(entries):
+    changes = {}
+    for _, raw_fields in entries:
+        fields = {decode(key): decode(value) for key, value in raw_fields.items()}
+        key = (int(fields["user"]), int(fields["restaurant"]))
+        changes.setdefault(key, {}).update(json.loads(fields["changes"]))
+
+    # Drop events whose user or restaurant has been deleted since they were
+    # queued; they would otherwise fail the whole batch on commit.
+    missing_restaurants = set(
+        find_missing_restaurants({restaurant_id for _, restaurant_id in changes})
+    )
+    user_ids = set(
+        User.objects.filter(pk__in={user_id for user_id, _ in changes}).values_list(
+            "pk", flat=True
+        )
+    )
+    changes = {
+        (user_id, restaurant_id): fields
+        for (user_id, restaurant_id), fields in changes.items()
+        if user_id in user_ids and restaurant_id not in missing_restaurants
+    }
+    with transaction.atomic():
+        upsert_interaction_changes(changes)
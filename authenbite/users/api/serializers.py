@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from authenbite.observability.stats import TimedSerializerMixin
 from authenbite.users.models import Persona, User, UserProfile
 
 
@@ -23,7 +24,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return value
 
 
-class PersonaSerializer(serializers.ModelSerializer):
+class PersonaSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Persona
         fields = ["name", "description"]
@@ -43,7 +44,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         ]
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     profile = UserProfileSerializer()
 
     def update(self, instance, validated_data):
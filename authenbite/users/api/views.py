@@ -1,6 +1,6 @@
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from django.shortcuts import get_object_or_404
+from django.http import Http404
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.mixins import ListModelMixin, RetrieveModelMixin, UpdateModelMixin
@@ -8,6 +8,8 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet, ReadOnlyModelViewSet
 
+from authenbite.restaurants import reference
+from authenbite.restaurants.cache import PERSONA_NAMESPACE, cache_response
 from authenbite.users.models import Persona, User, UserProfile
 
 from .serializers import PersonaSerializer, UserCreateSerializer, UserSerializer
@@ -18,6 +20,14 @@ class PersonaViewSet(ReadOnlyModelViewSet):
     serializer_class = PersonaSerializer
     permission_classes = [AllowAny]  # Allow any user to view personas
 
+    @cache_response("personas-list", namespaces=(PERSONA_NAMESPACE,))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response("personas-detail", namespaces=(PERSONA_NAMESPACE,))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class UserViewSet(RetrieveModelMixin, ListModelMixin, UpdateModelMixin, GenericViewSet):
     serializer_class = UserSerializer
@@ -64,7 +74,9 @@ class UserViewSet(RetrieveModelMixin, ListModelMixin, UpdateModelMixin, GenericV
     @action(detail=False, methods=["post"])
     def set_persona(self, request):
         user = request.user
-        persona = get_object_or_404(Persona, name=request.data.get("persona"))
+        persona = reference.personas.get(name=request.data.get("persona"))
+        if persona is None:
+            raise Http404
         user.profile.persona = persona
         user.profile.save()
         return Response({"status": "persona set"})
@@ -1,5 +1,176 @@
+"""
+Token authentication without a database round trip for known tokens.
+
+A token resolves through three tiers: a per-process LRU, then the default
+cache (Redis in production), then the ``authtoken_token`` and user tables.
+Cache entries hold the user's field values rather than a model instance, so
+every request gets its own ``User``. The password hash is never cached: it is
+left deferred and only loaded by code that checks or changes the password.
+
+Each entry records the user's cache version read before it was loaded, so a
+change that commits while the entry is being loaded leaves it already stale
+rather than cached under the new version. Signals bump
+that version after any save of the user (deactivation, password change) and
+after any deletion of one of their tokens, so a stale entry is rejected on
+its next use in every process, whichever tier it comes from. Checking the
+version costs one small cache read per request.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
 from rest_framework.authentication import TokenAuthentication
 
+from authenbite.observability.stats import HIT
+from authenbite.observability.stats import MISS
+from authenbite.observability.stats import STALE
+from authenbite.observability.stats import record_cache_lookup
+from authenbite.restaurants.cache import bump_cache_version_on_commit
+from authenbite.restaurants.cache import get_cache_version
+
+
+def user_namespace(user_id):
+    return f"user:{user_id}"
+
+
+# Credentials and other fields that cached tokens leave deferred.
+UNCACHED_USER_FIELDS = frozenset({"password"})
+
+
+def token_cache_key(key):
+    # Token keys are credentials; only their digest is stored in the cache.
+    return f"auth:token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def user_fields():
+    return [
+        field.attname
+        for field in get_user_model()._meta.concrete_fields
+        if field.attname not in UNCACHED_USER_FIELDS
+    ]
+
+
+@dataclass(frozen=True)
+class CachedToken:
+    user_id: int
+    created: datetime
+    user_values: tuple
+    version: int
+
+
+class LocalTokenCache:
+    """Thread-safe LRU of token key -> ``CachedToken`` with a TTL."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            expires_at = time.monotonic() + settings.AUTH_TOKEN_LOCAL_TTL
+            self._entries[key] = (entry, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_TOKEN_LOCAL_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_tokens = LocalTokenCache()
+
+
+def invalidate_user_tokens(user_id):
+    """Reject every cached token of ``user_id`` once the transaction commits."""
+    bump_cache_version_on_commit(user_namespace(user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        entry = local_tokens.get(key)
+        from_local = entry is not None
+        tier = "auth_token_local" if from_local else "auth_token"
+        if entry is None:
+            entry = cache.get(token_cache_key(key))
+        if entry is not None and entry.version != get_cache_version(
+            user_namespace(entry.user_id)
+        ):
+            local_tokens.discard(key)
+            entry = None
+            record_cache_lookup(tier, STALE)
+        else:
+            record_cache_lookup(tier, MISS if entry is None else HIT)
+        if entry is None:
+            entry = self.load_entry(key)
+            cache.set(
+                token_cache_key(key), entry, timeout=settings.AUTH_TOKEN_CACHE_TTL
+            )
+        if not from_local:
+            local_tokens.set(key, entry)
+        return self.build_credentials(key, entry)
+
+    def load_entry(self, key):
+        tokens = self.get_model().objects.filter(key=key)
+        user_id = tokens.values_list("user_id", flat=True).first()
+        if user_id is None:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        # Read before the user row: a change committed after this point bumps
+        # the version past the one recorded in the entry.
+        version = get_cache_version(user_namespace(user_id))
+
+        fields = user_fields()
+        row = tokens.values_list(
+            "created", *(f"user__{field}" for field in fields)
+        ).first()
+        if row is None:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        created, user_values = row[0], row[1:]
+        if user_values[fields.index(get_user_model()._meta.pk.attname)] != user_id:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if not user_values[fields.index("is_active")]:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return CachedToken(
+            user_id=user_id,
+            created=created,
+            user_values=user_values,
+            version=version,
+        )
+
+    def build_credentials(self, key, entry):
+        # Fields missing from the entry, such as the password, are deferred.
+        user = get_user_model().from_db(None, user_fields(), entry.user_values)
+        token = self.get_model().from_db(
+            None, ["key", "user_id", "created"], [key, entry.user_id, entry.created]
+        )
+        token.user = user
+        return user, token
+
 
-class BearerTokenAuthentication(TokenAuthentication):
+class BearerTokenAuthentication(CachedTokenAuthentication):
     keyword = "Bearer"
@@ -1 +1,35 @@
 # In your models.py file or in a separate signals.py file
+from django.core.cache import cache
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from authenbite.restaurants.cache import PERSONA_NAMESPACE
+from authenbite.restaurants.cache import bump_cache_version_on_commit
+from authenbite.users.authentication import invalidate_user_tokens
+from authenbite.users.authentication import local_tokens
+from authenbite.users.authentication import token_cache_key
+from authenbite.users.models import Persona
+from authenbite.users.models import User
+
+
+@receiver(post_save, sender=Persona)
+@receiver(post_delete, sender=Persona)
+def bump_persona_version(sender, **kwargs):
+    bump_cache_version_on_commit(PERSONA_NAMESPACE)
+
+
+@receiver(post_save, sender=User)
+def invalidate_tokens_on_user_change(sender, instance, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which cached tokens do not rely on.
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    local_tokens.discard(instance.key)
+    cache.delete(token_cache_key(instance.key))
+    invalidate_user_tokens(instance.user_id)
@@ -0,0 +1,81 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from authenbite.users.authentication import BearerTokenAuthentication
+from authenbite.users.authentication import local_tokens
+from authenbite.users.authentication import token_cache_key
+from authenbite.users.models import User
+
+
+@pytest.fixture()
+def token(user: User) -> Token:
+    local_tokens.clear()
+    return Token.objects.create(user=user)
+
+
+def test_cached_token_skips_database(token: Token, django_assert_num_queries):
+    authentication = BearerTokenAuthentication()
+    user, auth = authentication.authenticate_credentials(token.key)
+    assert (user.pk, auth.key) == (token.user_id, token.key)
+
+    with django_assert_num_queries(0):
+        user, auth = authentication.authenticate_credentials(token.key)
+    assert user.username == token.user.username
+
+    local_tokens.clear()
+    with django_assert_num_queries(0):
+        authentication.authenticate_credentials(token.key)
+
+
+def test_deactivation_invalidates_cached_token(
+    token: Token, django_capture_on_commit_callbacks
+):
+    authentication = BearerTokenAuthentication()
+    authentication.authenticate_credentials(token.key)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        token.user.is_active = False
+        token.user.save()
+
+    with pytest.raises(AuthenticationFailed):
+        authentication.authenticate_credentials(token.key)
+
+
+def test_password_change_refreshes_cached_user(
+    token: Token, django_capture_on_commit_callbacks
+):
+    authentication = BearerTokenAuthentication()
+    authentication.authenticate_credentials(token.key)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        token.user.set_password("a-new-password")
+        token.user.save()
+
+    user, _ = authentication.authenticate_credentials(token.key)
+    assert user.check_password("a-new-password")
+
+
+def test_token_deletion_invalidates_cached_token(
+    token: Token, django_capture_on_commit_callbacks
+):
+    authentication = BearerTokenAuthentication()
+    authentication.authenticate_credentials(token.key)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        token.delete()
+
+    with pytest.raises(AuthenticationFailed):
+        authentication.authenticate_credentials(token.key)
+
+
+def test_password_hash_is_not_cached(token: Token, django_assert_num_queries):
+    authentication = BearerTokenAuthentication()
+    user, _ = authentication.authenticate_credentials(token.key)
+
+    entry = cache.get(token_cache_key(token.key))
+    assert token.user.password not in entry.user_values
+    assert "password" in user.get_deferred_fields()
+    with django_assert_num_queries(1):
+        assert user.password == token.user.password
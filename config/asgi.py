@@ -0,0 +1,28 @@
+"""
+ASGI config for authenbite project.
+
+It exposes the ASGI callable as a module-level variable named ``application``
+and serves the async restaurant viewsets (``ASYNC_API_VIEWS``). In
+production it runs under gunicorn with uvicorn workers, see
+``compose/production/django/start-asgi``.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from django.core.asgi import get_asgi_application
+
+# This allows easy placement of apps within the interior
+# authenbite directory.
+BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(BASE_DIR / "authenbite"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+os.environ.setdefault("DJANGO_ASYNC_API_VIEWS", "True")
+
+application = get_asgi_application()
+
+from authenbite.observability.exporter import ASGIMetricsExporter  # noqa: E402
+from config.warmup import ASGIReadinessProbe  # noqa: E402
+
+application = ASGIReadinessProbe(ASGIMetricsExporter(application))
@@ -0,0 +1,74 @@
+"""
+Gunicorn settings for production: ``gunicorn -c config/gunicorn.py``.
+
+With ``GUNICORN_PRELOAD`` (the default) the master imports the application
+and runs :func:`config.warmup.warm_up` before forking, so workers share the
+loaded code, caches and indexes copy-on-write and serve their first request
+warm. The master then freezes the garbage collector's view of those objects
+so that collections in the workers do not touch, and copy, their pages.
+Without preloading, each worker warms itself after it starts.
+
+With ``PROMETHEUS_MULTIPROC_DIR`` set, the directory is emptied when the
+master starts, so that samples of a previous run are not summed with the new
+ones, and workers that exit are marked dead.
+
+The ASGI entry point runs with ``GUNICORN_APP=config.asgi:application`` and
+``GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker``.
+"""
+
+import gc
+import multiprocessing
+import os
+import shutil
+from pathlib import Path
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in {"1", "true", "yes", "on"}
+
+
+wsgi_app = os.environ.get("GUNICORN_APP", "config.wsgi:application")
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+chdir = os.environ.get("GUNICORN_CHDIR", "/app")
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+preload_app = _env_bool("GUNICORN_PRELOAD", default=True)
+
+
+def on_starting(server):
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        Path(directory).mkdir(parents=True, exist_ok=True)
+
+
+def _warm_up():
+    from config.warmup import warm_up
+
+    warm_up()
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded application is imported and
+    # before any worker is forked.
+    if server.cfg.preload_app:
+        from django.db import connections
+
+        _warm_up()
+        # Workers must not share the master's database connections.
+        connections.close_all()
+        gc.collect()
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        _warm_up()
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
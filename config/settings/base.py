@@ -77,6 +77,7 @@ DJANGO_APPS = [
     "django.contrib.staticfiles",
     # "django.contrib.humanize", # Handy template tags
     "django.contrib.admin",
+    "django.contrib.postgres",
     "django.forms",
 ]
 THIRD_PARTY_APPS = [
@@ -96,6 +97,7 @@ THIRD_PARTY_APPS = [
 LOCAL_APPS = [
     "authenbite.users.apps.UsersConfig",
     "authenbite.restaurants.apps.RestaurantsConfig",
+    "authenbite.observability.apps.ObservabilityConfig",
     # Your stuff: custom apps go here
 ]
 # https://docs.djangoproject.com/en/dev/ref/settings/#installed-apps
@@ -144,6 +146,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    "authenbite.observability.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -155,6 +158,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    "authenbite.observability.profiling.RequestProfilingMiddleware",
 ]
 
 # STATIC
@@ -352,3 +356,219 @@ SPECTACULAR_SETTINGS = {
 }
 # Your stuff...
 # ------------------------------------------------------------------------------
+
+# Warm-up (config.warmup)
+# ------------------------------------------------------------------------------
+# Whether /readyz fails until config.warmup.warm_up() has run; gunicorn runs it
+# through config/gunicorn.py, other servers never do.
+WARM_UP_REQUIRED = env.bool("WARM_UP_REQUIRED", default=False)
+
+# Metrics (authenbite.observability)
+# ------------------------------------------------------------------------------
+# Bearer token Prometheus scrapes /metrics with; without one, /metrics is only
+# served with DEBUG on.
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
+# Request profiling (authenbite.observability.profiling)
+# ------------------------------------------------------------------------------
+# Whether staff requests sent with "X-Profile: 1" or ?_profile=1 are profiled.
+REQUEST_PROFILING_ENABLED = env.bool("REQUEST_PROFILING_ENABLED", default=True)
+# Seconds reports are kept for download from /api/profiles/<id>/.
+REQUEST_PROFILE_TTL = 60 * 60 * 24
+# Sampling interval of the profiler, in seconds.
+REQUEST_PROFILE_INTERVAL = 0.001
+# Slowest SELECT statements run again under EXPLAIN (ANALYZE, BUFFERS), and
+# the statement timeout EXPLAIN runs with here and in manage.py index_advisor,
+# in seconds.
+REQUEST_PROFILE_EXPLAIN_LIMIT = 5
+REQUEST_PROFILE_EXPLAIN_TIMEOUT = 10
+
+# Slow query log (authenbite.observability.slow_queries)
+# ------------------------------------------------------------------------------
+# Seconds from which a statement is logged and aggregated per fingerprint for
+# manage.py index_advisor; 0 turns the log off.
+SLOW_QUERY_THRESHOLD = env.float("SLOW_QUERY_THRESHOLD", default=0.1)
+# Seconds the aggregates are kept after the last slow query.
+SLOW_QUERY_RETENTION = 60 * 60 * 24 * 7
+
+# Async API views (authenbite.restaurants.api.async_views)
+# ------------------------------------------------------------------------------
+# Serve the async viewsets; config/asgi.py turns this on.
+ASYNC_API_VIEWS = env.bool("DJANGO_ASYNC_API_VIEWS", default=False)
+# Threads, each with its own database connection, that run an async view's
+# independent lookups concurrently; 0 runs them one after the other.
+ASYNC_QUERY_THREADS = env.int("ASYNC_QUERY_THREADS", default=8)
+
+# Response cache
+# ------------------------------------------------------------------------------
+RESPONSE_CACHE_ENABLED = env.bool("RESPONSE_CACHE_ENABLED", default=True)
+# Seconds each cached endpoint is kept before it is recomputed, even if the
+# catalog version has not changed.
+RESPONSE_CACHE_TTLS = {
+    "restaurants-list": 60,
+    "restaurants-nearest": 60,
+    "restaurants-persona": 60 * 5,
+    "cuisines-list": 60 * 10,
+    "personas-list": 60 * 60,
+    "personas-detail": 60 * 60,
+}
+# 4 decimal places is roughly 11 metres.
+RESPONSE_CACHE_COORDINATE_PRECISION = 4
+RESPONSE_CACHE_COMPRESS = env.bool("RESPONSE_CACHE_COMPRESS", default=True)
+RESPONSE_CACHE_COMPRESS_MIN_BYTES = 1024
+
+# Single-flight refresh of cached results (authenbite.restaurants.singleflight)
+# Seconds an entry is still served, stale, after its TTL while one request
+# recomputes it.
+SINGLE_FLIGHT_STALE_TTL = 60 * 5
+# Seconds a refresh may hold the per-key lock, and that callers with nothing
+# to serve wait for another process's result before computing it themselves.
+SINGLE_FLIGHT_LOCK_TIMEOUT = 30
+SINGLE_FLIGHT_WAIT_TIMEOUT = 10
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+# Early expiration aggressiveness; 0 disables it.
+SINGLE_FLIGHT_BETA = 1.0
+
+# Token authentication (authenbite.users.authentication)
+# ------------------------------------------------------------------------------
+# Seconds a token stays in the shared cache and in each process's LRU. Both
+# are revalidated against the user's cache version on every request.
+AUTH_TOKEN_CACHE_TTL = 60 * 5
+AUTH_TOKEN_LOCAL_TTL = 60
+AUTH_TOKEN_LOCAL_CACHE_SIZE = 10_000
+
+# Redis data structures (authenbite.restaurants.store)
+# ------------------------------------------------------------------------------
+# Dotted path of a client class (e.g. "fakeredis.FakeRedis") whose per-process
+# instance replaces the django-redis connection of the default cache, for
+# settings without a Redis server.
+REDIS_CLIENT_CLASS = None
+
+# Restaurants API
+# ------------------------------------------------------------------------------
+# Rows fetched per server-side cursor round trip (and per streamed write).
+RESTAURANT_EXPORT_CHUNK_SIZE = env.int("RESTAURANT_EXPORT_CHUNK_SIZE", default=2000)
+# Upper bound on ids accepted by /api/restaurants/bulk/.
+RESTAURANT_BULK_MAX_IDS = 300
+# Upper bound on operations accepted by
+# /api/user-restaurant-interactions/batch/.
+INTERACTION_BATCH_MAX_OPERATIONS = 500
+# Queue interaction writes in a Redis stream and apply them in batches from
+# Celery instead of writing them during the request.
+INTERACTION_WRITE_BEHIND = env.bool("INTERACTION_WRITE_BEHIND", default=False)
+# Seconds queued changes stay visible to their user's reads.
+INTERACTION_PENDING_TTL = 60 * 60
+INTERACTION_FLUSH_BATCH_SIZE = 1000
+INTERACTION_FLUSH_MAX_BATCHES = 50
+
+# Popularity rankings (authenbite.restaurants.popularity)
+POPULARITY_HALF_LIFE_DAYS = 7
+# Reference point of the forward-decay scores (2024-01-01 UTC). Scores grow
+# by 2 ** (elapsed / half-life) and stay well within float range for about
+# a thousand half-lives; move it forward and run rebuild_popularity if needed.
+POPULARITY_EPOCH = 1704067200
+POPULARITY_WEIGHTS = {"like": 3.0, "visit": 2.0, "rating": 1.0, "favorite": 5.0}
+# Seconds a merged "this week" ranking is reused before it is rebuilt.
+POPULARITY_WINDOW_CACHE_TTL = 60
+POPULAR_CUISINES_LIMIT = 5
+POPULAR_RESTAURANTS_LIMIT = 20
+
+# Text search configuration of Restaurant.search_vector. Run
+# update_search_vectors after changing it.
+SEARCH_CONFIG = "english"
+# pg_trgm similarity a name needs to match in ?mode=fuzzy searches.
+FUZZY_SEARCH_THRESHOLD = 0.3
+
+# Review summary search (authenbite.restaurants.text_index), built by
+# manage.py build_text_index and memory-mapped by every worker.
+INDEX_ROOT = Path(env("INDEX_ROOT", default=str(BASE_DIR / "indexes")))
+TEXT_INDEX_PATH = INDEX_ROOT / "review-summaries.idx"
+# Seconds between checks for a rebuilt index file.
+TEXT_INDEX_CHECK_INTERVAL = 30
+TEXT_SEARCH_BM25_K1 = 1.2
+TEXT_SEARCH_BM25_B = 0.75
+# Best BM25 matches handed to the database for filtering and paging.
+TEXT_SEARCH_CANDIDATES = 500
+
+# Column-oriented catalog snapshot (authenbite.restaurants.snapshot), built per
+# host with ``manage.py build_catalog_snapshot``.
+CATALOG_SNAPSHOT_ROOT = INDEX_ROOT / "catalog"
+CATALOG_SNAPSHOT_CHECK_INTERVAL = 30
+# Snapshot directories kept, so workers still mapping an older one can finish.
+CATALOG_SNAPSHOT_KEEP = 3
+# Catalog changes since a snapshot was built that workers read from the
+# database instead; past this the snapshot is unused until it is rebuilt.
+CATALOG_SNAPSHOT_MAX_CHANGES = 1000
+
+# Hybrid search ranking (authenbite.restaurants.ranking)
+HYBRID_WEIGHTS = {"text": 1.0, "distance": 0.6, "rating": 0.3, "persona": 0.4}
+HYBRID_DISTANCE_SCALE_KM = 3.0
+# Candidates taken from the text and spatial indexes before re-ranking.
+HYBRID_TEXT_CANDIDATES = 300
+HYBRID_SPATIAL_CANDIDATES = 300
+
+# Catalog outbox (authenbite.restaurants.outbox): rows published per relay
+# run, and seconds published rows are kept.
+CATALOG_OUTBOX_BATCH_SIZE = 500
+CATALOG_OUTBOX_RETENTION = 60 * 60 * 24
+
+# Cuisines and personas are held whole in every process
+# (authenbite.restaurants.reference). Seconds between version checks, and
+# seconds the shared copy of each table version is kept.
+REFERENCE_CACHE_CHECK_INTERVAL = 5
+REFERENCE_CACHE_TTL = 60 * 60
+
+# Seconds a user's personalization context is cached; writes to their
+# preferences, profile or interactions invalidate it sooner.
+PERSONALIZATION_CACHE_TTL = 60 * 10
+
+# Seconds ?facets= counts are reused for the same filters and catalog version.
+FACETS_CACHE_TTL = 60
+
+# Autocomplete (authenbite.restaurants.autocomplete)
+# Static weight = rating * w["rating"] + popularity * w["popularity"], plus
+# w["distance"] * exp(-km / AUTOCOMPLETE_DISTANCE_SCALE_KM) near lat/lon.
+AUTOCOMPLETE_WEIGHTS = {"rating": 1.0, "popularity": 1.0, "distance": 1.0}
+AUTOCOMPLETE_DISTANCE_SCALE_KM = 5.0
+# Decayed popularity score at which the popularity term reaches half weight.
+AUTOCOMPLETE_POPULARITY_PIVOT = 10.0
+# Suggestions ranked per prefix before the distance bias is applied.
+AUTOCOMPLETE_CANDIDATES = 100
+# Prefixes matching more keys than this keep precomputed candidates.
+AUTOCOMPLETE_SCAN_LIMIT = 256
+AUTOCOMPLETE_DEFAULT_LIMIT = 8
+AUTOCOMPLETE_MAX_LIMIT = 20
+# Seconds between checks for catalog changes, and between full rebuilds.
+AUTOCOMPLETE_REFRESH_INTERVAL = 5
+AUTOCOMPLETE_REBUILD_INTERVAL = 15 * 60
+# Pending changes above which a process rebuilds instead of patching.
+AUTOCOMPLETE_REBUILD_THRESHOLD = 1000
+# Refresh on a background thread, serving the current index meanwhile.
+AUTOCOMPLETE_BACKGROUND_REFRESH = True
+
+# Trending restaurants (authenbite.restaurants.trending)
+# Side of the square geo cells trending counters are kept for (~11 km).
+TRENDING_CELL_DEGREES = 0.1
+# Seconds a merged trending ranking is reused before it is rebuilt.
+TRENDING_CACHE_TTL = 30
+TRENDING_RESTAURANTS_LIMIT = 20
+
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-schedule
+CELERY_BEAT_SCHEDULE = {
+    "flush-interactions": {
+        "task": "authenbite.restaurants.tasks.flush_interactions",
+        "schedule": 5.0,
+    },
+    "reconcile-restaurant-stats": {
+        "task": "authenbite.restaurants.tasks.reconcile_stats",
+        "schedule": 60 * 60,
+    },
+    "relay-catalog-outbox": {
+        "task": "authenbite.restaurants.tasks.relay_catalog_outbox",
+        "schedule": 2.0,
+    },
+    "prune-catalog-outbox": {
+        "task": "authenbite.restaurants.tasks.prune_catalog_outbox",
+        "schedule": 60 * 60,
+    },
+}
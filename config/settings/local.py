@@ -23,6 +23,8 @@ CACHES = {
         "LOCATION": "",
     },
 }
+# The local-memory cache has no Redis server behind it.
+REDIS_CLIENT_CLASS = "fakeredis.FakeRedis"
 
 # EMAIL
 # ------------------------------------------------------------------------------
@@ -189,3 +189,7 @@ SPECTACULAR_SETTINGS["SERVERS"] = [
 ]
 # Your stuff...
 # ------------------------------------------------------------------------------
+
+# Warm-up
+# ------------------------------------------------------------------------------
+WARM_UP_REQUIRED = env.bool("WARM_UP_REQUIRED", default=True)
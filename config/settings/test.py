@@ -36,3 +36,12 @@ TEMPLATES[0]["OPTIONS"]["debug"] = True  # type: ignore[index]
 MEDIA_URL = "http://media.testserver"
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Cached responses would leak between tests; tests that exercise the cache
+# enable it explicitly.
+RESPONSE_CACHE_ENABLED = False
+# Concurrent lookups would use connections outside the test transaction.
+ASYNC_QUERY_THREADS = 0
+# Refreshes on another thread would not see the test transaction either.
+AUTOCOMPLETE_BACKGROUND_REFRESH = False
+# There is no Redis server behind the test cache.
+REDIS_CLIENT_CLASS = "fakeredis.FakeRedis"
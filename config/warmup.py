@@ -0,0 +1,174 @@
+"""
+Warm-up for web processes, and the readiness probe that reports it.
+
+:func:`warm_up` does the work a cold process would otherwise do on its first
+requests: resolving URLs, building the API schema (which constructs every
+serializer's fields), loading the cuisine and persona tables and mapping or
+building the search indexes. Under gunicorn with ``preload_app`` it runs once
+in the master before workers are forked (see ``config/gunicorn.py``), so the
+workers share the result copy-on-write and start ready.
+
+:class:`ReadinessProbe` (:class:`ASGIReadinessProbe` under ASGI) wraps the
+application and answers ``READINESS_PROBE_PATH`` itself, ahead of Django's
+middleware (host validation, HTTPS redirects, sessions), with 503 until
+warm-up has finished and 200 afterwards.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+READINESS_PROBE_PATH = "/readyz"
+
+
+class _State:
+    lock = threading.Lock()
+    ready = False
+    # Seconds spent on each step, or None for steps that failed.
+    timings = {}
+
+
+def warm_url_resolver():
+    from django.urls import get_resolver
+
+    get_resolver().reverse_dict  # noqa: B018
+
+
+def warm_api_schema():
+    from drf_spectacular.generators import SchemaGenerator
+
+    SchemaGenerator().get_schema(request=None, public=True)
+
+
+def warm_reference_tables():
+    from authenbite.restaurants import reference
+
+    reference.cuisines.all()
+    reference.personas.all()
+
+
+def warm_autocomplete_index():
+    from authenbite.restaurants.autocomplete import build_index
+
+    build_index()
+
+
+def warm_text_index():
+    from authenbite.restaurants.text_index import get_text_index
+
+    get_text_index()
+
+
+def warm_catalog_snapshot():
+    from authenbite.restaurants.snapshot import get_catalog_snapshot
+
+    snapshot = get_catalog_snapshot()
+    if snapshot is not None:
+        snapshot.prefault()
+
+
+STEPS = (
+    ("url_resolver", warm_url_resolver),
+    ("api_schema", warm_api_schema),
+    ("reference_tables", warm_reference_tables),
+    ("autocomplete_index", warm_autocomplete_index),
+    ("text_index", warm_text_index),
+    ("catalog_snapshot", warm_catalog_snapshot),
+)
+
+
+def warm_up(steps=STEPS):
+    """
+    Run every warm-up step and mark the process ready. A failing step is
+    logged and skipped: everything it warms is also loaded lazily, so the
+    process can still serve. Returns the step timings.
+    """
+    with _State.lock:
+        if _State.ready:
+            return _State.timings
+        timings = {}
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception:
+                logger.exception("Warm-up step %s failed", name)
+                timings[name] = None
+            else:
+                timings[name] = time.perf_counter() - started
+        _State.timings = timings
+        _State.ready = True
+    logger.info(
+        "Warm-up finished: %s",
+        ", ".join(
+            f"{name} {'failed' if seconds is None else f'{seconds:.3f} s'}"
+            for name, seconds in timings.items()
+        ),
+    )
+    return timings
+
+
+def is_ready():
+    return _State.ready
+
+
+def readiness():
+    """Return the probe's ``(status code, body)``."""
+    if is_ready() or not settings.WARM_UP_REQUIRED:
+        return 200, b"ready\n"
+    return 503, b"warming up\n"
+
+
+def _probe_headers(body):
+    return [
+        ("Content-Type", "text/plain"),
+        ("Content-Length", str(len(body))),
+        ("Cache-Control", "no-store"),
+    ]
+
+
+class ReadinessProbe:
+    """WSGI middleware answering the readiness probe."""
+
+    def __init__(self, application, path=READINESS_PROBE_PATH):
+        self.application = application
+        self.path = path
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO", "").rstrip("/") != self.path:
+            return self.application(environ, start_response)
+        status, body = readiness()
+        start_response(
+            "200 OK" if status == 200 else "503 Service Unavailable",  # noqa: PLR2004
+            _probe_headers(body),
+        )
+        return [body]
+
+
+class ASGIReadinessProbe:
+    """ASGI middleware answering the readiness probe."""
+
+    def __init__(self, application, path=READINESS_PROBE_PATH):
+        self.application = application
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].rstrip("/") != self.path:
+            return await self.application(scope, receive, send)
+        status, body = readiness()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (name.lower().encode(), value.encode())
+                    for name, value in _probe_headers(body)
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+        return None
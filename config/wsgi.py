@@ -36,5 +36,9 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
 # setting points here.
 application = get_wsgi_application()
 # Apply WSGI middleware here.
+from authenbite.observability.exporter import MetricsExporter
+from config.warmup import ReadinessProbe
+
+application = ReadinessProbe(MetricsExporter(application))
 # from helloworld.wsgi import HelloWorldApplication
 # application = HelloWorldApplication(application)